@@ -0,0 +1,77 @@
+from typing import List, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Cabeceras CORS precodificadas para la política abierta del servicio
+_ALLOW_ORIGIN = b"access-control-allow-origin"
+_ALLOW_CREDENTIALS = (b"access-control-allow-credentials", b"true")
+_ALLOW_METHODS = (b"access-control-allow-methods", b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT")
+_ALLOW_HEADERS = b"access-control-allow-headers"
+_MAX_AGE = (b"access-control-max-age", b"600")
+_VARY_ORIGIN = (b"vary", b"Origin")
+
+
+class StaticCORSMiddleware:
+    """
+    Middleware ASGI que aplica una política CORS abierta (cualquier origen,
+    método y cabecera) con cabeceras construidas de antemano, sin la
+    evaluación de orígenes por request de CORSMiddleware.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        has_cookie = False
+        request_method = None
+        request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"cookie":
+                has_cookie = True
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+
+        # Sin Origin no es una petición CORS
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Con credenciales el navegador no acepta "*", se refleja el origen
+        cors_headers: List[Tuple[bytes, bytes]] = [_ALLOW_CREDENTIALS]
+        if has_cookie:
+            cors_headers += [(_ALLOW_ORIGIN, origin), _VARY_ORIGIN]
+        else:
+            cors_headers.append((_ALLOW_ORIGIN, b"*"))
+
+        # Responder el preflight sin pasar por el router
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            preflight_headers = [
+                (_ALLOW_ORIGIN, origin),
+                _ALLOW_CREDENTIALS,
+                _ALLOW_METHODS,
+                _MAX_AGE,
+                _VARY_ORIGIN,
+                (b"content-length", b"2"),
+                (b"content-type", b"text/plain; charset=utf-8"),
+            ]
+            if request_headers is not None:
+                preflight_headers.append((_ALLOW_HEADERS, request_headers))
+            await send({"type": "http.response.start", "status": 200, "headers": preflight_headers})
+            await send({"type": "http.response.body", "body": b"OK"})
+            return
+
+        async def send_with_cors(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + cors_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
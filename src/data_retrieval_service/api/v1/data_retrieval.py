@@ -1,12 +1,11 @@
-from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Form, BackgroundTasks
-from fastapi.responses import JSONResponse
-import uuid
-from pydantic import BaseModel, Field, validator
-from enum import Enum
+from typing import List, Optional, Dict, Any, Literal
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Form
+from fastapi.responses import Response
+from uuid import UUID
+from pydantic import BaseModel, ConfigDict, TypeAdapter
 import logging
 import os
-import traceback
+from functools import lru_cache
 
 from ...modules.data_retrieval.application.commands.uow_commands import (
     UoWCreateRetrievalTaskHandler,
@@ -25,17 +24,14 @@ from ...modules.data_retrieval.application.commands.uow_commands import (
 
 from ...modules.data_retrieval.application.queries.uow_queries import (
     UoWGetRetrievalTaskByIdHandler,
-    UoWGetPendingRetrievalTasksHandler,
-    UoWGetTasksBySourceHandler,
-    UoWGetTasksByBatchHandler,
+    UoWSearchTasksHandler,
     UoWGetImagesByTaskHandler,
-    uow_get_retrieval_task_by_id,
-    uow_get_pending_retrieval_tasks,
-    uow_get_tasks_by_source,
-    uow_get_tasks_by_batch,
+    uow_get_retrieval_task_json_by_id,
+    uow_search_tasks,
     uow_get_images_by_task
 )
 
+from ...modules.data_retrieval.application.exceptions import TaskNotFound
 from ...modules.data_retrieval.domain.value_objects import SourceType, RetrievalMethod, ImageFormat
 from ...config.dependencies import get_publisher, get_unit_of_work
 from ...config.settings import get_settings
@@ -43,235 +39,309 @@ from ...config.settings import get_settings
 # Configurar logging
 logger = logging.getLogger(__name__)
 
+# Obtener configuración
+settings = get_settings()
+
 # Crear router
 router = APIRouter()
 
+# Tablas de búsqueda precalculadas de nombre a miembro de enum de dominio
+_SOURCE_TYPES = {e.name: e for e in SourceType}
+_RETRIEVAL_METHODS = {e.name: e for e in RetrievalMethod}
+_IMAGE_FORMATS = {e.name: e for e in ImageFormat}
 
-# Pydantic models for API requests
-class SourceTypeEnum(str, Enum):
-    HOSPITAL = "HOSPITAL"
-    LABORATORY = "LABORATORY"
-    CLINIC = "CLINIC"
-    RESEARCH_CENTER = "RESEARCH_CENTER"
+
+@lru_cache(maxsize=1024)
+def _storage_path(source_type: str, batch_id: str) -> str:
+    """Ruta de almacenamiento para una fuente y lote, memorizada entre requests"""
+    return os.path.join(settings.image_storage_path, source_type.lower(), batch_id)
 
 
-class RetrievalMethodEnum(str, Enum):
-    SFTP = "SFTP"
-    API = "API"
-    DIRECT_UPLOAD = "DIRECT_UPLOAD"
-    CLOUD_STORAGE = "CLOUD_STORAGE"
+async def _iter_upload(file: UploadFile):
+    """Lee un archivo subido en fragmentos de tamaño fijo sin cargarlo completo en memoria"""
+    while chunk := await file.read(settings.image_upload_chunk_size):
+        yield chunk
+
+
+# Pydantic models for API requests
+SourceTypeLiteral = Literal["HOSPITAL", "LABORATORY", "CLINIC", "RESEARCH_CENTER"]
 
+RetrievalMethodLiteral = Literal["SFTP", "API", "DIRECT_UPLOAD", "CLOUD_STORAGE"]
 
-class ImageFormatEnum(str, Enum):
-    DICOM = "DICOM"
-    JPEG = "JPEG"
-    PNG = "PNG"
-    TIFF = "TIFF"
-    RAW = "RAW"
+ImageFormatLiteral = Literal["DICOM", "JPEG", "PNG", "TIFF", "RAW"]
 
 
 class CreateTaskRequest(BaseModel):
-    source_type: SourceTypeEnum
+    model_config = ConfigDict(extra='forbid')
+    
+    source_type: SourceTypeLiteral
     source_name: str
     source_id: str
     location: str
-    retrieval_method: RetrievalMethodEnum
+    retrieval_method: RetrievalMethodLiteral
     batch_id: str
     priority: int = 0
     metadata: Optional[Dict[str, Any]] = None
 
 
 class CompleteTaskRequest(BaseModel):
+    model_config = ConfigDict(extra='forbid')
+    
     successful_images: int
     failed_images: int
     details: Optional[List[Dict[str, Any]]] = None
 
 
 class FailTaskRequest(BaseModel):
+    model_config = ConfigDict(extra='forbid')
+    
     error_message: str
     details: Optional[List[Dict[str, Any]]] = None
 
 
 class ImageMetadataRequest(BaseModel):
-    format: ImageFormatEnum
+    model_config = ConfigDict(extra='forbid')
+    
+    format: ImageFormatLiteral
     modality: str
     region: str
     dimensions: Optional[str] = None
 
 
+# Pydantic models for API responses
+class TaskCreatedResponse(BaseModel):
+    task_id: str
+    batch_id: str
+    source: str
+    status: str
+
+
+class TaskStartedResponse(TaskCreatedResponse):
+    started_at: Optional[str] = None
+
+
+class TaskCompletedResponse(TaskCreatedResponse):
+    successful_images: int
+    failed_images: int
+    total_images: int
+    completed_at: Optional[str] = None
+
+
+class TaskFailedResponse(TaskCreatedResponse):
+    error_message: str
+    completed_at: Optional[str] = None
+
+
+class TaskResponse(BaseModel):
+    id: str
+    batch_id: str
+    source_type: str
+    source_name: str
+    source_id: str
+    location: str
+    retrieval_method: str
+    priority: int
+    storage_path: str
+    status: str
+    message: Optional[str] = None
+    total_images: int = 0
+    successful_images: int = 0
+    failed_images: int = 0
+    details: Optional[List[Dict[str, Any]]] = None
+    created_at: Optional[str] = None
+    started_at: Optional[str] = None
+    completed_at: Optional[str] = None
+    images_count: int = 0
+    result: Optional[Dict[str, Any]] = None
+
+
+class ImageResponse(BaseModel):
+    id: str
+    task_id: str
+    filename: str
+    file_path: str
+    format: str
+    modality: str
+    region: str
+    size_bytes: int
+    dimensions: Optional[str] = None
+    is_stored: bool
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+
+class StoredImageResponse(BaseModel):
+    task_id: str
+    image_id: str
+    filename: str
+    file_path: str
+    modality: str
+    region: str
+    size_bytes: int
+
+
+class BatchImageItem(BaseModel):
+    image_id: str
+    filename: str
+    modality: str
+    region: str
+    size_bytes: int
+
+
+class StoredImageBatchResponse(BaseModel):
+    task_id: str
+    images_count: int
+    total_size_bytes: int
+    images: List[BatchImageItem]
+
+
+# Adaptadores construidos una sola vez para las respuestas en lista
+TASKS_ADAPTER = TypeAdapter(List[TaskResponse])
+IMAGES_ADAPTER = TypeAdapter(List[ImageResponse])
+IMAGE_METADATA_ADAPTER = TypeAdapter(List[ImageMetadataRequest])
+
+
+def _list_response(adapter: TypeAdapter, items: List[Dict[str, Any]]) -> Response:
+    """Valida y serializa una lista directamente a JSON con un adaptador precompilado"""
+    return Response(
+        content=adapter.dump_json(adapter.validate_python(items)),
+        media_type="application/json"
+    )
+
+
 # Endpoints
-@router.post("/tasks", status_code=201, response_model=Dict[str, Any])
+@router.post("/tasks", status_code=201, response_model=TaskCreatedResponse)
 async def api_create_task(
     request: CreateTaskRequest,
-    background_tasks: BackgroundTasks,
     publisher = Depends(get_publisher),
     uow = Depends(get_unit_of_work)
 ):
     """Crea una nueva tarea de recuperación de imágenes"""
-    try:
-        # Crear handler con UoW
-        handler = UoWCreateRetrievalTaskHandler(
-            uow,
-            publisher
-        )
-        
-        # Crear ruta de almacenamiento
-        settings = get_settings()
-        storage_path = os.path.join(
-            settings.image_storage_path,
-            request.source_type.lower(),
-            request.batch_id
-        )
-        
-        # Ejecutar comando usando UoW
-        result = await uow_create_retrieval_task(
-            handler=handler,
-            source_type=SourceType[request.source_type.value],
-            source_name=request.source_name,
-            source_id=request.source_id,
-            location=request.location,
-            retrieval_method=RetrievalMethod[request.retrieval_method.value],
-            batch_id=request.batch_id,
-            storage_path=storage_path,
-            priority=request.priority,
-            metadata=request.metadata
-        )
-        
-        return result
-    except Exception as e:
-        logger.error(f"Error al crear tarea: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    # Crear handler con UoW
+    handler = UoWCreateRetrievalTaskHandler(
+        uow,
+        publisher
+    )
+    
+    # Crear ruta de almacenamiento
+    storage_path = _storage_path(request.source_type, request.batch_id)
+    
+    # Ejecutar comando usando UoW
+    result = await uow_create_retrieval_task(
+        handler=handler,
+        source_type=_SOURCE_TYPES[request.source_type],
+        source_name=request.source_name,
+        source_id=request.source_id,
+        location=request.location,
+        retrieval_method=_RETRIEVAL_METHODS[request.retrieval_method],
+        batch_id=request.batch_id,
+        storage_path=storage_path,
+        priority=request.priority,
+        metadata=request.metadata
+    )
+    
+    return result
 
 
-@router.get("/tasks/{task_id}", response_model=Dict[str, Any])
+@router.get("/tasks/{task_id}", response_model=TaskResponse)
 async def api_get_task(
-    task_id: str,
+    task_id: UUID,
     uow = Depends(get_unit_of_work)
 ):
     """Obtiene información de una tarea específica"""
-    try:
-        # Crear handler con UoW
-        handler = UoWGetRetrievalTaskByIdHandler(uow)
-        
-        # Ejecutar consulta usando UoW
-        result = await uow_get_retrieval_task_by_id(
-            handler=handler,
-            task_id=uuid.UUID(task_id)
-        )
+    # Crear handler con UoW
+    handler = UoWGetRetrievalTaskByIdHandler(uow)
+    
+    # Ejecutar consulta usando UoW; el cuerpo llega ya codificado en JSON
+    content = await uow_get_retrieval_task_json_by_id(
+        handler=handler,
+        task_id=task_id
+    )
+    
+    if not content:
+        raise HTTPException(status_code=404, detail=f"Task with ID {task_id} not found")
         
-        if not result:
-            raise HTTPException(status_code=404, detail=f"Task with ID {task_id} not found")
-            
-        return result
-    except ValueError:
-        raise HTTPException(status_code=400, detail=f"Invalid task ID: {task_id}")
-    except Exception as e:
-        logger.error(f"Error al obtener tarea: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    return Response(content=content, media_type="application/json")
 
 
-@router.post("/tasks/{task_id}/start", response_model=Dict[str, Any])
+@router.post("/tasks/{task_id}/start", response_model=TaskStartedResponse)
 async def api_start_task(
-    task_id: str,
+    task_id: UUID,
     publisher = Depends(get_publisher),
     uow = Depends(get_unit_of_work)
 ):
     """Inicia una tarea de recuperación"""
-    try:
-        # Crear handler con UoW
-        handler = UoWStartRetrievalTaskHandler(
-            uow,
-            publisher
-        )
-        
-        # Ejecutar comando usando UoW
-        result = await uow_start_retrieval_task(
-            handler=handler,
-            task_id=uuid.UUID(task_id)
-        )
-        
-        return result
-    except ValueError as e:
-        if "No se encontró la tarea" in str(e):
-            raise HTTPException(status_code=404, detail=str(e))
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        logger.error(f"Error al iniciar tarea: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    # Crear handler con UoW
+    handler = UoWStartRetrievalTaskHandler(
+        uow,
+        publisher
+    )
+    
+    # Ejecutar comando usando UoW
+    result = await uow_start_retrieval_task(
+        handler=handler,
+        task_id=task_id
+    )
+    
+    return result
 
 
-@router.post("/tasks/{task_id}/complete", response_model=Dict[str, Any])
+@router.post("/tasks/{task_id}/complete", response_model=TaskCompletedResponse)
 async def api_complete_task(
-    task_id: str,
+    task_id: UUID,
     request: CompleteTaskRequest,
     publisher = Depends(get_publisher),
     uow = Depends(get_unit_of_work)
 ):
     """Marca una tarea como completada"""
-    try:
-        # Crear handler con UoW
-        handler = UoWCompleteRetrievalTaskHandler(
-            uow,
-            publisher
-        )
-        
-        # Ejecutar comando usando UoW
-        result = await uow_complete_retrieval_task(
-            handler=handler,
-            task_id=uuid.UUID(task_id),
-            successful_images=request.successful_images,
-            failed_images=request.failed_images,
-            details=request.details
-        )
-        
-        return result
-    except ValueError as e:
-        if "No se encontró la tarea" in str(e):
-            raise HTTPException(status_code=404, detail=str(e))
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        logger.error(f"Error al completar tarea: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    # Crear handler con UoW
+    handler = UoWCompleteRetrievalTaskHandler(
+        uow,
+        publisher
+    )
+    
+    # Ejecutar comando usando UoW
+    result = await uow_complete_retrieval_task(
+        handler=handler,
+        task_id=task_id,
+        successful_images=request.successful_images,
+        failed_images=request.failed_images,
+        details=request.details
+    )
+    
+    return result
 
 
-@router.post("/tasks/{task_id}/fail", response_model=Dict[str, Any])
+@router.post("/tasks/{task_id}/fail", response_model=TaskFailedResponse)
 async def api_fail_task(
-    task_id: str,
+    task_id: UUID,
     request: FailTaskRequest,
     publisher = Depends(get_publisher),
     uow = Depends(get_unit_of_work)
 ):
     """Marca una tarea como fallida"""
-    try:
-        # Crear handler con UoW
-        handler = UoWFailRetrievalTaskHandler(
-            uow,
-            publisher
-        )
-        
-        # Ejecutar comando usando UoW
-        result = await uow_fail_retrieval_task(
-            handler=handler,
-            task_id=uuid.UUID(task_id),
-            error_message=request.error_message,
-            details=request.details
-        )
-        
-        return result
-    except ValueError as e:
-        if "No se encontró la tarea" in str(e):
-            raise HTTPException(status_code=404, detail=str(e))
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        logger.error(f"Error al marcar tarea como fallida: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    # Crear handler con UoW
+    handler = UoWFailRetrievalTaskHandler(
+        uow,
+        publisher
+    )
+    
+    # Ejecutar comando usando UoW
+    result = await uow_fail_retrieval_task(
+        handler=handler,
+        task_id=task_id,
+        error_message=request.error_message,
+        details=request.details
+    )
+    
+    return result
 
 
-@router.post("/tasks/{task_id}/images", response_model=Dict[str, Any])
+@router.post("/tasks/{task_id}/images", response_model=StoredImageResponse)
 async def api_upload_image(
-    task_id: str,
+    task_id: UUID,
     file: UploadFile = File(...),
-    format: ImageFormatEnum = Form(...),
+    format: ImageFormatLiteral = Form(...),
     modality: str = Form(...),
     region: str = Form(...),
     dimensions: Optional[str] = Form(None),
@@ -280,9 +350,6 @@ async def api_upload_image(
 ):
     """Sube una imagen para una tarea específica"""
     try:
-        # Leer el contenido del archivo
-        file_content = await file.read()
-        
         # Crear handler con UoW
         handler = UoWStoreImageHandler(
             uow,
@@ -292,47 +359,36 @@ async def api_upload_image(
         # Ejecutar comando usando UoW
         result = await uow_store_image(
             handler=handler,
-            task_id=uuid.UUID(task_id),
-            file_content=file_content,
+            task_id=task_id,
+            file_content=_iter_upload(file),
             filename=file.filename,
-            format=ImageFormat[format.value],
+            format=_IMAGE_FORMATS[format],
             modality=modality,
             region=region,
             dimensions=dimensions
         )
                 
         return result
-    except ValueError as e:
+    except TaskNotFound as e:
         # helper
         from ...modules.data_retrieval.application.events.event import create_image_upload_failed_event
-        if "No se encontró la tarea" in str(e):
-            source_name = None
-            try:
-                async with uow:
-                    retrieval_repository = uow.repository('retrieval')
-                    task = await retrieval_repository.get_by_id(uuid.UUID(task_id))
-                    if task:
-                        source_name = task.source_metadata.source_name
-            except Exception:
-                pass
-            
-            error_event = await create_image_upload_failed_event(
-                task_id=uuid.UUID(task_id),
-                filename=file.filename,
-                error=e,
-                source=source_name,
-                format_str=format.value,
-                modality=modality,
-                region=region
-            )
-            
-            await publisher.publish_event(error_event)
-            raise HTTPException(status_code=404, detail=str(e))
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        logger.error(f"Error al subir imagen: {str(e)}")
-        logger.error(traceback.format_exc())
         
+        # La tarea no existe, por lo que no hay fuente que consultar
+        error_event = await create_image_upload_failed_event(
+            task_id=task_id,
+            filename=file.filename,
+            error=e,
+            source=None,
+            format_str=format,
+            modality=modality,
+            region=region
+        )
+        
+        await publisher.publish_event(error_event)
+        raise
+    except ValueError:
+        raise
+    except Exception as e:
         # helper
         from ...modules.data_retrieval.application.events.event import create_image_upload_failed_event
         
@@ -341,7 +397,7 @@ async def api_upload_image(
             try:
                 async with uow:
                     retrieval_repository = uow.repository('retrieval')
-                    task = await retrieval_repository.get_by_id(uuid.UUID(task_id))
+                    task = await retrieval_repository.get_by_id(task_id)
                     if task:
                         source_name = task.source_metadata.source_name
             except Exception:
@@ -349,23 +405,23 @@ async def api_upload_image(
             
             # Create and publish error event
             error_event = await create_image_upload_failed_event(
-                task_id=uuid.UUID(task_id),
+                task_id=task_id,
                 filename=file.filename,
                 error=e,
                 source=source_name,
-                format_str=format.value,
+                format_str=format,
                 modality=modality,
                 region=region
             )
             
             await publisher.publish_event(error_event)
-            logger.info(f"Published ImageUploadFailed event for task {task_id}")
+            logger.info("Published ImageUploadFailed event for task %s", task_id)
         except Exception as event_error:
-            logger.error(f"Error publishing upload failed event: {str(event_error)}")
+            logger.error("Error publishing upload failed event: %s", event_error)
         
-        raise HTTPException(status_code=500, detail=str(e))
+        raise
 
-@router.get("/tasks", response_model=List[Dict[str, Any]])
+@router.get("/tasks", response_model=List[TaskResponse])
 async def api_get_tasks(
     source_id: Optional[str] = None,
     batch_id: Optional[str] = None,
@@ -374,116 +430,83 @@ async def api_get_tasks(
     uow = Depends(get_unit_of_work)
 ):
     """Obtiene tareas de recuperación con filtros opcionales"""
-    try:
-        if pending_only:
-            # Obtener tareas pendientes
-            handler = UoWGetPendingRetrievalTasksHandler(uow)
-            return await uow_get_pending_retrieval_tasks(handler)
-        elif source_id:
-            # Obtener tareas por fuente
-            handler = UoWGetTasksBySourceHandler(uow)
-            return await uow_get_tasks_by_source(handler, source_id, limit)
-        elif batch_id:
-            # Obtener tareas por lote
-            handler = UoWGetTasksByBatchHandler(uow)
-            return await uow_get_tasks_by_batch(handler, batch_id)
-        else:
-            # Se requiere al menos un filtro
-            raise HTTPException(
-                status_code=400, 
-                detail="Se requiere al menos un filtro: source_id, batch_id o pending_only"
-            )
-    except Exception as e:
-        logger.error(f"Error al obtener tareas: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    # Todos los filtros se combinan en una sola consulta
+    handler = UoWSearchTasksHandler(uow)
+    result = await uow_search_tasks(
+        handler,
+        source_id=source_id,
+        batch_id=batch_id,
+        pending=pending_only,
+        limit=limit
+    )
+    
+    # Validar la lista completa antes de responder para poder devolver un error limpio
+    return _list_response(TASKS_ADAPTER, list(result))
 
 
-@router.get("/tasks/{task_id}/images", response_model=List[Dict[str, Any]])
+@router.get("/tasks/{task_id}/images", response_model=List[ImageResponse])
 async def api_get_task_images(
-    task_id: str,
+    task_id: UUID,
     uow = Depends(get_unit_of_work)
 ):
     """Obtiene las imágenes asociadas a una tarea específica"""
-    try:
-        # Crear handler con UoW
-        handler = UoWGetImagesByTaskHandler(uow)
-        
-        # Ejecutar consulta usando UoW
-        result = await uow_get_images_by_task(
-            handler=handler,
-            task_id=uuid.UUID(task_id)
-        )
-        
-        return result
-    except ValueError:
-        raise HTTPException(status_code=400, detail=f"Invalid task ID: {task_id}")
-    except Exception as e:
-        logger.error(f"Error al obtener imágenes: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    # Crear handler con UoW
+    handler = UoWGetImagesByTaskHandler(uow)
+    
+    # Ejecutar consulta usando UoW
+    result = await uow_get_images_by_task(
+        handler=handler,
+        task_id=task_id
+    )
+    
+    return _list_response(IMAGES_ADAPTER, result)
 
 
-@router.post("/tasks/{task_id}/images/batch", response_model=Dict[str, Any])
+@router.post("/tasks/{task_id}/images/batch", response_model=StoredImageBatchResponse)
 async def api_upload_image_batch(
-    task_id: str,
+    task_id: UUID,
     files: List[UploadFile] = File(...),
-    metadata: List[Dict[str, Any]] = None,
+    metadata_json: str = Form(...),
     publisher = Depends(get_publisher),
     uow = Depends(get_unit_of_work)
 ):
     """Sube un lote de imágenes para una tarea específica"""
     
-    if not metadata or len(metadata) != len(files):
+    # Validar metadatos antes de empezar a leer los archivos; un
+    # ValidationError se responde como 400 por el manejador global
+    metadata = IMAGE_METADATA_ADAPTER.validate_json(metadata_json)
+    
+    if len(metadata) != len(files):
         raise HTTPException(
             status_code=400, 
             detail="Debe proporcionar metadatos para cada imagen y la misma cantidad de archivos y metadatos"
         )
     
-    try:
-        # Preparar datos de las imágenes
-        images_data = []
-        for i, file in enumerate(files):
-            # Leer el contenido del archivo
-            file_content = await file.read()
-            
-            # Obtener metadatos de la imagen
-            img_metadata = metadata[i]
-            format_str = img_metadata.get("format")
-            modality = img_metadata.get("modality")
-            region = img_metadata.get("region")
-            dimensions = img_metadata.get("dimensions")
-            
-            # Validar metadatos requeridos
-            if not all([format_str, modality, region]):
-                raise ValueError(f"Metadatos incompletos para la imagen {i+1}: {file.filename}")
-            
-            # Agregar datos de la imagen
-            images_data.append({
-                "file_content": file_content,
-                "filename": file.filename,
-                "format": format_str,
-                "modality": modality,
-                "region": region,
-                "dimensions": dimensions
-            })
-        
-        # Crear handler con UoW
-        handler = UoWStoreImageBatchHandler(
-            uow,
-            publisher
-        )
-        
-        # Ejecutar comando usando UoW
-        result = await uow_store_image_batch(
-            handler=handler,
-            task_id=uuid.UUID(task_id),
-            images=images_data
-        )
-        
-        return result
-    except ValueError as e:
-        if "No se encontró la tarea" in str(e):
-            raise HTTPException(status_code=404, detail=str(e))
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        logger.error(f"Error al subir lote de imágenes: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+    # Preparar datos de las imágenes; la lectura de cada archivo se
+    # solapa con las demás al escribirse de forma concurrente
+    images_data = [
+        {
+            "file_content": _iter_upload(file),
+            "filename": file.filename,
+            "format": img_metadata.format,
+            "modality": img_metadata.modality,
+            "region": img_metadata.region,
+            "dimensions": img_metadata.dimensions
+        }
+        for file, img_metadata in zip(files, metadata)
+    ]
+    
+    # Crear handler con UoW
+    handler = UoWStoreImageBatchHandler(
+        uow,
+        publisher
+    )
+    
+    # Ejecutar comando usando UoW
+    result = await uow_store_image_batch(
+        handler=handler,
+        task_id=task_id,
+        images=images_data
+    )
+    
+    return result
\ No newline at end of file
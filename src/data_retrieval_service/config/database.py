@@ -1,7 +1,7 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from contextlib import asynccontextmanager
+from fastapi import FastAPI
 import logging
 
 from .settings import get_settings
@@ -12,27 +12,54 @@ settings = get_settings()
 # Configurar logging
 logger = logging.getLogger(__name__)
 
-# Crear el motor de base de datos
-engine = create_async_engine(
-    settings.db_url,
-    echo=settings.environment == "dev",
-    future=True
-)
+Base = declarative_base()
 
-# Crear la sesión asíncrona
-async_session_factory = sessionmaker(
-    engine, 
-    class_=AsyncSession, 
-    expire_on_commit=False
-)
 
-Base = declarative_base()
+def _create_engine(url: str):
+    """Crea un motor asíncrono con la configuración de pool del servicio"""
+    return create_async_engine(
+        url,
+        echo=settings.environment == "dev",
+        future=True,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_recycle=settings.db_pool_recycle
+    )
+
+
+async def init_engine(app: FastAPI) -> None:
+    """Crea el motor y la fábrica de sesiones del proceso actual en el estado de la aplicación"""
+    engine = _create_engine(settings.db_url)
+    app.state.engine = engine
+    app.state.session_factory = async_sessionmaker(
+        engine,
+        expire_on_commit=False
+    )
+
+    # Las consultas usan transacciones READ ONLY, sobre la réplica si está configurada
+    read_url = settings.db_read_url
+    read_engine = _create_engine(read_url) if read_url else None
+    app.state.read_engine = read_engine
+    app.state.read_session_factory = async_sessionmaker(
+        (read_engine or engine).execution_options(postgresql_readonly=True),
+        expire_on_commit=False
+    )
+
+
+async def dispose_engine(app: FastAPI) -> None:
+    """Cierra las conexiones del pool de los motores de la aplicación"""
+    for name in ("read_engine", "engine"):
+        engine = getattr(app.state, name, None)
+        if engine is not None:
+            await engine.dispose()
 
 
-async def init_db():
+async def init_db(app: FastAPI):
     """Inicializa la base de datos"""    
     
-    async with engine.begin() as conn:
+    async with app.state.engine.begin() as conn:
         # En desarrollo, se pueden eliminar y recrear las tablas
         # if settings.environment == "dev":
         #    logger.info("Dropping all tables in development mode")
@@ -48,9 +75,9 @@ async def init_db():
 # Esta función se mantiene para compatibilidad con código existente y endpoints
 # que no han sido migrados al patrón UoW
 @asynccontextmanager
-async def get_db():
+async def get_db(app: FastAPI):
     """Provides an async database session"""
-    async with async_session_factory() as session:
+    async with app.state.session_factory() as session:
         try:
             yield session
         except Exception as e:
@@ -61,6 +88,6 @@ async def get_db():
 
 # Función para crear una nueva sesión de base de datos
 # Esta función se utiliza principalmente por el UnitOfWork
-def create_session() -> AsyncSession:
+def create_session(app: FastAPI) -> AsyncSession:
     """Creates a new database session"""
-    return async_session_factory()
\ No newline at end of file
+    return app.state.session_factory()
\ No newline at end of file
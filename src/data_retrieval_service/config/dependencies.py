@@ -1,39 +1,18 @@
 import logging
-from typing import Dict, Type, Optional
-from fastapi import Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Callable, Dict, Optional, Type
+from functools import partial
+from fastapi import FastAPI, Request
 
 from ..seedwork.infrastructure.uow import SqlAlchemyUnitOfWork
 from ..seedwork.domain.repositories import Repository
-from ..config.database import get_db, create_session
-from ..modules.data_retrieval.domain.repositories import RetrievalRepository, ImageRepository
 from ..modules.data_retrieval.infrastructure.persistence.repositories import SQLRetrievalRepository, SQLImageRepository
 from ..modules.data_retrieval.infrastructure.messaging.pulsar_publisher import PulsarPublisher
 
 logger = logging.getLogger(__name__)
 
-# Instancias singleton
-_publisher_instance = None
-_consumer_instance = None
-
-def setup_messaging(publisher: PulsarPublisher):
-    """Set up the messaging dependencies with the initialized publisher"""
-    global _publisher_instance
-    _publisher_instance = publisher
-    logger.info("Messaging dependencies initialized with publisher")
-
-def get_publisher():
-    """Returns the PulsarPublisher singleton"""
-    return _publisher_instance
-
-# Repository factories
-def get_retrieval_repository(db: AsyncSession = Depends(get_db)):
-    """Returns a RetrievalRepository implementation"""
-    return SQLRetrievalRepository(db)
-
-def get_image_repository(db: AsyncSession = Depends(get_db)):
-    """Returns an ImageRepository implementation"""
-    return SQLImageRepository(db)
+async def get_publisher(request: Request) -> PulsarPublisher:
+    """Returns the PulsarPublisher bound to the application state"""
+    return request.app.state.publisher
 
 # UnitOfWork related dependencies
 def get_repository_factories() -> Dict[str, Type[Repository]]:
@@ -43,18 +22,29 @@ def get_repository_factories() -> Dict[str, Type[Repository]]:
         'image': SQLImageRepository
     }
 
-def get_unit_of_work():
-    """Returns a new SqlAlchemyUnitOfWork instance"""
+def create_unit_of_work(app: FastAPI) -> SqlAlchemyUnitOfWork:
+    """Returns a new SqlAlchemyUnitOfWork instance bound to the application's session factory"""
     repositories_factories = get_repository_factories()
-    return SqlAlchemyUnitOfWork(create_session, repositories_factories)
+    return SqlAlchemyUnitOfWork(
+        app.state.session_factory,
+        repositories_factories,
+        read_session_factory=getattr(app.state, "read_session_factory", None)
+    )
+
+async def get_unit_of_work(request: Request):
+    """Yields a SqlAlchemyUnitOfWork for the current request, rolling back on failure"""
+    uow = create_unit_of_work(request.app)
+    try:
+        yield uow
+    except Exception:
+        await uow.rollback()
+        raise
 
-def create_consumer(settings):
+def create_consumer(app: FastAPI, settings, publisher: PulsarPublisher, on_state_change: Optional[Callable[[bool], None]] = None):
     """Creates a new PulsarConsumer instance"""
-    global _publisher_instance
-    
     # Importación tardía para evitar ciclos
     from ..modules.data_retrieval.infrastructure.messaging.pulsar_consumer import PulsarConsumer
-    from ..modules.data_retrieval.application.commands.command_handlers import command_handlers
+    from ..modules.data_retrieval.application.commands.command_handlers import HandlerRegistry
     
     consumer_config = {
         "receiver_queue_size": settings.pulsar_consumer_receive_queue_size,
@@ -66,21 +56,18 @@ def create_consumer(settings):
         service_url=settings.pulsar_service_url,
         subscription_name=settings.pulsar_subscription_name,
         topics=settings.pulsar_consumer_topics,
-        command_handlers=command_handlers,
+        command_handlers=HandlerRegistry(partial(create_unit_of_work, app), publisher),
         token=settings.pulsar_token,
         consumer_config=consumer_config,
-        publisher=_publisher_instance,
         max_workers=settings.pulsar_consumer_max_workers,
-        get_unit_of_work_func=get_unit_of_work
+        batch_size=settings.pulsar_consumer_batch_size,
+        batch_max_bytes=settings.pulsar_consumer_batch_max_bytes,
+        batch_timeout_ms=settings.pulsar_consumer_batch_timeout_ms,
+        on_state_change=on_state_change
     )
     
     return consumer
 
-def set_consumer(consumer):
-    """Sets the global consumer instance"""
-    global _consumer_instance
-    _consumer_instance = consumer
-
-def get_consumer():
-    """Returns the PulsarConsumer singleton"""
-    return _consumer_instance
\ No newline at end of file
+async def get_consumer(request: Request):
+    """Returns the PulsarConsumer bound to the application state"""
+    return request.app.state.consumer
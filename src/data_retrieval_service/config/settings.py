@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings
 from pydantic import Field
 from functools import lru_cache
@@ -17,6 +18,15 @@ class Settings(BaseSettings):
     db_user: str = Field(default="user")
     db_password: str = Field(default="password")
     db_name: str = Field(default="anonymization_db")
+    # Réplica para las consultas de solo lectura; vacío usa la base principal
+    db_read_host: str = Field(default="")
+
+    # Configuración del pool de conexiones
+    db_pool_size: int = Field(default=50)
+    db_max_overflow: int = Field(default=100)
+    db_pool_timeout: int = Field(default=30)
+    db_pool_pre_ping: bool = Field(default=False)
+    db_pool_recycle: int = Field(default=3600)
 
     @property
     def db_url(self) -> str:
@@ -26,17 +36,38 @@ class Settings(BaseSettings):
             f"postgresql+asyncpg://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}",
         )
 
+    @property
+    def db_read_url(self) -> Optional[str]:
+        """URL de conexión a la réplica de lectura, si está configurada"""
+        url = os.getenv("DATABASE_READ_URL")
+        if url:
+            return url
+        if self.db_read_host:
+            return f"postgresql+asyncpg://{self.db_user}:{self.db_password}@{self.db_read_host}:{self.db_port}/{self.db_name}"
+        return None
+
     # Configuración de Pulsar
     pulsar_service_url: str = Field(default="pulsar://pulsar-broker:6650")
     pulsar_token: str = Field(default="")
+    # Formato de los eventos publicados: "json" o "msgpack"
+    pulsar_event_encoding: str = Field(default="json")
+    
+    # Batching y compresión de los productores de eventos
+    pulsar_producer_batching_max_messages: int = Field(default=1000)
+    pulsar_producer_batching_max_publish_delay_ms: int = Field(default=5)
+    pulsar_producer_batching_max_allowed_size_in_bytes: int = Field(default=128 * 1024)
+    pulsar_producer_compression_type: str = Field(default="LZ4")
+    pulsar_publisher_max_workers: int = Field(default=16)
     
     # Nuevo: Configuración del consumidor de Pulsar
     pulsar_subscription_name: str = Field(default="data-retrieval-service")
     pulsar_consumer_topics: list = Field(default=["persistent://public/default/data-retrieval-commands"])
     pulsar_consumer_max_workers: int = Field(default=5)
-    pulsar_consumer_batch_size: int = Field(default=10)
+    pulsar_consumer_batch_size: int = Field(default=1000)
+    pulsar_consumer_batch_max_bytes: int = Field(default=10 * 1024 * 1024)
+    pulsar_consumer_batch_timeout_ms: int = Field(default=250)
     pulsar_consumer_flow_control_size: int = Field(default=100)
-    pulsar_consumer_receive_queue_size: int = Field(default=1000)
+    pulsar_consumer_receive_queue_size: int = Field(default=10000)
     
     # Mapeo de eventos a tópicos de Pulsar
     pulsar_event_topics_mapping: dict = Field(default={
@@ -45,6 +76,7 @@ class Settings(BaseSettings):
         "RetrievalFailed": "persistent://public/default/retrieval-failed",
         "ImagesRetrieved": "persistent://public/default/images-retrieved",
         "ImageReadyForAnonymization": "persistent://public/default/image-anonymization",
+        "ImagesReadyForAnonymization": "persistent://public/default/images-anonymization",
         "ImageUploadFailed": "persistent://public/default/image-upload-failed"
     })
 
@@ -55,6 +87,9 @@ class Settings(BaseSettings):
     
     # Configuración de almacenamiento de imágenes
     image_storage_path: str = Field(default="/tmp/data_retrieval_images")
+    image_upload_chunk_size: int = Field(default=1024 * 1024)
+    # Sincroniza y libera del page cache cada imagen escrita (hosts que comparten disco con Pulsar)
+    image_storage_direct: bool = Field(default=False)
     
     class Config:
         env_file = ".env"
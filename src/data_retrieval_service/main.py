@@ -3,20 +3,17 @@ import asyncio
 import time
 from typing import Dict
 import os
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+import orjson
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse, Response
 
 from .config.settings import get_settings
-from .config.database import init_db
-from .config.dependencies import (
-    setup_messaging, 
-    create_consumer, 
-    set_consumer,
-    get_consumer,
-    get_publisher
-)
+from .config.database import init_engine, init_db, dispose_engine
+from .config.dependencies import create_consumer
 from .modules.data_retrieval.infrastructure.messaging.pulsar_publisher import PulsarPublisher
+from .modules.data_retrieval.application.exceptions import TaskNotFound
 from .api import api_router
+from .api.middleware import StaticCORSMiddleware
 
 # Configurar logging
 logging.basicConfig(
@@ -32,95 +29,171 @@ settings = get_settings()
 app = FastAPI(
     title="Data Retrieval Service",
     description="Servicio para recuperación de imágenes médicas",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
-# Configurar CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Configurar CORS (política abierta con cabeceras precalculadas)
+app.add_middleware(StaticCORSMiddleware)
 
 # Configurar rutas de API
 app.include_router(api_router, prefix="/api")
 
+# Manejadores de errores compartidos por todos los endpoints
+@app.exception_handler(TaskNotFound)
+async def task_not_found_handler(request: Request, exc: TaskNotFound):
+    return ORJSONResponse(status_code=404, content={"detail": str(exc)})
+
+@app.exception_handler(ValueError)
+async def value_error_handler(request: Request, exc: ValueError):
+    return ORJSONResponse(status_code=400, content={"detail": str(exc)})
+
+@app.exception_handler(Exception)
+async def unhandled_error_handler(request: Request, exc: Exception):
+    logger.exception("Error no controlado en %s %s: %s", request.method, request.url.path, exc)
+    return ORJSONResponse(status_code=500, content={"detail": str(exc)})
+
 # Ruta por defecto
 @app.get("/")
 async def root():
     return {"message": "Data Retrieval Service API"}
 
+# Estado del consumidor, actualizado solo cuando este arranca o se detiene
+_CONSUMER_STATUS = {"state": "stopped"}
+
+def _set_consumer_status(running: bool):
+    _CONSUMER_STATUS["state"] = "running" if running else "stopped"
+
+# Respuestas de health check serializadas de antemano para cada estado
+_HEALTH_BODIES = {
+    state: orjson.dumps({
+        "status": "ok",
+        "service": "data-retrieval-service",
+        "version": "1.0.0",
+        "consumer_status": state
+    })
+    for state in ("starting", "running", "stopped")
+}
+
 # Endpoint de health check
 @app.get("/data-retrieval/health", tags=["health"])
 async def health_check():
     """Endpoint para verificar el estado del servicio"""
-    consumer = get_consumer()
-    consumer_status = "running" if consumer and consumer._is_running else "stopped"
-    
-    return {
-        "status": "ok",
-        "service": "data-retrieval-service",
-        "version": "1.0.0",
-        "consumer_status": consumer_status
-    }
+    return Response(content=_HEALTH_BODIES[_CONSUMER_STATUS["state"]], media_type="application/json")
+
+
+async def _init_database():
+    """Inicializa el motor y las tablas de la base de datos"""
+    try:
+        await init_engine(app)
+        await init_db(app)
+        logger.info("Base de datos inicializada correctamente")
+    except Exception as e:
+        logger.error("Error al inicializar la base de datos: %s", e)
+        raise
+
+
+async def _start_consumer(consumer):
+    """Inicia el consumidor de Pulsar sin retrasar la apertura del puerto HTTP"""
+    try:
+        await consumer.start()
+        logger.info("Consumidor de Pulsar iniciado correctamente")
+    except Exception as e:
+        _set_consumer_status(False)
+        logger.error("Error al iniciar el consumidor de Pulsar: %s", e)
+        logger.warning("Continuando sin procesamiento de comandos")
+
 
 # Inicialización de la aplicación
 @app.on_event("startup")
 async def startup_event():
     logger.info("Iniciando servicio de recuperación de datos")
     
-    # Inicializar la base de datos
-    try:
-        await init_db()
-        logger.info("Base de datos inicializada correctamente")
-    except Exception as e:
-        logger.error(f"Error al inicializar la base de datos: {str(e)}")
-        raise
+    # Estado de mensajería disponible aunque falle la inicialización
+    app.state.publisher = None
+    app.state.consumer = None
+    app.state.consumer_start_task = None
     
-    # Asegurarse de que exista el directorio de almacenamiento
-    os.makedirs(settings.image_storage_path, exist_ok=True)
+    # Programar la inicialización de la base de datos y la creación del directorio de
+    # almacenamiento (en un hilo); avanzan al esperarlas más abajo, a la vez que la
+    # creación de productores que lanza publisher.start()
+    db_task = asyncio.create_task(_init_database())
+    storage_task = asyncio.create_task(
+        asyncio.to_thread(os.makedirs, settings.image_storage_path, exist_ok=True)
+    )
     
     # Inicializar el publicador de Pulsar
+    consumer = None
     try:
         publisher = PulsarPublisher(
             service_url=settings.pulsar_service_url,
             topics_mapping=settings.pulsar_event_topics_mapping,
             token=settings.pulsar_token,
+            encoding=settings.pulsar_event_encoding,
+            producer_config={
+                "batching_max_messages": settings.pulsar_producer_batching_max_messages,
+                "batching_max_publish_delay_ms": settings.pulsar_producer_batching_max_publish_delay_ms,
+                "batching_max_allowed_size_in_bytes": settings.pulsar_producer_batching_max_allowed_size_in_bytes,
+                "compression_type": settings.pulsar_producer_compression_type,
+            },
+            max_workers=settings.pulsar_publisher_max_workers,
         )
         
+        # Iniciar el envío de eventos en segundo plano
+        publisher.start()
+        
         # Configurar dependencias
-        setup_messaging(publisher)
+        app.state.publisher = publisher
         logger.info("Publicador de Pulsar inicializado correctamente")
         
-        # Inicializar el consumidor de Pulsar
+        # Crear el consumidor de Pulsar
         if settings.pulsar_service_url and settings.pulsar_consumer_topics:
-            consumer = create_consumer(settings)
-            set_consumer(consumer)
-            
-            # Iniciar el consumidor asíncronamente
-            await consumer.start()
-            logger.info("Consumidor de Pulsar iniciado correctamente")
+            consumer = create_consumer(app, settings, publisher, on_state_change=_set_consumer_status)
+            app.state.consumer = consumer
         else:
             logger.warning("Pulsar consumer configuration missing, command processing disabled")
     except Exception as e:
-        logger.error(f"Error al inicializar la mensajería: {str(e)}")
+        logger.error("Error al inicializar la mensajería: %s", e)
         logger.warning("Continuando sin mensajería configurada")
+    
+    # El consumidor necesita la base de datos y el almacenamiento listos para procesar comandos
+    await asyncio.gather(db_task, storage_task)
+    
+    # Iniciar el consumidor en segundo plano; el health check reporta "starting" mientras tanto
+    if consumer:
+        _CONSUMER_STATUS["state"] = "starting"
+        app.state.consumer_start_task = asyncio.create_task(_start_consumer(consumer))
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Cerrando servicio de recuperación de datos")
     
+    # Cancelar el arranque del consumidor si aún no ha terminado
+    start_task = app.state.consumer_start_task
+    if start_task and not start_task.done():
+        start_task.cancel()
+    
     # Detener el consumidor de Pulsar
-    consumer = get_consumer()
+    consumer = app.state.consumer
     if consumer:
         try:
             await consumer.stop()
             logger.info("Consumidor de Pulsar detenido correctamente")
         except Exception as e:
-            logger.error(f"Error al detener el consumidor de Pulsar: {str(e)}")
+            logger.error("Error al detener el consumidor de Pulsar: %s", e)
+    
+    # Enviar los eventos pendientes antes de cerrar
+    publisher = app.state.publisher
+    if publisher:
+        try:
+            await publisher.stop()
+            publisher.close()
+        except Exception as e:
+            logger.error("Error al detener el publicador de Pulsar: %s", e)
+    
+    # Cerrar el pool de conexiones de la base de datos
+    await dispose_engine(app)
 
 
 # Configuración para ejecutar directamente
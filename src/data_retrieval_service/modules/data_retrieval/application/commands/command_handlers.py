@@ -1,9 +1,12 @@
+import binascii
 import logging
 import os
 import uuid
-from typing import Dict, Any, Optional
+from collections.abc import Mapping
+from typing import Dict, Any, Optional, Callable, Awaitable, Iterator
 
 from .compensation_commands import DeleteRetrievedImageCommand
+from .responses import response_to_dict
 from .....seedwork.infrastructure.uow import UnitOfWork
 from ...domain.value_objects import SourceType, RetrievalMethod, ImageFormat
 from ...infrastructure.messaging.pulsar_publisher import PulsarPublisher
@@ -20,6 +23,25 @@ from .....config.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
+# Valores constantes del cálculo de rutas de almacenamiento
+_IMAGE_ROOT = get_settings().image_storage_path
+_SOURCE_TYPE_DIR = {st: st.value.lower() for st in SourceType}
+
+# Tablas de búsqueda de enums por nombre
+_SOURCE_TYPES = SourceType.__members__
+_RETRIEVAL_METHODS = RetrievalMethod.__members__
+_IMAGE_FORMATS = ImageFormat.__members__
+
+
+def _parse_uuid(value: Any, field: str) -> uuid.UUID:
+    """Convierte un ID recibido en el comando a UUID; cualquier valor inválido produce un ValueError"""
+    if isinstance(value, str):
+        try:
+            return uuid.UUID(value)
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid {field} format: {value}")
+
 # Manejadores de comandos recibidos via Pulsar
 
 async def handle_create_retrieval_task(
@@ -40,7 +62,7 @@ async def handle_create_retrieval_task(
     Returns:
         Dict: Resultado de la operación
     """
-    logger.info(f"Processing CreateRetrievalTask command: {command_data}")
+    logger.info("Processing %s command: %s", "CreateRetrievalTask", command_data)
     
     try:
         # Crear handler con UoW
@@ -61,19 +83,14 @@ async def handle_create_retrieval_task(
             raise ValueError("Missing required command data fields")
         
         # Convertir enums
-        try:
-            source_type = SourceType[source_type_str]
-            retrieval_method = RetrievalMethod[retrieval_method_str]
-        except KeyError as e:
-            raise ValueError(f"Invalid enum value: {str(e)}")
+        source_type = _SOURCE_TYPES.get(source_type_str)
+        retrieval_method = _RETRIEVAL_METHODS.get(retrieval_method_str)
+        if source_type is None or retrieval_method is None:
+            invalid = source_type_str if source_type is None else retrieval_method_str
+            raise ValueError(f"Invalid enum value: '{invalid}'")
         
         # Crear ruta de almacenamiento
-        settings = get_settings()
-        storage_path = os.path.join(
-            settings.image_storage_path,
-            source_type.value.lower(),
-            batch_id
-        )
+        storage_path = os.path.join(_IMAGE_ROOT, _SOURCE_TYPE_DIR[source_type], batch_id)
         
         # Ejecutar comando usando UoW
         result = await uow_create_retrieval_task(
@@ -91,11 +108,11 @@ async def handle_create_retrieval_task(
         
         # Añadir correlation_id a la respuesta
         if correlation_id:
-            result["correlation_id"] = correlation_id
+            result.correlation_id = correlation_id
         
-        return result
+        return response_to_dict(result)
     except Exception as e:
-        logger.error(f"Error handling CreateRetrievalTask command: {str(e)}")
+        logger.error("Error handling %s command: %s", "CreateRetrievalTask", e)
         raise
 
 async def handle_start_retrieval_task(
@@ -116,7 +133,7 @@ async def handle_start_retrieval_task(
     Returns:
         Dict: Resultado de la operación
     """
-    logger.info(f"Processing StartRetrievalTask command: {command_data}")
+    logger.info("Processing %s command: %s", "StartRetrievalTask", command_data)
     
     try:
         # Crear handler con UoW
@@ -130,10 +147,7 @@ async def handle_start_retrieval_task(
             raise ValueError("Missing required command data fields: task_id")
         
         # Convertir ID a UUID
-        try:
-            task_id = uuid.UUID(task_id_str)
-        except ValueError:
-            raise ValueError(f"Invalid task_id format: {task_id_str}")
+        task_id = _parse_uuid(task_id_str, "task_id")
         
         # Ejecutar comando usando UoW
         result = await uow_start_retrieval_task(
@@ -143,11 +157,11 @@ async def handle_start_retrieval_task(
         
         # Añadir correlation_id a la respuesta
         if correlation_id:
-            result["correlation_id"] = correlation_id
+            result.correlation_id = correlation_id
         
-        return result
+        return response_to_dict(result)
     except Exception as e:
-        logger.error(f"Error handling StartRetrievalTask command: {str(e)}")
+        logger.error("Error handling %s command: %s", "StartRetrievalTask", e)
         raise
 
 async def handle_upload_image(
@@ -171,7 +185,7 @@ async def handle_upload_image(
         Dict: Resultado de la operación
     """
     logger.warning("UploadImage command received via Pulsar, which is not recommended for binary files")
-    logger.info(f"Processing UploadImage command for task: {command_data.get('task_id')}")
+    logger.info("Processing UploadImage command for task: %s", command_data.get('task_id'))
     
     try:
         # Crear handler con UoW
@@ -191,19 +205,15 @@ async def handle_upload_image(
             raise ValueError("Missing required command data fields")
         
         # Convertir UUID y enums
-        try:
-            task_id = uuid.UUID(task_id_str)
-            format_enum = ImageFormat[format_str]
-        except KeyError as e:
-            raise ValueError(f"Invalid enum value: {str(e)}")
-        except ValueError:
-            raise ValueError(f"Invalid task_id format: {task_id_str}")
+        format_enum = _IMAGE_FORMATS.get(format_str)
+        if format_enum is None:
+            raise ValueError(f"Invalid enum value: '{format_str}'")
+        task_id = _parse_uuid(task_id_str, "task_id")
         
         # Decodificar contenido del archivo (asumiendo base64)
-        import base64
         try:
-            file_content = base64.b64decode(file_content_b64)
-        except:
+            file_content = binascii.a2b_base64(file_content_b64)
+        except (binascii.Error, ValueError, TypeError):
             raise ValueError("Invalid file_content format, expected base64")
         
         # Ejecutar comando usando UoW
@@ -224,7 +234,7 @@ async def handle_upload_image(
         
         return result
     except Exception as e:
-        logger.error(f"Error handling UploadImage command: {str(e)}")
+        logger.error("Error handling %s command: %s", "UploadImage", e)
         raise
 
 command_handlers = {
@@ -251,7 +261,7 @@ async def handle_delete_retrieved_image(
     Returns:
         Dict: Resultado de la operación
     """
-    logger.info(f"Processing DeleteRetrievedImage command: {command_data}")
+    logger.info("Processing %s command: %s", "DeleteRetrievedImage", command_data)
     
     try:
         # Importar el handler (importación tardía para evitar referencias circulares)
@@ -267,11 +277,8 @@ async def handle_delete_retrieved_image(
             raise ValueError("Missing required command data fields: image_id, task_id")
         
         # Convertir IDs a UUID
-        try:
-            image_id = uuid.UUID(image_id_str)
-            task_id = uuid.UUID(task_id_str)
-        except ValueError:
-            raise ValueError(f"Invalid ID format: image_id={image_id_str}, task_id={task_id_str}")
+        image_id = _parse_uuid(image_id_str, "image_id")
+        task_id = _parse_uuid(task_id_str, "task_id")
         
         # Crear handler
         handler = DeleteRetrievedImageHandler(uow, publisher)
@@ -290,9 +297,113 @@ async def handle_delete_retrieved_image(
         
         return result
     except Exception as e:
-        logger.error(f"Error handling DeleteRetrievedImage command: {str(e)}")
+        logger.error("Error handling %s command: %s", "DeleteRetrievedImage", e)
+        raise
+
+async def handle_delete_retrieved_image_batch(
+    command_data: Dict[str, Any],
+    uow: UnitOfWork,
+    publisher: PulsarPublisher,
+    correlation_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Manejador para el comando DeleteRetrievedImageBatch recibido via Pulsar.
+    
+    Args:
+        command_data: Datos del comando
+        uow: Unidad de trabajo para transacciones
+        publisher: Publicador de eventos
+        correlation_id: ID de correlación opcional
+        
+    Returns:
+        Dict: Resultado de la operación
+    """
+    logger.info("Processing %s command: %s", "DeleteRetrievedImageBatch", command_data)
+    
+    try:
+        # Importar el handler (importación tardía para evitar referencias circulares)
+        from .compensation_commands import DeleteRetrievedImageBatchHandler, delete_retrieved_image_batch
+        
+        # Extraer datos del comando
+        image_id_strs = command_data.get('image_ids')
+        task_id_str = command_data.get('task_id')
+        reason = command_data.get('reason', "Compensación de saga")
+        
+        # Validar datos requeridos
+        if not image_id_strs or not task_id_str:
+            raise ValueError("Missing required command data fields: image_ids, task_id")
+        
+        # Convertir IDs a UUID
+        if not isinstance(image_id_strs, list):
+            raise ValueError(f"Invalid image_ids format: {image_id_strs}")
+        image_ids = [_parse_uuid(image_id_str, "image_id") for image_id_str in image_id_strs]
+        task_id = _parse_uuid(task_id_str, "task_id")
+        
+        # Crear handler
+        handler = DeleteRetrievedImageBatchHandler(uow, publisher)
+        
+        # Ejecutar comando
+        result = await delete_retrieved_image_batch(
+            handler=handler,
+            image_ids=image_ids,
+            task_id=task_id,
+            reason=reason
+        )
+        
+        # Añadir correlation_id a la respuesta
+        if correlation_id:
+            result["correlation_id"] = correlation_id
+        
+        return result
+    except Exception as e:
+        logger.error("Error handling %s command: %s", "DeleteRetrievedImageBatch", e)
         raise
 
 command_handlers.update({
     "DeleteRetrievedImage": handle_delete_retrieved_image,
-})
\ No newline at end of file
+    "DeleteRetrievedImageBatch": handle_delete_retrieved_image_batch,
+})
+
+
+class HandlerRegistry(Mapping):
+    """
+    Registro de manejadores de comandos construido una sola vez al iniciar el servicio.
+    Cada manejador queda ligado al publicador y a la fábrica de UnitOfWork,
+    de modo que el consumidor solo necesita el tipo de comando para despacharlo.
+    """
+
+    def __init__(
+        self,
+        uow_factory: Callable[[], UnitOfWork],
+        publisher: PulsarPublisher,
+        handlers: Optional[Dict[str, Callable]] = None
+    ):
+        self.uow_factory = uow_factory
+        self.publisher = publisher
+        self._dispatchers = {
+            command_type: self._bind(handler)
+            for command_type, handler in (handlers or command_handlers).items()
+        }
+
+    def _bind(self, handler: Callable) -> Callable[..., Awaitable[Dict[str, Any]]]:
+        """Liga un manejador a la fábrica de UnitOfWork y al publicador del registro"""
+        uow_factory = self.uow_factory
+        publisher = self.publisher
+
+        async def dispatch(command_data: Dict[str, Any], correlation_id: Optional[str] = None) -> Dict[str, Any]:
+            return await handler(command_data, uow_factory(), publisher, correlation_id)
+
+        return dispatch
+
+    def __getitem__(self, command_type: str) -> Callable[..., Awaitable[Dict[str, Any]]]:
+        return self._dispatchers[command_type]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._dispatchers)
+
+    def __len__(self) -> int:
+        return len(self._dispatchers)
+
+    def get(self, command_type: str, default=None) -> Optional[Callable[..., Awaitable[Dict[str, Any]]]]:
+        """Obtiene el manejador ligado para un tipo de comando"""
+        return self._dispatchers.get(command_type, default)
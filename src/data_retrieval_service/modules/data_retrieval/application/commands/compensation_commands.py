@@ -1,27 +1,36 @@
 # src/data_retrieval_service/modules/data_retrieval/application/commands/compensation_commands.py
 from dataclasses import dataclass
+import asyncio
 import logging
-import os
 import uuid
 import shutil
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 from .....seedwork.application.commands import Command, CommandHandler
 from .....seedwork.infrastructure.uow import UnitOfWork
 from ...domain.repositories import RetrievalRepository, ImageRepository
 from ...domain.value_objects import RetrievalStatus
 from ...infrastructure.messaging.pulsar_publisher import PulsarPublisher
+from ..exceptions import TaskNotFound
 from ...domain.events import ImageDeletionCompleted, ImageDeletionFailed
+from .storage import remove_files
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class DeleteRetrievedImageCommand(Command):
     """Comando para eliminar una imagen recuperada como compensación"""
     image_id: uuid.UUID
     task_id: uuid.UUID
     reason: str = "Compensación de saga"
 
+@dataclass(frozen=True, slots=True)
+class DeleteRetrievedImageBatchCommand(Command):
+    """Comando para eliminar un lote de imágenes recuperadas de una tarea como compensación"""
+    image_ids: List[uuid.UUID]
+    task_id: uuid.UUID
+    reason: str = "Compensación de saga"
+
 class DeleteRetrievedImageHandler(CommandHandler):
     """Manejador para el comando DeleteRetrievedImage"""
     
@@ -44,45 +53,39 @@ class DeleteRetrievedImageHandler(CommandHandler):
                 # Obtener la tarea
                 task = await task_repository.get_by_id(command.task_id)
                 if not task:
-                    raise ValueError(f"No se encontró la tarea con ID: {command.task_id}")
+                    raise TaskNotFound(f"No se encontró la tarea con ID: {command.task_id}")
                 
-                # 1. Eliminar el archivo físico
+                # 1. Eliminar el archivo físico fuera del event loop
                 file_path = image.file_path
-                if file_path and os.path.exists(file_path):
-                    try:
-                        os.remove(file_path)
-                        logger.info(f"Archivo eliminado: {file_path}")
-                    except Exception as e:
-                        logger.error(f"Error al eliminar archivo {file_path}: {str(e)}")
-                        raise
+                if file_path and await asyncio.to_thread(remove_files, [file_path]):
+                    logger.info("Archivo eliminado: %s", file_path)
                 
-                # 2. Actualizar el estado de la imagen a "eliminada"
-                await image_repository.update_image_status(image.id, is_stored=False)
+                # 2. Marcar la imagen como "eliminada" y contar las que quedan almacenadas
+                remaining_images = await image_repository.mark_deleted_and_count_remaining(image.id, task.id)
                 
                 # 3. Si no quedan más imágenes, actualizar el estado de la tarea
-                images_count = await image_repository.get_images_count_by_task(task.id)
-                if images_count <= 1:  # <= 1 porque aún no hemos eliminado realmente la imagen de la BD
+                events = []
+                if remaining_images == 0:
                     # Marcar la tarea como fallida por compensación
-                    fail_event = task.fail_retrieval(
+                    events.append(task.fail_retrieval(
                         error_message=f"Tarea fallida por compensación de saga: {command.reason}"
-                    )
+                    ))
                     await task_repository.update(task)
-                    await self.publisher.publish_event(fail_event)
-                    logger.info(f"Tarea {task.id} marcada como fallida por compensación")
+                    logger.info("Tarea %s marcada como fallida por compensación", task.id)
                 
                 # 4. Crear evento de finalización de compensación
-                completion_event = ImageDeletionCompleted(
+                events.append(ImageDeletionCompleted(
                     image_id=command.image_id,
                     task_id=command.task_id,
                     reason=command.reason
-                )
-                
-                # Publicar evento
-                await self.publisher.publish_event(completion_event)
+                ))
                 
-                # Confirmar transacción
+                # Confirmar la transacción
                 await self.uow.commit()
                 
+                # Encolar la publicación de los eventos una vez confirmada la transacción
+                self.publisher.enqueue_events(events)
+                
                 return {
                     "image_id": str(command.image_id),
                     "task_id": str(command.task_id),
@@ -91,7 +94,7 @@ class DeleteRetrievedImageHandler(CommandHandler):
                 }
                 
             except Exception as e:
-                logger.error(f"Error al eliminar imagen: {str(e)}")
+                logger.error("Error al eliminar imagen: %s", e)
                 
                 # Publicar evento de fallo
                 failure_event = ImageDeletionFailed(
@@ -104,7 +107,103 @@ class DeleteRetrievedImageHandler(CommandHandler):
                 try:
                     await self.publisher.publish_event(failure_event)
                 except Exception as pub_error:
-                    logger.error(f"Error al publicar evento de fallo: {str(pub_error)}")
+                    logger.error("Error al publicar evento de fallo: %s", pub_error)
+                
+                # No es necesario hacer rollback explícito ya que el context manager lo hará
+                raise e
+
+
+class DeleteRetrievedImageBatchHandler(CommandHandler):
+    """Manejador para el comando DeleteRetrievedImageBatch"""
+    
+    def __init__(self, uow: UnitOfWork, publisher: PulsarPublisher):
+        self.uow = uow
+        self.publisher = publisher
+
+    async def handle(self, command: DeleteRetrievedImageBatchCommand) -> Dict[str, Any]:
+        async with self.uow:
+            try:
+                # Obtener repositorios
+                image_repository = self.uow.repository('image')
+                task_repository = self.uow.repository('retrieval')
+                
+                # Obtener la tarea
+                task = await task_repository.get_by_id(command.task_id)
+                if not task:
+                    raise TaskNotFound(f"No se encontró la tarea con ID: {command.task_id}")
+                
+                # Obtener las imágenes del lote con una sola consulta
+                image_ids = set(command.image_ids)
+                images = [
+                    image for image in await image_repository.get_images_by_task(task.id)
+                    if image.id in image_ids
+                ]
+                if len(images) != len(image_ids):
+                    missing = image_ids - {image.id for image in images}
+                    raise ValueError(f"No se encontraron las imágenes con ID: {', '.join(map(str, missing))}")
+                
+                # 1. Eliminar los archivos físicos fuera del event loop
+                removed = await asyncio.to_thread(
+                    remove_files, [image.file_path for image in images if image.file_path]
+                )
+                logger.info("Archivos eliminados de la tarea %s: %d", task.id, removed)
+                
+                # 2. Marcar las imágenes como "eliminadas" y contar las que quedan almacenadas
+                remaining_images = await image_repository.mark_batch_deleted_and_count_remaining(
+                    list(image_ids), task.id
+                )
+                
+                # 3. Si no quedan más imágenes, actualizar el estado de la tarea
+                events = []
+                if remaining_images == 0:
+                    # Marcar la tarea como fallida por compensación
+                    events.append(task.fail_retrieval(
+                        error_message=f"Tarea fallida por compensación de saga: {command.reason}"
+                    ))
+                    await task_repository.update(task)
+                    logger.info("Tarea %s marcada como fallida por compensación", task.id)
+                
+                # 4. Crear eventos de finalización de compensación
+                events.extend(
+                    ImageDeletionCompleted(
+                        image_id=image.id,
+                        task_id=command.task_id,
+                        reason=command.reason
+                    )
+                    for image in images
+                )
+                
+                # Confirmar la transacción
+                await self.uow.commit()
+                
+                # Encolar la publicación de los eventos una vez confirmada la transacción
+                self.publisher.enqueue_events(events)
+                
+                return {
+                    "image_ids": [str(image.id) for image in images],
+                    "task_id": str(command.task_id),
+                    "status": "DELETED",
+                    "reason": command.reason
+                }
+                
+            except Exception as e:
+                logger.error("Error al eliminar lote de imágenes: %s", e)
+                
+                # Publicar eventos de fallo
+                failure_events = [
+                    ImageDeletionFailed(
+                        image_id=image_id,
+                        task_id=command.task_id,
+                        error_message=str(e),
+                        reason=command.reason
+                    )
+                    for image_id in command.image_ids
+                ]
+                
+                try:
+                    await self.publisher.publish_events(failure_events)
+                except Exception as pub_error:
+                    logger.error("Error al publicar eventos de fallo: %s", pub_error)
                 
                 # No es necesario hacer rollback explícito ya que el context manager lo hará
                 raise e
@@ -123,4 +222,19 @@ async def delete_retrieved_image(
         task_id=task_id,
         reason=reason
     )
-    return await handler.handle(command)
\ No newline at end of file
+    return await handler.handle(command)
+
+
+async def delete_retrieved_image_batch(
+    handler: DeleteRetrievedImageBatchHandler,
+    image_ids: List[uuid.UUID],
+    task_id: uuid.UUID,
+    reason: str = "Compensación de saga"
+) -> Dict[str, Any]:
+    """Ejecuta el comando DeleteRetrievedImageBatch"""
+    command = DeleteRetrievedImageBatchCommand(
+        image_ids=image_ids,
+        task_id=task_id,
+        reason=reason
+    )
+    return await handler.handle(command)
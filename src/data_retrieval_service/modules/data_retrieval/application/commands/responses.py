@@ -0,0 +1,64 @@
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+
+@dataclass(slots=True)
+class CreateTaskResponse:
+    """Resultado del comando CreateRetrievalTask"""
+    task_id: str
+    batch_id: str
+    source: str
+    status: str
+    correlation_id: Optional[str] = None
+
+
+@dataclass(slots=True)
+class StartTaskResponse:
+    """Resultado del comando StartRetrievalTask"""
+    task_id: str
+    batch_id: str
+    source: str
+    status: str
+    started_at: Optional[str] = None
+    correlation_id: Optional[str] = None
+
+
+@dataclass(slots=True)
+class CompleteTaskResponse:
+    """Resultado del comando CompleteRetrievalTask"""
+    task_id: str
+    batch_id: str
+    source: str
+    status: str
+    successful_images: int
+    failed_images: int
+    total_images: int
+    completed_at: Optional[str] = None
+    correlation_id: Optional[str] = None
+
+
+@dataclass(slots=True)
+class FailTaskResponse:
+    """Resultado del comando FailRetrievalTask"""
+    task_id: str
+    batch_id: str
+    source: str
+    status: str
+    error_message: str
+    completed_at: Optional[str] = None
+    correlation_id: Optional[str] = None
+
+
+@lru_cache(maxsize=None)
+def _field_names(response_type: type) -> Tuple[str, ...]:
+    """Nombres de los campos de una respuesta, calculados una sola vez por clase"""
+    return tuple(f.name for f in fields(response_type))
+
+
+def response_to_dict(response) -> Dict[str, Any]:
+    """
+    Convierte una respuesta a diccionario. Los campos son escalares, por lo que basta
+    una copia superficial en lugar de la conversión recursiva de dataclasses.asdict.
+    """
+    return {name: getattr(response, name) for name in _field_names(type(response))}
@@ -0,0 +1,136 @@
+from collections import defaultdict
+from functools import lru_cache
+from typing import AsyncIterator, Iterable, List, Union
+import asyncio
+import logging
+import os
+
+from .....config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+_HAS_FADVISE = hasattr(os, "posix_fadvise")
+_STORAGE_DIRECT = get_settings().image_storage_direct and _HAS_FADVISE
+
+# Tamaño a partir del cual una imagen se saca del page cache tras escribirla
+_FADVISE_MIN_BYTES = 1 << 20
+
+
+def _should_release(size_bytes: int) -> bool:
+    """Indica si conviene liberar del page cache un archivo recién escrito"""
+    return _STORAGE_DIRECT or (_HAS_FADVISE and size_bytes >= _FADVISE_MIN_BYTES)
+
+
+def _release_page_cache(fd: int, size_bytes: int) -> None:
+    """
+    Descarta del page cache las páginas de una imagen recién escrita, que este
+    proceso no vuelve a leer. En modo directo fuerza antes los datos a disco,
+    para que el writeback no compita con el journal de Pulsar en el mismo host.
+    """
+    if _STORAGE_DIRECT:
+        os.fdatasync(fd)
+    os.posix_fadvise(fd, 0, size_bytes, os.POSIX_FADV_DONTNEED)
+
+
+def _write_all(fd: int, data) -> int:
+    """Escribe un buffer completo en un descriptor sin copiarlo a un buffer intermedio"""
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+    return len(data)
+
+
+def _write_bytes(file_path: str, file_content: bytes) -> int:
+    """Escribe un buffer completo en disco (bloqueante) y retorna los bytes escritos"""
+    fd = os.open(file_path, _WRITE_FLAGS, 0o644)
+    try:
+        size_bytes = _write_all(fd, file_content)
+        if _should_release(size_bytes):
+            _release_page_cache(fd, size_bytes)
+        return size_bytes
+    finally:
+        os.close(fd)
+
+
+def safe_filename(filename: str) -> str:
+    """Valida que el nombre de archivo no pueda salir del directorio de la tarea"""
+    if not filename or filename in ('.', '..') or os.sep in filename or (os.altsep and os.altsep in filename):
+        raise ValueError(f"Nombre de archivo inválido: {filename}")
+    return filename
+
+
+async def write_image(file_path: str, file_content: Union[bytes, AsyncIterator[bytes]]) -> int:
+    """
+    Escribe la imagen en disco fuera del hilo del event loop,
+    aceptando bytes o un iterador asíncrono de fragmentos.
+    Retorna el tamaño escrito para evitar consultar el archivo después.
+    """
+    if isinstance(file_content, (bytes, bytearray, memoryview)):
+        return await asyncio.to_thread(_write_bytes, file_path, file_content)
+
+    size_bytes = 0
+    fd = await asyncio.to_thread(os.open, file_path, _WRITE_FLAGS, 0o644)
+    try:
+        async for chunk in file_content:
+            size_bytes += await asyncio.to_thread(_write_all, fd, chunk)
+        if _should_release(size_bytes):
+            await asyncio.to_thread(_release_page_cache, fd, size_bytes)
+    finally:
+        await asyncio.to_thread(os.close, fd)
+    return size_bytes
+
+
+@lru_cache(maxsize=4096)
+def ensure_directory(path: str) -> None:
+    """
+    Crea el directorio si no existe, recordando los ya creados en este proceso
+    para no repetir las llamadas al sistema en cada imagen de la misma tarea.
+    """
+    os.makedirs(path, exist_ok=True)
+
+
+def _unlink_in_dir(dir_path: str, filenames: List[str]) -> int:
+    """Elimina archivos de un mismo directorio resolviendo la ruta del directorio una sola vez"""
+    removed = 0
+    dir_fd = os.open(dir_path, os.O_RDONLY | os.O_DIRECTORY | os.O_CLOEXEC)
+    try:
+        for filename in filenames:
+            try:
+                os.unlink(filename, dir_fd=dir_fd)
+                removed += 1
+            except FileNotFoundError:
+                logger.warning("Archivo no encontrado, se omite su eliminación: %s", os.path.join(dir_path, filename))
+    finally:
+        os.close(dir_fd)
+    return removed
+
+
+def remove_files(file_paths: Iterable[str]) -> int:
+    """
+    Elimina un lote de archivos (bloqueante), agrupándolos por directorio para
+    usar unlink relativo a un descriptor del directorio cuando la plataforma lo permite.
+    Los archivos que ya no existen se omiten. Retorna la cantidad eliminada.
+    """
+    by_dir = defaultdict(list)
+    for file_path in file_paths:
+        dir_path, filename = os.path.split(file_path)
+        by_dir[dir_path].append(filename)
+
+    removed = 0
+    for dir_path, filenames in by_dir.items():
+        if os.unlink in os.supports_dir_fd and hasattr(os, "O_DIRECTORY"):
+            try:
+                removed += _unlink_in_dir(dir_path, filenames)
+            except FileNotFoundError:
+                logger.warning("Directorio no encontrado, se omite su limpieza: %s", dir_path)
+            continue
+
+        for filename in filenames:
+            try:
+                os.remove(os.path.join(dir_path, filename))
+                removed += 1
+            except FileNotFoundError:
+                logger.warning("Archivo no encontrado, se omite su eliminación: %s", os.path.join(dir_path, filename))
+    return removed
@@ -1,7 +1,8 @@
 from dataclasses import dataclass
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, AsyncIterator, Callable, Union
 import uuid
 import os
+import asyncio
 import shutil
 from datetime import datetime
 
@@ -18,6 +19,7 @@ from ...domain.value_objects import (
     RetrievalStatus
 )
 from ...infrastructure.messaging.pulsar_publisher import PulsarPublisher
+from ..exceptions import TaskNotFound
 
 # Reutilizamos las definiciones de comandos existentes
 from .commands import (
@@ -28,6 +30,8 @@ from .commands import (
     StoreImage,
     StoreImageBatch
 )
+from .storage import ensure_directory, safe_filename, write_image
+from .responses import CreateTaskResponse, StartTaskResponse, CompleteTaskResponse, FailTaskResponse
 
 
 class UoWCreateRetrievalTaskHandler(CommandHandler):
@@ -37,186 +41,156 @@ class UoWCreateRetrievalTaskHandler(CommandHandler):
         self.uow = uow
         self.publisher = publisher
 
-    async def handle(self, command: CreateRetrievalTask) -> Dict[str, Any]:
-        async with self.uow:
-            try:
-                # Obtener repositorio de tareas
-                retrieval_repository = self.uow.repository('retrieval')
-                
-                # Crear metadata de origen
-                source_metadata = SourceMetadata(
-                    source_type=command.source_type,
-                    source_name=command.source_name,
-                    source_id=command.source_id,
-                    location=command.location,
-                    retrieval_method=command.retrieval_method
-                )
+    async def handle(self, command: CreateRetrievalTask) -> CreateTaskResponse:
+        # Construir las entidades antes de abrir la unidad de trabajo,
+        # ya que no requieren acceso a la base de datos
+        source_metadata = SourceMetadata(
+            source_type=command.source_type,
+            source_name=command.source_name,
+            source_id=command.source_id,
+            location=command.location,
+            retrieval_method=command.retrieval_method
+        )
+
+        task = RetrievalTask(
+            source_metadata=source_metadata,
+            batch_id=command.batch_id,
+            priority=command.priority,
+            storage_path=command.storage_path,
+            metadata=command.metadata or {}
+        )
 
-                # Crear tarea de recuperación
-                task = RetrievalTask(
-                    source_metadata=source_metadata,
-                    batch_id=command.batch_id,
-                    priority=command.priority,
-                    storage_path=command.storage_path,
-                    metadata=command.metadata or {}
-                )
-
-                # Guardar la tarea en el repositorio
-                await retrieval_repository.save(task)
-                
-                # Confirmar la transacción
-                await self.uow.commit()
-
-                # Retornar información de la tarea creada
-                return {
-                    "task_id": str(task.id),
-                    "batch_id": task.batch_id,
-                    "source": task.source_metadata.source_name,
-                    "status": "PENDING"
-                }
-            except Exception as e:
-                # No es necesario hacer rollback explícito ya que el context manager lo hará
-                raise e
-
-
-class UoWStartRetrievalTaskHandler(CommandHandler):
-    """Manejador para el comando StartRetrievalTask usando UoW"""
+        async with self.uow:
+            # Obtener repositorio de tareas
+            retrieval_repository = self.uow.repository('retrieval')
+
+            # Guardar la tarea en el repositorio
+            await retrieval_repository.save(task)
+            
+            # Confirmar la transacción
+            await self.uow.commit()
+
+            # Retornar información de la tarea creada
+            return CreateTaskResponse(
+                task_id=str(task.id),
+                batch_id=task.batch_id,
+                source=task.source_metadata.source_name,
+                status="PENDING"
+            )
+
+
+class UoWTaskTransitionHandler(CommandHandler):
+    """
+    Base para los manejadores que cambian el estado de una tarea existente usando UoW.
+    Concentra la secuencia obtener tarea / aplicar transición / actualizar / confirmar / publicar.
+    """
     
     def __init__(self, uow: UnitOfWork, publisher: PulsarPublisher):
         self.uow = uow
         self.publisher = publisher
 
-    async def handle(self, command: StartRetrievalTask) -> Dict[str, Any]:
+    async def _mutate_and_commit(
+        self,
+        task_id: uuid.UUID,
+        mutate: Callable[[RetrievalTask], Any]
+    ) -> RetrievalTask:
+        """
+        Aplica una transición a la tarea dentro de una transacción y publica sus eventos.
+        
+        Args:
+            task_id: ID de la tarea a modificar
+            mutate: Función que aplica la transición sobre la tarea
+            
+        Returns:
+            RetrievalTask: La tarea ya actualizada
+        """
         async with self.uow:
-            try:
-                # Obtener repositorio de tareas
-                retrieval_repository = self.uow.repository('retrieval')
-                
-                # Obtener la tarea del repositorio
-                task = await retrieval_repository.get_by_id(command.task_id)
-                if not task:
-                    raise ValueError(f"No se encontró la tarea con ID: {command.task_id}")
-
-                # Asegurarnos que existe el directorio de almacenamiento
-                os.makedirs(task.storage_path, exist_ok=True)
-
-                # Iniciar la tarea
-                event = task.start_retrieval()
-                
-                # Publicar evento de inicio
-                await self.publisher.publish_event(event)
-                
-                # Actualizar la tarea en el repositorio
-                await retrieval_repository.update(task)
-                
-                # Confirmar la transacción
-                await self.uow.commit()
-
-                return {
-                    "task_id": str(task.id),
-                    "batch_id": task.batch_id,
-                    "source": task.source_metadata.source_name,
-                    "status": "IN_PROGRESS",
-                    "started_at": task.started_at.isoformat() if task.started_at else None
-                }
-            except Exception as e:
-                # No es necesario hacer rollback explícito ya que el context manager lo hará
-                raise e
-
-
-class UoWCompleteRetrievalTaskHandler(CommandHandler):
+            # Obtener repositorio de tareas
+            retrieval_repository = self.uow.repository('retrieval')
+            
+            # Obtener la tarea del repositorio bloqueando su fila hasta confirmar
+            task = await retrieval_repository.get_for_update(task_id)
+            if not task:
+                raise TaskNotFound(f"No se encontró la tarea con ID: {task_id}")
+
+            # Aplicar la transición de estado
+            mutate(task)
+            
+            # Actualizar la tarea en el repositorio
+            await retrieval_repository.update(task)
+            
+            # Confirmar la transacción
+            await self.uow.commit()
+
+            # Encolar la publicación de los eventos una vez confirmada la transacción
+            self.publisher.enqueue_events(task.events)
+            task.clear_events()
+
+            return task
+
+
+class UoWStartRetrievalTaskHandler(UoWTaskTransitionHandler):
+    """Manejador para el comando StartRetrievalTask usando UoW"""
+
+    async def handle(self, command: StartRetrievalTask) -> StartTaskResponse:
+        def start(task: RetrievalTask):
+            # Asegurarnos que existe el directorio de almacenamiento
+            ensure_directory(task.storage_path)
+            task.start_retrieval()
+
+        task = await self._mutate_and_commit(command.task_id, start)
+        return StartTaskResponse(
+            task_id=str(task.id),
+            batch_id=task.batch_id,
+            source=task.source_metadata.source_name,
+            status="IN_PROGRESS",
+            started_at=task.started_at.isoformat() if task.started_at else None
+        )
+
+
+class UoWCompleteRetrievalTaskHandler(UoWTaskTransitionHandler):
     """Manejador para el comando CompleteRetrievalTask usando UoW"""
-    
-    def __init__(self, uow: UnitOfWork, publisher: PulsarPublisher):
-        self.uow = uow
-        self.publisher = publisher
 
-    async def handle(self, command: CompleteRetrievalTask) -> Dict[str, Any]:
-        async with self.uow:
-            try:
-                # Obtener repositorio de tareas
-                retrieval_repository = self.uow.repository('retrieval')
-                
-                # Obtener la tarea del repositorio
-                task = await retrieval_repository.get_by_id(command.task_id)
-                if not task:
-                    raise ValueError(f"No se encontró la tarea con ID: {command.task_id}")
-
-                # Completar la tarea
-                event = task.complete_retrieval(
-                    successful_images=command.successful_images,
-                    failed_images=command.failed_images,
-                    details=command.details
-                )
-                
-                # Publicar evento de completado
-                await self.publisher.publish_event(event)
-                
-                # Actualizar la tarea en el repositorio
-                await retrieval_repository.update(task)
-                
-                # Confirmar la transacción
-                await self.uow.commit()
-
-                return {
-                    "task_id": str(task.id),
-                    "batch_id": task.batch_id,
-                    "source": task.source_metadata.source_name,
-                    "status": "COMPLETED",
-                    "successful_images": command.successful_images,
-                    "failed_images": command.failed_images,
-                    "total_images": command.successful_images + command.failed_images,
-                    "completed_at": task.completed_at.isoformat() if task.completed_at else None
-                }
-            except Exception as e:
-                # No es necesario hacer rollback explícito ya que el context manager lo hará
-                raise e
-
-
-class UoWFailRetrievalTaskHandler(CommandHandler):
+    async def handle(self, command: CompleteRetrievalTask) -> CompleteTaskResponse:
+        task = await self._mutate_and_commit(
+            command.task_id,
+            lambda task: task.complete_retrieval(
+                successful_images=command.successful_images,
+                failed_images=command.failed_images,
+                details=command.details
+            )
+        )
+        return CompleteTaskResponse(
+            task_id=str(task.id),
+            batch_id=task.batch_id,
+            source=task.source_metadata.source_name,
+            status="COMPLETED",
+            successful_images=command.successful_images,
+            failed_images=command.failed_images,
+            total_images=command.successful_images + command.failed_images,
+            completed_at=task.completed_at.isoformat() if task.completed_at else None
+        )
+
+
+class UoWFailRetrievalTaskHandler(UoWTaskTransitionHandler):
     """Manejador para el comando FailRetrievalTask usando UoW"""
-    
-    def __init__(self, uow: UnitOfWork, publisher: PulsarPublisher):
-        self.uow = uow
-        self.publisher = publisher
 
-    async def handle(self, command: FailRetrievalTask) -> Dict[str, Any]:
-        async with self.uow:
-            try:
-                # Obtener repositorio de tareas
-                retrieval_repository = self.uow.repository('retrieval')
-                
-                # Obtener la tarea del repositorio
-                task = await retrieval_repository.get_by_id(command.task_id)
-                if not task:
-                    raise ValueError(f"No se encontró la tarea con ID: {command.task_id}")
-
-                # Marcar la tarea como fallida
-                event = task.fail_retrieval(
-                    error_message=command.error_message,
-                    details=command.details
-                )
-                
-                # Publicar evento de falla
-                await self.publisher.publish_event(event)
-                
-                # Actualizar la tarea en el repositorio
-                await retrieval_repository.update(task)
-                
-                # Confirmar la transacción
-                await self.uow.commit()
-
-                return {
-                    "task_id": str(task.id),
-                    "batch_id": task.batch_id,
-                    "source": task.source_metadata.source_name,
-                    "status": "FAILED",
-                    "error_message": command.error_message,
-                    "completed_at": task.completed_at.isoformat() if task.completed_at else None
-                }
-            except Exception as e:
-                # No es necesario hacer rollback explícito ya que el context manager lo hará
-                raise e
+    async def handle(self, command: FailRetrievalTask) -> FailTaskResponse:
+        task = await self._mutate_and_commit(
+            command.task_id,
+            lambda task: task.fail_retrieval(
+                error_message=command.error_message,
+                details=command.details
+            )
+        )
+        return FailTaskResponse(
+            task_id=str(task.id),
+            batch_id=task.batch_id,
+            source=task.source_metadata.source_name,
+            status="FAILED",
+            error_message=command.error_message,
+            completed_at=task.completed_at.isoformat() if task.completed_at else None
+        )
 
 
 class UoWStoreImageHandler(CommandHandler):
@@ -228,80 +202,69 @@ class UoWStoreImageHandler(CommandHandler):
 
     async def handle(self, command: StoreImage) -> Dict[str, Any]:
         async with self.uow:
-            try:
-                # Obtener repositorios
-                retrieval_repository = self.uow.repository('retrieval')
-                image_repository = self.uow.repository('image')
-                
-                # Obtener la tarea
-                task = await retrieval_repository.get_by_id(command.task_id)
-                if not task:
-                    raise ValueError(f"No se encontró la tarea con ID: {command.task_id}")
-
-                # Asegurarse que existe el directorio de la tarea
-                task_dir = os.path.join(task.storage_path, str(task.id))
-                os.makedirs(task_dir, exist_ok=True)
-                
-                # Generar ruta completa para la imagen
-                filename = command.filename
-                file_path = os.path.join(task_dir, filename)
-                
-                # Escribir la imagen en el disco
-                with open(file_path, 'wb') as f:
-                    f.write(command.file_content)
-                
-                # Calcular tamaño del archivo
-                size_bytes = os.path.getsize(file_path)
-                
-                # Crear metadatos de imagen
-                image_metadata = ImageMetadata(
-                    format=command.format,
-                    modality=command.modality,
-                    region=command.region,
-                    size_bytes=size_bytes,
-                    dimensions=command.dimensions
-                )
-
-                # Crear entidad de imagen
-                image = ImageData(
-                    metadata=image_metadata,
-                    filename=filename,
-                    file_path=file_path,
-                    size_bytes=size_bytes,
-                    is_stored=True
-                )
-
-                # Añadir la imagen a la tarea
-                task.add_image(image)
-                
-                # Guardar la imagen en el repositorio
-                await image_repository.save(image, task.id)
-                            
-                # Notificar que la imagen está lista para anonimización
-                task.notify_images_retrieved([image])
-
-                # Publicar eventos
-                for event in task.events:
-                    await self.publisher.publish_event(event)
-
-                # Actualizar la tarea en el repositorio
-                await retrieval_repository.update(task)
-                
-                # Confirmar la transacción
-                await self.uow.commit()
-
-                return {
-                    "task_id": str(task.id),
-                    "image_id": str(image.id),
-                    "filename": image.filename,
-                    "file_path": image.file_path,
-                    "modality": image.metadata.modality,
-                    "region": image.metadata.region,
-                    "size_bytes": image.size_bytes
-                }
-            except Exception as e:
-                # No es necesario hacer rollback explícito ya que el context manager lo hará
-                raise e
+            # Obtener repositorios
+            retrieval_repository = self.uow.repository('retrieval')
+            image_repository = self.uow.repository('image')
+            
+            # Obtener la tarea
+            task = await retrieval_repository.get_by_id(command.task_id)
+            if not task:
+                raise TaskNotFound(f"No se encontró la tarea con ID: {command.task_id}")
+
+            # Asegurarse que existe el directorio de la tarea
+            task_dir = os.path.join(task.storage_path, str(task.id))
+            ensure_directory(task_dir)
+            
+            # Generar ruta completa para la imagen, sin permitir que salga del directorio de la tarea
+            filename = safe_filename(command.filename)
+            file_path = os.path.join(task_dir, filename)
+            
+            # Escribir la imagen en el disco
+            size_bytes = await write_image(file_path, command.file_content)
+            
+            # Crear metadatos de imagen
+            image_metadata = ImageMetadata(
+                format=command.format,
+                modality=command.modality,
+                region=command.region,
+                size_bytes=size_bytes,
+                dimensions=command.dimensions
+            )
+
+            # Crear entidad de imagen
+            image = ImageData(
+                metadata=image_metadata,
+                filename=filename,
+                file_path=file_path,
+                size_bytes=size_bytes,
+                is_stored=True
+            )
+
+            # Añadir la imagen a la tarea
+            task.add_image(image)
+            
+            # Guardar la imagen en el repositorio
+            await image_repository.save(image, task.id)
+                        
+            # Notificar que la imagen está lista para anonimización
+            task.notify_images_retrieved([image])
+            
+            # Confirmar la transacción
+            await self.uow.commit()
+
+            # Encolar la publicación de los eventos una vez confirmada la transacción
+            self.publisher.enqueue_events(task.events)
+            task.clear_events()
+
+            return {
+                "task_id": str(task.id),
+                "image_id": str(image.id),
+                "filename": image.filename,
+                "file_path": image.file_path,
+                "modality": image.metadata.modality,
+                "region": image.metadata.region,
+                "size_bytes": image.size_bytes
+            }
 
 
 class UoWStoreImageBatchHandler(CommandHandler):
@@ -313,97 +276,85 @@ class UoWStoreImageBatchHandler(CommandHandler):
 
     async def handle(self, command: StoreImageBatch) -> Dict[str, Any]:
         async with self.uow:
-            try:
-                # Obtener repositorios
-                retrieval_repository = self.uow.repository('retrieval')
-                image_repository = self.uow.repository('image')
-                
-                # Obtener la tarea
-                task = await retrieval_repository.get_by_id(command.task_id)
-                if not task:
-                    raise ValueError(f"No se encontró la tarea con ID: {command.task_id}")
-
-                # Asegurarse que existe el directorio de la tarea
-                task_dir = os.path.join(task.storage_path, str(task.id))
-                os.makedirs(task_dir, exist_ok=True)
-                
-                # Procesar lote de imágenes
-                stored_images = []
-                for img_data in command.images:
-                    # Extraer datos de la imagen
-                    filename = img_data['filename']
-                    file_content = img_data['file_content']
-                    format_str = img_data['format']
-                    modality = img_data['modality']
-                    region = img_data['region']
-                    dimensions = img_data.get('dimensions')
-                    
-                    # Generar ruta completa para la imagen
-                    file_path = os.path.join(task_dir, filename)
-                    
-                    # Escribir la imagen en el disco
-                    with open(file_path, 'wb') as f:
-                        f.write(file_content)
-                    
-                    # Calcular tamaño del archivo
-                    size_bytes = os.path.getsize(file_path)
-                    
-                    # Crear metadatos de imagen
-                    image_metadata = ImageMetadata(
-                        format=ImageFormat(format_str),
-                        modality=modality,
-                        region=region,
-                        size_bytes=size_bytes,
-                        dimensions=dimensions
-                    )
-
-                    # Crear entidad de imagen
-                    image = ImageData(
-                        metadata=image_metadata,
-                        filename=filename,
-                        file_path=file_path,
+            # Obtener repositorios
+            retrieval_repository = self.uow.repository('retrieval')
+            image_repository = self.uow.repository('image')
+            
+            # Obtener la tarea
+            task = await retrieval_repository.get_by_id(command.task_id)
+            if not task:
+                raise TaskNotFound(f"No se encontró la tarea con ID: {command.task_id}")
+
+            # Asegurarse que existe el directorio de la tarea
+            task_dir = os.path.join(task.storage_path, str(task.id))
+            ensure_directory(task_dir)
+            
+            # Generar rutas completas para las imágenes con un prefijo calculado una vez
+            task_dir_prefix = task_dir + os.sep
+            file_paths = [
+                task_dir_prefix + safe_filename(img_data['filename'])
+                for img_data in command.images
+            ]
+            
+            # Resolver cada formato distinto del lote una sola vez
+            formats = {
+                format_str: ImageFormat(format_str)
+                for format_str in {img_data['format'] for img_data in command.images}
+            }
+            
+            # Escribir las imágenes en el disco de forma concurrente
+            sizes = await asyncio.gather(*[
+                write_image(file_path, img_data['file_content'])
+                for file_path, img_data in zip(file_paths, command.images)
+            ])
+            
+            # Construir las entidades del lote sin modificar aún la tarea
+            stored_images = [
+                ImageData(
+                    metadata=ImageMetadata(
+                        format=formats[img_data['format']],
+                        modality=img_data['modality'],
+                        region=img_data['region'],
                         size_bytes=size_bytes,
-                        is_stored=True
-                    )
-
-                    # Añadir la imagen a la tarea y a nuestra lista local
-                    task.add_image(image)
-                    stored_images.append(image)
-                
-                # Guardar lote de imágenes en el repositorio
-                await image_repository.save_batch(stored_images, task.id)
-
-                # Notificar que las imágenes están listas para anonimización
-                task.notify_images_retrieved(stored_images)
-                
-                # Publicar eventos
-                for event in task.events:
-                    await self.publisher.publish_event(event)
-
-                # Actualizar la tarea en el repositorio
-                await retrieval_repository.update(task)
-                
-                # Confirmar la transacción
-                await self.uow.commit()
-
-                return {
-                    "task_id": str(task.id),
-                    "images_count": len(stored_images),
-                    "total_size_bytes": sum(img.size_bytes for img in stored_images),
-                    "images": [
-                        {
-                            "image_id": str(img.id),
-                            "filename": img.filename,
-                            "modality": img.metadata.modality,
-                            "region": img.metadata.region,
-                            "size_bytes": img.size_bytes
-                        }
-                        for img in stored_images
-                    ]
-                }
-            except Exception as e:
-                # No es necesario hacer rollback explícito ya que el context manager lo hará
-                raise e
+                        dimensions=img_data.get('dimensions')
+                    ),
+                    filename=img_data['filename'],
+                    file_path=file_path,
+                    size_bytes=size_bytes,
+                    is_stored=True
+                )
+                for file_path, size_bytes, img_data in zip(file_paths, sizes, command.images)
+            ]
+            
+            # Guardar lote de imágenes en el repositorio; la fila de la tarea no cambia
+            await image_repository.save_batch(stored_images, task.id)
+            
+            # Confirmar la transacción antes de publicar los eventos
+            await self.uow.commit()
+
+            # Añadir las imágenes a la tarea y notificar que están listas para anonimización
+            task.add_images(stored_images)
+            task.notify_images_retrieved(stored_images)
+            
+            # Encolar la publicación de los eventos
+            self.publisher.enqueue_events(task.events)
+            task.clear_events()
+
+            return {
+                "task_id": str(task.id),
+                "images_count": len(stored_images),
+                "total_size_bytes": sum(sizes),
+                "images": [
+                    {
+                        "image_id": str(img.id),
+                        "filename": img.filename,
+                        "modality": img.metadata.modality,
+                        "region": img.metadata.region,
+                        "size_bytes": img.size_bytes
+                    }
+                    for img in stored_images
+                ]
+            }
 
 
 # Funciones para ayudar a ejecutar los comandos con UoW
@@ -418,7 +369,7 @@ async def uow_create_retrieval_task(
     storage_path: str,
     priority: int = 0,
     metadata: Dict = None
-) -> Dict[str, Any]:
+) -> CreateTaskResponse:
     """Ejecuta el comando CreateRetrievalTask con UoW"""
     command = CreateRetrievalTask(
         source_type=source_type,
@@ -437,7 +388,7 @@ async def uow_create_retrieval_task(
 async def uow_start_retrieval_task(
     handler: UoWStartRetrievalTaskHandler,
     task_id: uuid.UUID
-) -> Dict[str, Any]:
+) -> StartTaskResponse:
     """Ejecuta el comando StartRetrievalTask con UoW"""
     command = StartRetrievalTask(task_id=task_id)
     return await handler.handle(command)
@@ -449,7 +400,7 @@ async def uow_complete_retrieval_task(
     successful_images: int,
     failed_images: int,
     details: Optional[List[Dict]] = None
-) -> Dict[str, Any]:
+) -> CompleteTaskResponse:
     """Ejecuta el comando CompleteRetrievalTask con UoW"""
     command = CompleteRetrievalTask(
         task_id=task_id,
@@ -465,7 +416,7 @@ async def uow_fail_retrieval_task(
     task_id: uuid.UUID,
     error_message: str,
     details: Optional[List[Dict]] = None
-) -> Dict[str, Any]:
+) -> FailTaskResponse:
     """Ejecuta el comando FailRetrievalTask con UoW"""
     command = FailRetrievalTask(
         task_id=task_id,
@@ -478,7 +429,7 @@ async def uow_fail_retrieval_task(
 async def uow_store_image(
     handler: UoWStoreImageHandler,
     task_id: uuid.UUID,
-    file_content: bytes,
+    file_content: Union[bytes, AsyncIterator[bytes]],
     filename: str,
     format: ImageFormat,
     modality: str,
@@ -2,6 +2,9 @@ import traceback
 from uuid import UUID
 from ...domain.events import ImageUploadFailed
 
+# Number of innermost frames kept in the published stack trace
+STACK_TRACE_MAX_FRAMES = 10
+
 async def create_image_upload_failed_event(
     task_id: UUID,
     filename: str,
@@ -26,8 +29,8 @@ async def create_image_upload_failed_event(
     Returns:
         An ImageUploadFailed event
     """
-    # Get the full stack trace as a string
-    stack_trace = ''.join(traceback.format_tb(error.__traceback__))
+    # Get the innermost frames of the stack trace as a string
+    stack_trace = ''.join(traceback.format_tb(error.__traceback__, limit=-STACK_TRACE_MAX_FRAMES))
     
     return ImageUploadFailed(
         task_id=task_id,
@@ -8,7 +8,8 @@ from ...domain.events import (
     RetrievalCompleted, 
     RetrievalFailed, 
     ImagesRetrieved, 
-    ImageReadyForAnonymization
+    ImageReadyForAnonymization,
+    ImagesReadyForAnonymization
 )
 
 logger = logging.getLogger(__name__)
@@ -23,9 +24,8 @@ class RetrievalStartedHandler(EventHandler):
     async def handle(self, event: RetrievalStarted):
         # Simplemente loguear el inicio de la tarea por ahora
         logger.info(
-            f"Tarea de recuperación iniciada: {event.task_id} "
-            f"para la fuente {event.source_metadata.source_name} "
-            f"con batch ID {event.batch_id}"
+            "Tarea de recuperación iniciada: %s para la fuente %s con batch ID %s",
+            event.task_id, event.source_metadata.source_name, event.batch_id
         )
 
 
@@ -36,12 +36,14 @@ class RetrievalCompletedHandler(EventHandler):
     """
     
     async def handle(self, event: RetrievalCompleted):
-        logger.info(
-            f"Tarea de recuperación completada: {event.task_id} para la fuente {event.source}. "
-            f"Imágenes recuperadas: {event.result.total_images}, "
-            f"exitosas: {event.result.successful_images}, "
-            f"fallidas: {event.result.failed_images}"
-        )
+        if logger.isEnabledFor(logging.INFO):
+            result = event.result
+            logger.info(
+                "Tarea de recuperación completada: %s para la fuente %s. "
+                "Imágenes recuperadas: %s, exitosas: %s, fallidas: %s",
+                event.task_id, event.source,
+                result.total_images, result.successful_images, result.failed_images
+            )
 
 
 class RetrievalFailedHandler(EventHandler):
@@ -52,8 +54,8 @@ class RetrievalFailedHandler(EventHandler):
     
     async def handle(self, event: RetrievalFailed):
         logger.error(
-            f"Tarea de recuperación fallida: {event.task_id} para la fuente {event.source}. "
-            f"Error: {event.error_message}"
+            "Tarea de recuperación fallida: %s para la fuente %s. Error: %s",
+            event.task_id, event.source, event.error_message
         )
         
         # Aquí se podría implementar lógica para notificar a administradores,
@@ -68,8 +70,8 @@ class ImagesRetrievedHandler(EventHandler):
     
     async def handle(self, event: ImagesRetrieved):
         logger.info(
-            f"Imágenes recuperadas para la tarea {event.task_id}: "
-            f"{event.number_of_images} imágenes de la fuente {event.source}"
+            "Imágenes recuperadas para la tarea %s: %s imágenes de la fuente %s",
+            event.task_id, event.number_of_images, event.source
         )
 
 
@@ -82,13 +84,23 @@ class ImageReadyForAnonymizationHandler(EventHandler):
     
     async def handle(self, event: ImageReadyForAnonymization):
         logger.info(
-            f"Imagen {event.image_id} lista para anonimización. "
-            f"Tarea: {event.task_id}, "
-            f"Fuente: {event.source}, "
-            f"Modalidad: {event.modality}, "
-            f"Región: {event.region}, "
-            f"Ruta: {event.file_path}"
+            "Imagen %s lista para anonimización. Tarea: %s, Fuente: %s, Modalidad: %s, Región: %s, Ruta: %s",
+            event.image_id, event.task_id, event.source, event.modality, event.region, event.file_path
         )
         
         # En el microservicio de anonimización existirá un consumidor que
-        # estará escuchando estos eventos para procesar las imágenes
\ No newline at end of file
+        # estará escuchando estos eventos para procesar las imágenes
+
+
+class ImagesReadyForAnonymizationHandler(EventHandler):
+    """
+    Manejador para el evento ImagesReadyForAnonymization.
+    Notifica en un solo evento al servicio de anonimización todas
+    las imágenes de un lote disponibles para procesar.
+    """
+    
+    async def handle(self, event: ImagesReadyForAnonymization):
+        logger.info(
+            "%s imágenes listas para anonimización. Tarea: %s, Fuente: %s",
+            len(event.images), event.task_id, event.source
+        )
@@ -0,0 +1,3 @@
+class TaskNotFound(ValueError):
+    """Se lanza cuando una tarea de recuperación no existe"""
+    pass
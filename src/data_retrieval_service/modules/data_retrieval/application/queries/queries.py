@@ -1,5 +1,6 @@
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Any
+from typing import Iterator, List, Optional, Dict, Any
 import uuid
 from datetime import datetime
 
@@ -16,8 +17,9 @@ class GetRetrievalTaskById(Query):
 
 @dataclass
 class GetPendingRetrievalTasks(Query):
-    """Query para obtener todas las tareas pendientes"""
-    pass
+    """Query para obtener una página de las tareas pendientes"""
+    limit: int = 100
+    offset: int = 0
 
 
 @dataclass
@@ -29,8 +31,19 @@ class GetTasksBySource(Query):
 
 @dataclass
 class GetTasksByBatch(Query):
-    """Query para obtener tareas por lote"""
+    """Query para obtener una página de las tareas de un lote"""
     batch_id: str
+    limit: int = 100
+    offset: int = 0
+
+
+@dataclass
+class SearchTasks(Query):
+    """Query para obtener tareas combinando filtros opcionales"""
+    source_id: Optional[str] = None
+    batch_id: Optional[str] = None
+    pending: bool = False
+    limit: int = 10
 
 
 @dataclass
@@ -39,7 +52,7 @@ class GetImagesByTask(Query):
     task_id: uuid.UUID
 
 
-@dataclass
+@dataclass(slots=True)
 class TaskDTO(QueryResult):
     """DTO para representar una tarea de recuperación"""
     id: str = ""
@@ -65,11 +78,32 @@ class TaskDTO(QueryResult):
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert DTO to dictionary"""
-        # Use __dict__ to convert to dictionary
-        return {k: v for k, v in self.__dict__.items() if k != 'result_'}
-
-
-@dataclass
+        # Incluye result: TaskResponse lo expone en la consulta por ID
+        return {
+            "id": self.id,
+            "batch_id": self.batch_id,
+            "source_type": self.source_type,
+            "source_name": self.source_name,
+            "source_id": self.source_id,
+            "location": self.location,
+            "retrieval_method": self.retrieval_method,
+            "priority": self.priority,
+            "storage_path": self.storage_path,
+            "status": self.status,
+            "message": self.message,
+            "total_images": self.total_images,
+            "successful_images": self.successful_images,
+            "failed_images": self.failed_images,
+            "details": self.details,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "completed_at": self.completed_at,
+            "images_count": self.images_count,
+            "result": self.result
+        }
+
+
+@dataclass(slots=True)
 class ImageDTO(QueryResult):
     """DTO para representar una imagen"""
     id: str = ""
@@ -89,9 +123,112 @@ class ImageDTO(QueryResult):
     def to_dict(self) -> Dict[str, Any]:
         """Convert DTO to dictionary"""
         # Return dictionary without the result field
-        result_dict = {k: v for k, v in self.__dict__.items() if k != 'result'}
-        return result_dict
-
+        return {
+            "id": self.id,
+            "task_id": self.task_id,
+            "filename": self.filename,
+            "file_path": self.file_path,
+            "format": self.format,
+            "modality": self.modality,
+            "region": self.region,
+            "size_bytes": self.size_bytes,
+            "dimensions": self.dimensions,
+            "is_stored": self.is_stored,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+
+# Valor del estado por defecto resuelto una sola vez, fuera del bucle de serialización
+_PENDING = RetrievalStatus.PENDING.value
+
+
+def _iso(value) -> Optional[str]:
+    """Formatea una fecha en ISO 8601; los valores ya serializados se devuelven tal cual"""
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat()
+
+
+def _task_to_dict(task, images_count: int, include_result: bool = False, native: bool = False) -> Dict[str, Any]:
+    """
+    Serializa una tarea directamente a diccionario, con las mismas claves que TaskDTO.to_dict(),
+    sin construir el DTO intermedio por cada fila. El detalle del resultado solo se
+    incluye cuando se solicita (consulta por ID). Con native=True el ID y las fechas se
+    dejan como UUID/datetime para que orjson los formatee directamente.
+    """
+    sm = task.source_metadata
+    r = task.result
+    status = r.status.value if r else _PENDING
+    if native:
+        task_id, created_at, started_at, completed_at = task.id, task.created_at, task.started_at, task.completed_at
+    else:
+        task_id = str(task.id)
+        created_at, started_at, completed_at = _iso(task.created_at), _iso(task.started_at), _iso(task.completed_at)
+    # Literal a propósito: en CPython 3.11 es más rápido que dict(zip(claves, valores))
+    return {
+        "id": task_id,
+        "batch_id": task.batch_id,
+        "source_type": sm.source_type.value,
+        "source_name": sm.source_name,
+        "source_id": sm.source_id,
+        "location": sm.location,
+        "retrieval_method": sm.retrieval_method.value,
+        "priority": task.priority,
+        "storage_path": task.storage_path,
+        "status": status,
+        "message": r.message if r else None,
+        "total_images": r.total_images if r else 0,
+        "successful_images": r.successful_images if r else 0,
+        "failed_images": r.failed_images if r else 0,
+        "details": r.details if r else None,
+        "created_at": created_at,
+        "started_at": started_at,
+        "completed_at": completed_at,
+        "images_count": images_count,
+        "result": {
+            "status": status,
+            "message": r.message,
+            "total_images": r.total_images,
+            "successful_images": r.successful_images,
+            "failed_images": r.failed_images,
+            "details": r.details
+        } if include_result and r else None
+    }
+
+
+# Tareas ya serializadas en los listados, que los workers consultan de forma periódica
+_TASK_DICT_CACHE_SIZE = 4096
+_task_dict_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+
+
+def _cached_task_dict(task, images_count: int) -> Dict[str, Any]:
+    """
+    Serializa una tarea reutilizando el resultado mientras no cambien su updated_at
+    ni su conteo de imágenes. El diccionario retornado es compartido y no debe modificarse.
+    """
+    if task.updated_at is None:
+        return _task_to_dict(task, images_count)
+
+    key = (task.id, task.updated_at, images_count)
+    cached = _task_dict_cache.get(key)
+    if cached is not None:
+        _task_dict_cache.move_to_end(key)
+        return cached
+
+    cached = _task_dict_cache[key] = _task_to_dict(task, images_count)
+    if len(_task_dict_cache) > _TASK_DICT_CACHE_SIZE:
+        _task_dict_cache.popitem(last=False)
+    return cached
+
+
+def _serialize_tasks(tasks) -> Iterator[Dict[str, Any]]:
+    """
+    Serializa de forma perezosa un listado de tareas cuyo conteo de imágenes llegó precargado
+    desde el repositorio, para que la capa de API pueda emitir cada fila a medida que se genera.
+    """
+    for task in tasks:
+        yield _cached_task_dict(task, task.images_count)
 
 class GetRetrievalTaskByIdHandler(QueryHandler):
     """Handler para obtener una tarea de recuperación por su ID"""
@@ -101,50 +238,12 @@ class GetRetrievalTaskByIdHandler(QueryHandler):
         self.image_repository = image_repository
 
     async def handle(self, query: GetRetrievalTaskById) -> Optional[Dict[str, Any]]:
-        task = await self.retrieval_repository.get_by_id(query.task_id)
+        # Obtener la tarea junto con su conteo de imágenes en una sola consulta
+        task = await self.retrieval_repository.get_by_id(query.task_id, prefetch=('images_count',))
         if not task:
             return None
-            
-        # Obtener conteo de imágenes
-        images_count = await self.image_repository.get_images_count_by_task(task.id)
         
-        # Construir el DTO de resultado
-        result = None
-        if task.result:
-            result = {
-                "status": task.result.status.value,
-                "message": task.result.message,
-                "total_images": task.result.total_images,
-                "successful_images": task.result.successful_images,
-                "failed_images": task.result.failed_images,
-                "details": task.result.details
-            }
-        
-        dto = TaskDTO(
-            id=str(task.id),
-            batch_id=task.batch_id,
-            source_type=task.source_metadata.source_type.value,
-            source_name=task.source_metadata.source_name,
-            source_id=task.source_metadata.source_id,
-            location=task.source_metadata.location,
-            retrieval_method=task.source_metadata.retrieval_method.value,
-            priority=task.priority,
-            storage_path=task.storage_path,
-            status=task.result.status.value if task.result else RetrievalStatus.PENDING.value,
-            message=task.result.message if task.result else None,
-            total_images=task.result.total_images if task.result else 0,
-            successful_images=task.result.successful_images if task.result else 0,
-            failed_images=task.result.failed_images if task.result else 0,
-            details=task.result.details if task.result else None,
-            created_at=task.created_at.isoformat() if task.created_at else None,
-            started_at=task.started_at.isoformat() if task.started_at else None,
-            completed_at=task.completed_at.isoformat() if task.completed_at else None,
-            images_count=images_count,
-            result=result
-        )
-        
-        # Return as dictionary
-        return dto.to_dict()
+        return _task_to_dict(task, task.images_count, include_result=True)
 
 
 class GetPendingRetrievalTasksHandler(QueryHandler):
@@ -154,39 +253,11 @@ class GetPendingRetrievalTasksHandler(QueryHandler):
         self.retrieval_repository = retrieval_repository
         self.image_repository = image_repository
 
-    async def handle(self, query: GetPendingRetrievalTasks) -> List[Dict[str, Any]]:
-        tasks = await self.retrieval_repository.get_pending_tasks()
-        result = []
-        
-        for task in tasks:
-            # Obtener conteo de imágenes
-            images_count = await self.image_repository.get_images_count_by_task(task.id)
-            
-            dto = TaskDTO(
-                id=str(task.id),
-                batch_id=task.batch_id,
-                source_type=task.source_metadata.source_type.value,
-                source_name=task.source_metadata.source_name,
-                source_id=task.source_metadata.source_id,
-                location=task.source_metadata.location,
-                retrieval_method=task.source_metadata.retrieval_method.value,
-                priority=task.priority,
-                storage_path=task.storage_path,
-                status=task.result.status.value if task.result else RetrievalStatus.PENDING.value,
-                message=task.result.message if task.result else None,
-                total_images=task.result.total_images if task.result else 0,
-                successful_images=task.result.successful_images if task.result else 0,
-                failed_images=task.result.failed_images if task.result else 0,
-                details=task.result.details if task.result else None,
-                created_at=task.created_at.isoformat() if task.created_at else None,
-                started_at=task.started_at.isoformat() if task.started_at else None,
-                completed_at=task.completed_at.isoformat() if task.completed_at else None,
-                images_count=images_count
-            )
-            
-            result.append(dto.to_dict())
-            
-        return result
+    async def handle(self, query: GetPendingRetrievalTasks) -> Iterator[Dict[str, Any]]:
+        tasks = await self.retrieval_repository.get_pending_tasks(
+            query.limit, query.offset, prefetch=('images_count',)
+        )
+        return _serialize_tasks(tasks)
 
 
 class GetTasksBySourceHandler(QueryHandler):
@@ -196,39 +267,9 @@ class GetTasksBySourceHandler(QueryHandler):
         self.retrieval_repository = retrieval_repository
         self.image_repository = image_repository
 
-    async def handle(self, query: GetTasksBySource) -> List[Dict[str, Any]]:
-        tasks = await self.retrieval_repository.get_tasks_by_source(query.source_id, query.limit)
-        result = []
-        
-        for task in tasks:
-            # Obtener conteo de imágenes
-            images_count = await self.image_repository.get_images_count_by_task(task.id)
-            
-            dto = TaskDTO(
-                id=str(task.id),
-                batch_id=task.batch_id,
-                source_type=task.source_metadata.source_type.value,
-                source_name=task.source_metadata.source_name,
-                source_id=task.source_metadata.source_id,
-                location=task.source_metadata.location,
-                retrieval_method=task.source_metadata.retrieval_method.value,
-                priority=task.priority,
-                storage_path=task.storage_path,
-                status=task.result.status.value if task.result else RetrievalStatus.PENDING.value,
-                message=task.result.message if task.result else None,
-                total_images=task.result.total_images if task.result else 0,
-                successful_images=task.result.successful_images if task.result else 0,
-                failed_images=task.result.failed_images if task.result else 0,
-                details=task.result.details if task.result else None,
-                created_at=task.created_at.isoformat() if task.created_at else None,
-                started_at=task.started_at.isoformat() if task.started_at else None,
-                completed_at=task.completed_at.isoformat() if task.completed_at else None,
-                images_count=images_count
-            )
-            
-            result.append(dto.to_dict())
-            
-        return result
+    async def handle(self, query: GetTasksBySource) -> Iterator[Dict[str, Any]]:
+        tasks = await self.retrieval_repository.get_tasks_by_source(query.source_id, query.limit, prefetch=('images_count',))
+        return _serialize_tasks(tasks)
 
 
 class GetTasksByBatchHandler(QueryHandler):
@@ -238,39 +279,11 @@ class GetTasksByBatchHandler(QueryHandler):
         self.retrieval_repository = retrieval_repository
         self.image_repository = image_repository
 
-    async def handle(self, query: GetTasksByBatch) -> List[Dict[str, Any]]:
-        tasks = await self.retrieval_repository.get_tasks_by_batch(query.batch_id)
-        result = []
-        
-        for task in tasks:
-            # Obtener conteo de imágenes
-            images_count = await self.image_repository.get_images_count_by_task(task.id)
-            
-            dto = TaskDTO(
-                id=str(task.id),
-                batch_id=task.batch_id,
-                source_type=task.source_metadata.source_type.value,
-                source_name=task.source_metadata.source_name,
-                source_id=task.source_metadata.source_id,
-                location=task.source_metadata.location,
-                retrieval_method=task.source_metadata.retrieval_method.value,
-                priority=task.priority,
-                storage_path=task.storage_path,
-                status=task.result.status.value if task.result else RetrievalStatus.PENDING.value,
-                message=task.result.message if task.result else None,
-                total_images=task.result.total_images if task.result else 0,
-                successful_images=task.result.successful_images if task.result else 0,
-                failed_images=task.result.failed_images if task.result else 0,
-                details=task.result.details if task.result else None,
-                created_at=task.created_at.isoformat() if task.created_at else None,
-                started_at=task.started_at.isoformat() if task.started_at else None,
-                completed_at=task.completed_at.isoformat() if task.completed_at else None,
-                images_count=images_count
-            )
-            
-            result.append(dto.to_dict())
-            
-        return result
+    async def handle(self, query: GetTasksByBatch) -> Iterator[Dict[str, Any]]:
+        tasks = await self.retrieval_repository.get_tasks_by_batch(
+            query.batch_id, query.limit, query.offset, prefetch=('images_count',)
+        )
+        return _serialize_tasks(tasks)
 
 
 class GetImagesByTaskHandler(QueryHandler):
@@ -282,10 +295,12 @@ class GetImagesByTaskHandler(QueryHandler):
     async def handle(self, query: GetImagesByTask) -> List[Dict[str, Any]]:
         images = await self.image_repository.get_images_by_task(query.task_id)
         
+        # El ID de la tarea es el mismo en todas las filas: se convierte una sola vez
+        task_id = str(query.task_id)
         return [
             ImageDTO(
                 id=str(image.id),
-                task_id=str(query.task_id),
+                task_id=task_id,
                 filename=image.filename,
                 file_path=image.file_path,
                 format=image.metadata.format.value,
@@ -294,8 +309,8 @@ class GetImagesByTaskHandler(QueryHandler):
                 size_bytes=image.size_bytes,
                 dimensions=image.metadata.dimensions,
                 is_stored=image.is_stored,
-                created_at=image.created_at.isoformat() if image.created_at else None,
-                updated_at=image.updated_at.isoformat() if image.updated_at else None
+                created_at=_iso(image.created_at),
+                updated_at=_iso(image.updated_at)
             ).to_dict()
             for image in images
         ]
@@ -312,10 +327,12 @@ async def get_retrieval_task_by_id(
 
 
 async def get_pending_retrieval_tasks(
-    handler: GetPendingRetrievalTasksHandler
-) -> List[Dict[str, Any]]:
+    handler: GetPendingRetrievalTasksHandler,
+    limit: int = 100,
+    offset: int = 0
+) -> Iterator[Dict[str, Any]]:
     """Ejecuta la consulta GetPendingRetrievalTasks"""
-    query = GetPendingRetrievalTasks()
+    query = GetPendingRetrievalTasks(limit=limit, offset=offset)
     return await handler.handle(query)
 
 
@@ -323,7 +340,7 @@ async def get_tasks_by_source(
     handler: GetTasksBySourceHandler,
     source_id: str,
     limit: int = 10
-) -> List[Dict[str, Any]]:
+) -> Iterator[Dict[str, Any]]:
     """Ejecuta la consulta GetTasksBySource"""
     query = GetTasksBySource(source_id=source_id, limit=limit)
     return await handler.handle(query)
@@ -331,10 +348,12 @@ async def get_tasks_by_source(
 
 async def get_tasks_by_batch(
     handler: GetTasksByBatchHandler,
-    batch_id: str
-) -> List[Dict[str, Any]]:
+    batch_id: str,
+    limit: int = 100,
+    offset: int = 0
+) -> Iterator[Dict[str, Any]]:
     """Ejecuta la consulta GetTasksByBatch"""
-    query = GetTasksByBatch(batch_id=batch_id)
+    query = GetTasksByBatch(batch_id=batch_id, limit=limit, offset=offset)
     return await handler.handle(query)
 
 
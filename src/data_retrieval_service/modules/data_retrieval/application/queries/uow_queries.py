@@ -1,11 +1,12 @@
 from dataclasses import dataclass
-from typing import List, Optional, Dict, Any
+from typing import Iterator, List, Optional, Dict, Any
 import uuid
 from datetime import datetime
 
+import orjson
+
 from .....seedwork.application.queries import Query, QueryResult, QueryHandler
 from .....seedwork.infrastructure.uow import UnitOfWork
-from ...domain.value_objects import RetrievalStatus
 from ...domain.repositories import RetrievalRepository, ImageRepository
 
 # Reutilizamos las definiciones de queries existentes
@@ -14,9 +15,12 @@ from .queries import (
     GetPendingRetrievalTasks,
     GetTasksBySource,
     GetTasksByBatch,
+    SearchTasks,
     GetImagesByTask,
-    TaskDTO,
-    ImageDTO
+    ImageDTO,
+    _iso,
+    _task_to_dict,
+    _serialize_tasks
 )
 
 
@@ -27,55 +31,28 @@ class UoWGetRetrievalTaskByIdHandler(QueryHandler):
         self.uow = uow
 
     async def handle(self, query: GetRetrievalTaskById) -> Optional[Dict[str, Any]]:
-        async with self.uow:
+        async with self.uow.read_only():
             # Obtener repositorios
             retrieval_repository = self.uow.repository('retrieval')
-            image_repository = self.uow.repository('image')
             
-            task = await retrieval_repository.get_by_id(query.task_id)
+            # Obtener la tarea junto con su conteo de imágenes en una sola consulta
+            task = await retrieval_repository.get_by_id(query.task_id, prefetch=('images_count',))
             if not task:
                 return None
-                
-            # Obtener conteo de imágenes
-            images_count = await image_repository.get_images_count_by_task(task.id)
             
-            # Construir el DTO de resultado
-            result = None
-            if task.result:
-                result = {
-                    "status": task.result.status.value,
-                    "message": task.result.message,
-                    "total_images": task.result.total_images,
-                    "successful_images": task.result.successful_images,
-                    "failed_images": task.result.failed_images,
-                    "details": task.result.details
-                }
+            return _task_to_dict(task, task.images_count, include_result=True)
+
+
+    async def handle_json(self, query: GetRetrievalTaskById) -> Optional[bytes]:
+        """Obtiene la tarea ya codificada en JSON, dejando a orjson el formato de UUID y fechas"""
+        async with self.uow.read_only():
+            retrieval_repository = self.uow.repository('retrieval')
             
-            dto = TaskDTO(
-                id=str(task.id),
-                batch_id=task.batch_id,
-                source_type=task.source_metadata.source_type.value,
-                source_name=task.source_metadata.source_name,
-                source_id=task.source_metadata.source_id,
-                location=task.source_metadata.location,
-                retrieval_method=task.source_metadata.retrieval_method.value,
-                priority=task.priority,
-                storage_path=task.storage_path,
-                status=task.result.status.value if task.result else RetrievalStatus.PENDING.value,
-                message=task.result.message if task.result else None,
-                total_images=task.result.total_images if task.result else 0,
-                successful_images=task.result.successful_images if task.result else 0,
-                failed_images=task.result.failed_images if task.result else 0,
-                details=task.result.details if task.result else None,
-                created_at=task.created_at.isoformat() if task.created_at else None,
-                started_at=task.started_at.isoformat() if task.started_at else None,
-                completed_at=task.completed_at.isoformat() if task.completed_at else None,
-                images_count=images_count,
-                result=result
-            )
+            task = await retrieval_repository.get_by_id(query.task_id, prefetch=('images_count',))
+            if not task:
+                return None
             
-            # Return as dictionary
-            return dto.to_dict()
+            return orjson.dumps(_task_to_dict(task, task.images_count, include_result=True, native=True))
 
 
 class UoWGetPendingRetrievalTasksHandler(QueryHandler):
@@ -84,44 +61,15 @@ class UoWGetPendingRetrievalTasksHandler(QueryHandler):
     def __init__(self, uow: UnitOfWork):
         self.uow = uow
 
-    async def handle(self, query: GetPendingRetrievalTasks) -> List[Dict[str, Any]]:
-        async with self.uow:
+    async def handle(self, query: GetPendingRetrievalTasks) -> Iterator[Dict[str, Any]]:
+        async with self.uow.read_only():
             # Obtener repositorios
             retrieval_repository = self.uow.repository('retrieval')
-            image_repository = self.uow.repository('image')
             
-            tasks = await retrieval_repository.get_pending_tasks()
-            result = []
-            
-            for task in tasks:
-                # Obtener conteo de imágenes
-                images_count = await image_repository.get_images_count_by_task(task.id)
-                
-                dto = TaskDTO(
-                    id=str(task.id),
-                    batch_id=task.batch_id,
-                    source_type=task.source_metadata.source_type.value,
-                    source_name=task.source_metadata.source_name,
-                    source_id=task.source_metadata.source_id,
-                    location=task.source_metadata.location,
-                    retrieval_method=task.source_metadata.retrieval_method.value,
-                    priority=task.priority,
-                    storage_path=task.storage_path,
-                    status=task.result.status.value if task.result else RetrievalStatus.PENDING.value,
-                    message=task.result.message if task.result else None,
-                    total_images=task.result.total_images if task.result else 0,
-                    successful_images=task.result.successful_images if task.result else 0,
-                    failed_images=task.result.failed_images if task.result else 0,
-                    details=task.result.details if task.result else None,
-                    created_at=task.created_at.isoformat() if task.created_at else None,
-                    started_at=task.started_at.isoformat() if task.started_at else None,
-                    completed_at=task.completed_at.isoformat() if task.completed_at else None,
-                    images_count=images_count
-                )
-                
-                result.append(dto.to_dict())
-                
-            return result
+            tasks = await retrieval_repository.get_pending_tasks(
+                query.limit, query.offset, prefetch=('images_count',)
+            )
+            return _serialize_tasks(tasks)
 
 
 class UoWGetTasksBySourceHandler(QueryHandler):
@@ -130,44 +78,13 @@ class UoWGetTasksBySourceHandler(QueryHandler):
     def __init__(self, uow: UnitOfWork):
         self.uow = uow
 
-    async def handle(self, query: GetTasksBySource) -> List[Dict[str, Any]]:
-        async with self.uow:
+    async def handle(self, query: GetTasksBySource) -> Iterator[Dict[str, Any]]:
+        async with self.uow.read_only():
             # Obtener repositorios
             retrieval_repository = self.uow.repository('retrieval')
-            image_repository = self.uow.repository('image')
             
-            tasks = await retrieval_repository.get_tasks_by_source(query.source_id, query.limit)
-            result = []
-            
-            for task in tasks:
-                # Obtener conteo de imágenes
-                images_count = await image_repository.get_images_count_by_task(task.id)
-                
-                dto = TaskDTO(
-                    id=str(task.id),
-                    batch_id=task.batch_id,
-                    source_type=task.source_metadata.source_type.value,
-                    source_name=task.source_metadata.source_name,
-                    source_id=task.source_metadata.source_id,
-                    location=task.source_metadata.location,
-                    retrieval_method=task.source_metadata.retrieval_method.value,
-                    priority=task.priority,
-                    storage_path=task.storage_path,
-                    status=task.result.status.value if task.result else RetrievalStatus.PENDING.value,
-                    message=task.result.message if task.result else None,
-                    total_images=task.result.total_images if task.result else 0,
-                    successful_images=task.result.successful_images if task.result else 0,
-                    failed_images=task.result.failed_images if task.result else 0,
-                    details=task.result.details if task.result else None,
-                    created_at=task.created_at.isoformat() if task.created_at else None,
-                    started_at=task.started_at.isoformat() if task.started_at else None,
-                    completed_at=task.completed_at.isoformat() if task.completed_at else None,
-                    images_count=images_count
-                )
-                
-                result.append(dto.to_dict())
-                
-            return result
+            tasks = await retrieval_repository.get_tasks_by_source(query.source_id, query.limit, prefetch=('images_count',))
+            return _serialize_tasks(tasks)
 
 
 class UoWGetTasksByBatchHandler(QueryHandler):
@@ -176,44 +93,36 @@ class UoWGetTasksByBatchHandler(QueryHandler):
     def __init__(self, uow: UnitOfWork):
         self.uow = uow
 
-    async def handle(self, query: GetTasksByBatch) -> List[Dict[str, Any]]:
-        async with self.uow:
+    async def handle(self, query: GetTasksByBatch) -> Iterator[Dict[str, Any]]:
+        async with self.uow.read_only():
             # Obtener repositorios
             retrieval_repository = self.uow.repository('retrieval')
-            image_repository = self.uow.repository('image')
             
-            tasks = await retrieval_repository.get_tasks_by_batch(query.batch_id)
-            result = []
+            tasks = await retrieval_repository.get_tasks_by_batch(
+                query.batch_id, query.limit, query.offset, prefetch=('images_count',)
+            )
+            return _serialize_tasks(tasks)
+
+
+class UoWSearchTasksHandler(QueryHandler):
+    """Handler para obtener tareas con filtros combinados usando UoW"""
+    
+    def __init__(self, uow: UnitOfWork):
+        self.uow = uow
+
+    async def handle(self, query: SearchTasks) -> Iterator[Dict[str, Any]]:
+        async with self.uow.read_only():
+            # Obtener repositorios
+            retrieval_repository = self.uow.repository('retrieval')
             
-            for task in tasks:
-                # Obtener conteo de imágenes
-                images_count = await image_repository.get_images_count_by_task(task.id)
-                
-                dto = TaskDTO(
-                    id=str(task.id),
-                    batch_id=task.batch_id,
-                    source_type=task.source_metadata.source_type.value,
-                    source_name=task.source_metadata.source_name,
-                    source_id=task.source_metadata.source_id,
-                    location=task.source_metadata.location,
-                    retrieval_method=task.source_metadata.retrieval_method.value,
-                    priority=task.priority,
-                    storage_path=task.storage_path,
-                    status=task.result.status.value if task.result else RetrievalStatus.PENDING.value,
-                    message=task.result.message if task.result else None,
-                    total_images=task.result.total_images if task.result else 0,
-                    successful_images=task.result.successful_images if task.result else 0,
-                    failed_images=task.result.failed_images if task.result else 0,
-                    details=task.result.details if task.result else None,
-                    created_at=task.created_at.isoformat() if task.created_at else None,
-                    started_at=task.started_at.isoformat() if task.started_at else None,
-                    completed_at=task.completed_at.isoformat() if task.completed_at else None,
-                    images_count=images_count
-                )
-                
-                result.append(dto.to_dict())
-                
-            return result
+            tasks = await retrieval_repository.search(
+                source_id=query.source_id,
+                batch_id=query.batch_id,
+                pending=query.pending,
+                limit=query.limit,
+                prefetch=('images_count',)
+            )
+            return _serialize_tasks(tasks)
 
 
 class UoWGetImagesByTaskHandler(QueryHandler):
@@ -223,16 +132,18 @@ class UoWGetImagesByTaskHandler(QueryHandler):
         self.uow = uow
 
     async def handle(self, query: GetImagesByTask) -> List[Dict[str, Any]]:
-        async with self.uow:
+        async with self.uow.read_only():
             # Obtener repositorio de imágenes
             image_repository = self.uow.repository('image')
             
             images = await image_repository.get_images_by_task(query.task_id)
             
+            # El ID de la tarea es el mismo en todas las filas: se convierte una sola vez
+            task_id = str(query.task_id)
             return [
                 ImageDTO(
                     id=str(image.id),
-                    task_id=str(query.task_id),
+                    task_id=task_id,
                     filename=image.filename,
                     file_path=image.file_path,
                     format=image.metadata.format.value,
@@ -241,8 +152,8 @@ class UoWGetImagesByTaskHandler(QueryHandler):
                     size_bytes=image.size_bytes,
                     dimensions=image.metadata.dimensions,
                     is_stored=image.is_stored,
-                    created_at=image.created_at.isoformat() if image.created_at else None,
-                    updated_at=image.updated_at.isoformat() if image.updated_at else None
+                    created_at=_iso(image.created_at),
+                    updated_at=_iso(image.updated_at)
                 ).to_dict()
                 for image in images
             ]
@@ -258,11 +169,22 @@ async def uow_get_retrieval_task_by_id(
     return await handler.handle(query)
 
 
+async def uow_get_retrieval_task_json_by_id(
+    handler: UoWGetRetrievalTaskByIdHandler,
+    task_id: uuid.UUID
+) -> Optional[bytes]:
+    """Ejecuta la consulta GetRetrievalTaskById usando UoW y retorna el JSON de la tarea"""
+    query = GetRetrievalTaskById(task_id=task_id)
+    return await handler.handle_json(query)
+
+
 async def uow_get_pending_retrieval_tasks(
-    handler: UoWGetPendingRetrievalTasksHandler
-) -> List[Dict[str, Any]]:
+    handler: UoWGetPendingRetrievalTasksHandler,
+    limit: int = 100,
+    offset: int = 0
+) -> Iterator[Dict[str, Any]]:
     """Ejecuta la consulta GetPendingRetrievalTasks usando UoW"""
-    query = GetPendingRetrievalTasks()
+    query = GetPendingRetrievalTasks(limit=limit, offset=offset)
     return await handler.handle(query)
 
 
@@ -270,7 +192,7 @@ async def uow_get_tasks_by_source(
     handler: UoWGetTasksBySourceHandler,
     source_id: str,
     limit: int = 10
-) -> List[Dict[str, Any]]:
+) -> Iterator[Dict[str, Any]]:
     """Ejecuta la consulta GetTasksBySource usando UoW"""
     query = GetTasksBySource(source_id=source_id, limit=limit)
     return await handler.handle(query)
@@ -278,10 +200,24 @@ async def uow_get_tasks_by_source(
 
 async def uow_get_tasks_by_batch(
     handler: UoWGetTasksByBatchHandler,
-    batch_id: str
-) -> List[Dict[str, Any]]:
+    batch_id: str,
+    limit: int = 100,
+    offset: int = 0
+) -> Iterator[Dict[str, Any]]:
     """Ejecuta la consulta GetTasksByBatch usando UoW"""
-    query = GetTasksByBatch(batch_id=batch_id)
+    query = GetTasksByBatch(batch_id=batch_id, limit=limit, offset=offset)
+    return await handler.handle(query)
+
+
+async def uow_search_tasks(
+    handler: UoWSearchTasksHandler,
+    source_id: Optional[str] = None,
+    batch_id: Optional[str] = None,
+    pending: bool = False,
+    limit: int = 10
+) -> Iterator[Dict[str, Any]]:
+    """Ejecuta la consulta SearchTasks usando UoW"""
+    query = SearchTasks(source_id=source_id, batch_id=batch_id, pending=pending, limit=limit)
     return await handler.handle(query)
 
 
@@ -3,13 +3,13 @@ from datetime import datetime
 import uuid
 from typing import List, Optional, Dict
 
-from .events import RetrievalStarted, RetrievalCompleted, RetrievalFailed, ImagesRetrieved, ImageReadyForAnonymization
+from .events import RetrievalStarted, RetrievalCompleted, RetrievalFailed, ImagesRetrieved, ImagesReadyForAnonymization
 from ....seedwork.domain.entities import Entity
 from ....seedwork.domain.aggregate import AggregateRoot
 from .value_objects import ImageMetadata, SourceMetadata, RetrievalResult, RetrievalStatus
 
 
-@dataclass
+@dataclass(slots=True)
 class ImageData(Entity):
     """
     Representa una imagen médica dentro del sistema.
@@ -23,7 +23,7 @@ class ImageData(Entity):
     updated_at: datetime = field(default=None)
 
 
-@dataclass
+@dataclass(slots=True)
 class RetrievalTask(AggregateRoot):
     """
     Representa una tarea de recuperación de imágenes médicas.
@@ -39,15 +39,14 @@ class RetrievalTask(AggregateRoot):
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     metadata: Dict = field(default_factory=dict)
+    images_count: Optional[int] = field(default=None, compare=False) # Precargado por el repositorio en las consultas
     
-    def __post_init__(self):
-        if not hasattr(self, 'events'):
-            self.events = []
-
     def start_retrieval(self):
         """Inicia la tarea de recuperación de imágenes"""
         
-        self.started_at = datetime.now()
+        # Un único instante para la tarea y su evento
+        now = datetime.now()
+        self.started_at = now
         
         self.result = RetrievalResult(
             status=RetrievalStatus.IN_PROGRESS,
@@ -58,7 +57,7 @@ class RetrievalTask(AggregateRoot):
             task_id=self.id, 
             source_metadata=self.source_metadata, 
             batch_id=self.batch_id,
-            timestamp=datetime.now()
+            timestamp=now
         )
         self.add_event(event)
         return event
@@ -69,6 +68,11 @@ class RetrievalTask(AggregateRoot):
         
         # No publicamos directamente un evento aquí, esperamos a tener un lote
         return image_data
+
+    def add_images(self, images: List[ImageData]):
+        """Añade un lote de imágenes recuperadas a la tarea en una sola operación"""
+        self.images.extend(images)
+        return images
         
     def notify_images_retrieved(self, images: List[ImageData]):
         """Notifica que un lote de imágenes ha sido recuperado"""
@@ -83,17 +87,20 @@ class RetrievalTask(AggregateRoot):
         )
         self.add_event(event)
 
-        # Crear eventos de imágenes listas para anonimización
-        for image in images:
-            ano_event = ImageReadyForAnonymization(
-                image_id=image.id,
-                task_id=self.id, 
-                source=self.source_metadata.source_name,
-                modality=image.metadata.modality,
-                region=image.metadata.region,
-                file_path=image.file_path
-            )
-            self.add_event(ano_event)
+        # Un único evento con todas las imágenes listas para anonimización
+        self.add_event(ImagesReadyForAnonymization(
+            task_id=self.id,
+            source=self.source_metadata.source_name,
+            images=[
+                {
+                    "image_id": image.id,
+                    "modality": image.metadata.modality,
+                    "region": image.metadata.region,
+                    "file_path": image.file_path
+                }
+                for image in images
+            ]
+        ))
         
         return event
         
@@ -107,7 +114,8 @@ class RetrievalTask(AggregateRoot):
 
     def complete_retrieval(self, successful_images: int, failed_images: int, details: List[dict] = None):
         """Completa la tarea de recuperación con éxito"""
-        self.completed_at = datetime.now()
+        now = datetime.now()
+        self.completed_at = now
         total_images = successful_images + failed_images
         
         self.result = RetrievalResult(
@@ -123,14 +131,16 @@ class RetrievalTask(AggregateRoot):
             task_id=self.id, 
             result=self.result, 
             source=self.source_metadata.source_name,
-            location=self.source_metadata.location
+            location=self.source_metadata.location,
+            timestamp=now
         )
         self.add_event(event)
         return event
 
     def fail_retrieval(self, error_message: str, details: List[dict] = None):
         """Marca la tarea de recuperación como fallida"""
-        self.completed_at = datetime.now()
+        now = datetime.now()
+        self.completed_at = now
         
         # Contar imágenes exitosas hasta el momento de la falla
         successful_images = len(self.images)
@@ -147,7 +157,8 @@ class RetrievalTask(AggregateRoot):
         event = RetrievalFailed(
             task_id=self.id, 
             error_message=error_message,
-            source=self.source_metadata.source_name
+            source=self.source_metadata.source_name,
+            timestamp=now
         )
         self.add_event(event)
         return event
\ No newline at end of file
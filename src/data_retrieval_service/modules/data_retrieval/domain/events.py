@@ -4,9 +4,14 @@ import uuid
 from typing import List
 
 from ....seedwork.domain.events import DomainEvent
-from .value_objects import SourceMetadata, RetrievalResult
+from .value_objects import SourceMetadata, RetrievalResult, SourceType, RetrievalMethod, RetrievalStatus
 
-@dataclass
+# Enum value strings resolved once, so serializing an event skips Enum.value lookups
+_SOURCE_TYPE_VALUE = {e: e.value for e in SourceType}
+_RETRIEVAL_METHOD_VALUE = {e: e.value for e in RetrievalMethod}
+_RETRIEVAL_STATUS_VALUE = {e: e.value for e in RetrievalStatus}
+
+@dataclass(slots=True)
 class RetrievalStarted(DomainEvent):
     task_id: uuid.UUID = field(default=None)
     timestamp: datetime = field(default_factory=datetime.now)
@@ -15,21 +20,19 @@ class RetrievalStarted(DomainEvent):
     id: uuid.UUID = field(default_factory=uuid.uuid4)
     
     def to_dict(self) -> dict:
-        return {
-            **super().to_dict(),
-            "task_id": str(self.task_id),
+        return self._with_base_fields({
+            "task_id": self.task_id,
             "source_metadata": {
-                "source_type": self.source_metadata.source_type.value,
+                "source_type": _SOURCE_TYPE_VALUE[self.source_metadata.source_type],
                 "source_name": self.source_metadata.source_name,
                 "source_id": self.source_metadata.source_id,
                 "location": self.source_metadata.location,
-                "retrieval_method": self.source_metadata.retrieval_method.value
+                "retrieval_method": _RETRIEVAL_METHOD_VALUE[self.source_metadata.retrieval_method]
             },
-            "batch_id": self.batch_id,
-            "timestamp": self.timestamp.isoformat()
-        }
+            "batch_id": self.batch_id
+        })
 
-@dataclass
+@dataclass(slots=True)
 class RetrievalCompleted(DomainEvent):
     task_id: uuid.UUID = field(default=None)
     result: RetrievalResult = field(default=None)
@@ -39,11 +42,10 @@ class RetrievalCompleted(DomainEvent):
     timestamp: datetime = field(default_factory=datetime.now)
     
     def to_dict(self) -> dict:
-        return {
-            **super().to_dict(),
-            "task_id": str(self.task_id),
+        return self._with_base_fields({
+            "task_id": self.task_id,
             "result": {
-                "status": self.result.status.value,
+                "status": _RETRIEVAL_STATUS_VALUE[self.result.status],
                 "message": self.result.message,
                 "total_images": self.result.total_images,
                 "successful_images": self.result.successful_images,
@@ -52,9 +54,9 @@ class RetrievalCompleted(DomainEvent):
             },
             "source": self.source,
             "location": self.location
-        }
+        })
 
-@dataclass
+@dataclass(slots=True)
 class RetrievalFailed(DomainEvent):
     task_id: uuid.UUID = field(default=None)
     error_message: str = field(default=None)
@@ -63,14 +65,13 @@ class RetrievalFailed(DomainEvent):
     timestamp: datetime = field(default_factory=datetime.now)
     
     def to_dict(self) -> dict:
-        return {
-            **super().to_dict(),
-            "task_id": str(self.task_id),
+        return self._with_base_fields({
+            "task_id": self.task_id,
             "error_message": self.error_message,
             "source": self.source
-        }
+        })
 
-@dataclass
+@dataclass(slots=True)
 class ImagesRetrieved(DomainEvent):
     task_id: uuid.UUID = field(default=None)
     source: str = field(default=None)
@@ -81,16 +82,18 @@ class ImagesRetrieved(DomainEvent):
     timestamp: datetime = field(default_factory=datetime.now)
     
     def to_dict(self) -> dict:
-        return {
-            **super().to_dict(),
-            "task_id": str(self.task_id),
+        return self._with_base_fields({
+            "task_id": self.task_id,
             "source": self.source,
             "number_of_images": self.number_of_images,
             "batch_id": self.batch_id,
-            "image_ids": [str(img_id) for img_id in self.image_ids]
-        }
+            "image_ids": self.image_ids
+        })
+
 
-@dataclass
+# Obsoleto: un evento por imagen; se mantiene para consumidores que aún lo esperan.
+# RetrievalTask emite ImagesReadyForAnonymization con todo el lote.
+@dataclass(slots=True)
 class ImageReadyForAnonymization(DomainEvent):
     image_id: uuid.UUID = field(default=None)
     task_id: uuid.UUID = field(default=None)
@@ -102,40 +105,34 @@ class ImageReadyForAnonymization(DomainEvent):
     timestamp: datetime = field(default_factory=datetime.now)
     
     def to_dict(self) -> dict:
-        return {
-            **super().to_dict(),
-            "image_id": str(self.image_id),
-            "task_id": str(self.task_id),
+        return self._with_base_fields({
+            "image_id": self.image_id,
+            "task_id": self.task_id,
             "source": self.source,
             "modality": self.modality,
             "region": self.region,
             "file_path": self.file_path
-        }
+        })
 
-@dataclass
-class ImageReadyForAnonymization(DomainEvent):
-    image_id: uuid.UUID = field(default=None)
+
+@dataclass(slots=True)
+class ImagesReadyForAnonymization(DomainEvent):
     task_id: uuid.UUID = field(default=None)
     source: str = field(default=None)
-    modality: str = field(default=None)
-    region: str = field(default=None)
-    file_path: str = field(default=None)
+    # Un descriptor por imagen: image_id (UUID), modality, region, file_path
+    images: List[dict] = field(default_factory=list)
     id: uuid.UUID = field(default_factory=uuid.uuid4)
     timestamp: datetime = field(default_factory=datetime.now)
     
     def to_dict(self) -> dict:
-        return {
-            **super().to_dict(),
-            "image_id": str(self.image_id),
-            "task_id": str(self.task_id),
+        return self._with_base_fields({
+            "task_id": self.task_id,
             "source": self.source,
-            "modality": self.modality,
-            "region": self.region,
-            "file_path": self.file_path
-        }
+            "images": self.images
+        })
 
 
-@dataclass
+@dataclass(slots=True)
 class ImageUploadFailed(DomainEvent):
     task_id: uuid.UUID = field(default=None)
     filename: str = field(default=None)
@@ -149,9 +146,8 @@ class ImageUploadFailed(DomainEvent):
     timestamp: datetime = field(default_factory=datetime.now)
     
     def to_dict(self) -> dict:
-        return {
-            **super().to_dict(),
-            "task_id": str(self.task_id),
+        return self._with_base_fields({
+            "task_id": self.task_id,
             "filename": self.filename,
             "error_message": self.error_message,
             "source": self.source,
@@ -159,9 +155,9 @@ class ImageUploadFailed(DomainEvent):
             "modality": self.modality,
             "region": self.region,
             "stack_trace": self.stack_trace
-        }
+        })
         
-@dataclass
+@dataclass(slots=True)
 class ImageDeletionCompleted(DomainEvent):
     image_id: uuid.UUID = field(default=None)
     task_id: uuid.UUID = field(default=None)
@@ -170,14 +166,13 @@ class ImageDeletionCompleted(DomainEvent):
     timestamp: datetime = field(default_factory=datetime.now)
     
     def to_dict(self) -> dict:
-        return {
-            **super().to_dict(),
-            "image_id": str(self.image_id),
-            "task_id": str(self.task_id),
+        return self._with_base_fields({
+            "image_id": self.image_id,
+            "task_id": self.task_id,
             "reason": self.reason
-        }
+        })
 
-@dataclass
+@dataclass(slots=True)
 class ImageDeletionFailed(DomainEvent):
     image_id: uuid.UUID = field(default=None)
     task_id: uuid.UUID = field(default=None)
@@ -187,10 +182,9 @@ class ImageDeletionFailed(DomainEvent):
     timestamp: datetime = field(default_factory=datetime.now)
     
     def to_dict(self) -> dict:
-        return {
-            **super().to_dict(),
-            "image_id": str(self.image_id),
-            "task_id": str(self.task_id),
+        return self._with_base_fields({
+            "image_id": self.image_id,
+            "task_id": self.task_id,
             "error_message": self.error_message,
             "reason": self.reason
-        }
\ No newline at end of file
+        })
\ No newline at end of file
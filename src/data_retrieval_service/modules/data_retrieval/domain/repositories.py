@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence
 import uuid
 
 from .entities import RetrievalTask, ImageData
@@ -9,8 +9,17 @@ class RetrievalRepository(ABC):
     """Interfaz para el repositorio de tareas de recuperación"""
     
     @abstractmethod
-    async def get_by_id(self, task_id: uuid.UUID) -> Optional[RetrievalTask]:
-        """Obtiene una tarea de recuperación por su ID"""
+    async def get_by_id(self, task_id: uuid.UUID, prefetch: Sequence[str] = ()) -> Optional[RetrievalTask]:
+        """
+        Obtiene una tarea de recuperación por su ID.
+        prefetch admite 'images_count' para cargar el número de imágenes en la misma consulta
+        e 'images' para cargar las imágenes de la tarea.
+        """
+        pass
+
+    @abstractmethod
+    async def get_for_update(self, task_id: uuid.UUID) -> Optional[RetrievalTask]:
+        """Obtiene una tarea de recuperación bloqueándola para su modificación"""
         pass
 
     @abstractmethod
@@ -24,18 +33,34 @@ class RetrievalRepository(ABC):
         pass
     
     @abstractmethod
-    async def get_pending_tasks(self) -> List[RetrievalTask]:
-        """Obtiene las tareas pendientes ordenadas por prioridad"""
+    async def get_pending_tasks(
+        self, limit: int = 100, offset: int = 0, prefetch: Sequence[str] = ()
+    ) -> List[RetrievalTask]:
+        """Obtiene una página de las tareas pendientes ordenadas por prioridad"""
         pass
     
     @abstractmethod
-    async def get_tasks_by_source(self, source_id: str, limit: int = 10) -> List[RetrievalTask]:
+    async def get_tasks_by_source(self, source_id: str, limit: int = 10, prefetch: Sequence[str] = ()) -> List[RetrievalTask]:
         """Obtiene tareas de una fuente específica"""
         pass
     
     @abstractmethod
-    async def get_tasks_by_batch(self, batch_id: str) -> List[RetrievalTask]:
-        """Obtiene tareas de un lote específico"""
+    async def get_tasks_by_batch(
+        self, batch_id: str, limit: int = 100, offset: int = 0, prefetch: Sequence[str] = ()
+    ) -> List[RetrievalTask]:
+        """Obtiene una página de las tareas de un lote específico"""
+        pass
+
+    @abstractmethod
+    async def search(
+        self,
+        source_id: Optional[str] = None,
+        batch_id: Optional[str] = None,
+        pending: bool = False,
+        limit: int = 10,
+        prefetch: Sequence[str] = ()
+    ) -> List[RetrievalTask]:
+        """Obtiene tareas aplicando todos los filtros indicados en una sola consulta"""
         pass
 
 
@@ -67,7 +92,22 @@ class ImageRepository(ABC):
         """Obtiene el número de imágenes asociadas a una tarea"""
         pass
     
+    @abstractmethod
+    async def get_images_counts_by_tasks(self, task_ids: List[uuid.UUID]) -> Dict[uuid.UUID, int]:
+        """Obtiene el número de imágenes de cada una de las tareas indicadas"""
+        pass
+    
     @abstractmethod
     async def update_image_status(self, image_id: uuid.UUID, is_stored: bool) -> None:
         """Actualiza el estado de almacenamiento de una imagen"""
+        pass
+
+    @abstractmethod
+    async def mark_deleted_and_count_remaining(self, image_id: uuid.UUID, task_id: uuid.UUID) -> int:
+        """Marca una imagen como eliminada y retorna cuántas imágenes almacenadas le quedan a la tarea"""
+        pass
+
+    @abstractmethod
+    async def mark_batch_deleted_and_count_remaining(self, image_ids: List[uuid.UUID], task_id: uuid.UUID) -> int:
+        """Marca un lote de imágenes como eliminadas y retorna cuántas imágenes almacenadas le quedan a la tarea"""
         pass
\ No newline at end of file
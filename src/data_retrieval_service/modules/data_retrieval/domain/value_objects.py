@@ -33,7 +33,7 @@ class RetrievalMethod(Enum):
     CLOUD_STORAGE = "CLOUD_STORAGE"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ImageMetadata(ValueObject):
     """Metadatos asociados a una imagen médica"""
     format: ImageFormat
@@ -43,7 +43,7 @@ class ImageMetadata(ValueObject):
     dimensions: Optional[str] = None  # Dimensiones de la imagen, como "1024x768"
     
     
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SourceMetadata(ValueObject):
     """Metadatos asociados a una fuente de imágenes médicas"""
     source_type: SourceType
@@ -53,7 +53,7 @@ class SourceMetadata(ValueObject):
     retrieval_method: RetrievalMethod
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RetrievalResult(ValueObject):
     """Resultado de una tarea de recuperación de imágenes"""
     status: RetrievalStatus
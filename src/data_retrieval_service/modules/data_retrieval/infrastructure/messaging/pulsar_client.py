@@ -0,0 +1,48 @@
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+import pulsar
+
+logger = logging.getLogger(__name__)
+
+# Clientes compartidos por URL y token, con el número de usuarios de cada uno
+_CLIENTS: Dict[Tuple[str, Optional[str]], pulsar.Client] = {}
+_REFCOUNTS: Dict[Tuple[str, Optional[str]], int] = {}
+_LOCK = threading.Lock()
+
+
+def acquire_client(service_url: str, token: Optional[str] = None) -> pulsar.Client:
+    """
+    Obtiene el cliente Pulsar compartido para la URL y el token indicados, creándolo
+    la primera vez. Publicadores y consumidores reutilizan así los mismos hilos de I/O
+    y conexiones con el broker. Cada llamada debe emparejarse con release_client().
+    """
+    key = (service_url, token or None)
+    with _LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = pulsar.Client(
+                service_url=service_url,
+                authentication=pulsar.AuthenticationToken(token) if token else None
+            )
+            _CLIENTS[key] = client
+            _REFCOUNTS[key] = 0
+            logger.info("Pulsar client initialized for %s", service_url)
+        _REFCOUNTS[key] += 1
+        return client
+
+
+def release_client(client: pulsar.Client) -> None:
+    """Libera un uso del cliente compartido y lo cierra cuando ya nadie lo utiliza"""
+    with _LOCK:
+        key = next((key for key, cached in _CLIENTS.items() if cached is client), None)
+        if key is None:
+            return
+        _REFCOUNTS[key] -= 1
+        if _REFCOUNTS[key] > 0:
+            return
+        del _CLIENTS[key], _REFCOUNTS[key]
+
+    client.close()
+    logger.info("Pulsar client closed")
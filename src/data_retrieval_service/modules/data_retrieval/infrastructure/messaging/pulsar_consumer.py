@@ -1,31 +1,46 @@
-import json
 import logging
 import asyncio
+import orjson
 import pulsar
 import uuid
-import traceback
-from typing import Dict, Any, List, Callable, Awaitable, Optional
-from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from typing import Dict, Any, List, Callable, Awaitable, Mapping, Optional
+
+from .pulsar_client import acquire_client, release_client
 
 logger = logging.getLogger(__name__)
 
+# Lotes recibidos que pueden esperar en el buzón mientras se despacha el actual
+_MAX_PENDING_BATCHES = 2
+
 class PulsarConsumer:
     """
     Consumidor de mensajes usando Apache Pulsar.
     Se encarga de recibir y procesar comandos del BFF.
     """
 
+    __slots__ = (
+        'service_url', 'subscription_name', 'topics', 'token', 'consumer_config',
+        'command_handlers', 'max_workers', 'batch_size', 'batch_max_bytes',
+        'batch_timeout_ms', 'on_state_change', 'client', 'consumer', '_is_running',
+        '_consumer_task', '_receiver_thread', '_inbox', '_pending_batches',
+        '_inflight', '_tasks', '_timeout_counter', '_log_interval'
+    )
+
     def __init__(
         self,
         service_url: str,
         subscription_name: str,
         topics: List[str],
-        command_handlers: Dict[str, Callable],
+        command_handlers: Mapping[str, Callable],
         token: Optional[str] = None,
         consumer_config: Dict[str, Any] = None,
-        publisher: Optional[Any] = None,
         max_workers: int = 5,
-        get_unit_of_work_func: Optional[Callable] = None
+        batch_size: int = 1000,
+        batch_max_bytes: int = 10 * 1024 * 1024,
+        batch_timeout_ms: int = 250,
+        on_state_change: Optional[Callable[[bool], None]] = None
     ):
         """
         Inicializa el consumidor de Pulsar
@@ -34,12 +49,14 @@ class PulsarConsumer:
             service_url: URL del servicio Pulsar
             subscription_name: Nombre de la suscripción
             topics: Lista de tópicos a los que suscribirse
-            command_handlers: Diccionario que mapea tipos de comandos a sus manejadores
+            command_handlers: Registro que mapea tipos de comandos a sus manejadores ya ligados
             token: Token de autenticación opcional
             consumer_config: Configuración adicional para el consumidor
-            publisher: Instancia de PulsarPublisher para publicar eventos de respuesta
-            max_workers: Número máximo de workers para procesamiento en paralelo
-            get_unit_of_work_func: Función para obtener una nueva instancia de UnitOfWork
+            max_workers: Número máximo de mensajes procesándose en paralelo
+            batch_size: Número máximo de mensajes recibidos por lote
+            batch_max_bytes: Tamaño máximo en bytes de un lote
+            batch_timeout_ms: Tiempo máximo de espera para completar un lote
+            on_state_change: Callback invocado con el nuevo estado al iniciar o detener el consumidor
         """
         self.service_url = service_url
         self.subscription_name = subscription_name
@@ -47,16 +64,22 @@ class PulsarConsumer:
         self.token = token
         self.consumer_config = consumer_config or {}
         self.command_handlers = command_handlers
-        self.publisher = publisher
         self.max_workers = max_workers
-        self.get_unit_of_work_func = get_unit_of_work_func
+        self.batch_size = batch_size
+        self.batch_max_bytes = batch_max_bytes
+        self.batch_timeout_ms = batch_timeout_ms
+        self.on_state_change = on_state_change
         
         # Componentes inicializados bajo demanda
         self.client = None
         self.consumer = None
         self._is_running = False
         self._consumer_task = None
-        self._executor = None
+        self._receiver_thread = None
+        self._inbox = None
+        self._pending_batches = None
+        self._inflight = None
+        self._tasks = set()
         
         # Contador para registro de eventos periódico
         self._timeout_counter = 0
@@ -69,14 +92,14 @@ class PulsarConsumer:
             return
 
         try:
-            # Inicializar cliente Pulsar
-            auth = None
-            if self.token:
-                auth = pulsar.AuthenticationToken(self.token)
+            # Obtener el cliente Pulsar compartido con el publicador
+            self.client = acquire_client(self.service_url, self.token)
             
-            self.client = pulsar.Client(
-                service_url=self.service_url,
-                authentication=auth
+            # Política de recepción por lotes
+            batch_policy = pulsar.ConsumerBatchReceivePolicy(
+                self.batch_size,
+                self.batch_max_bytes,
+                self.batch_timeout_ms
             )
             
             # Verificar si hay múltiples tópicos o solo uno
@@ -86,6 +109,7 @@ class PulsarConsumer:
                     topic=self.topics,  # Pulsar acepta una lista de tópicos aquí
                     subscription_name=self.subscription_name,
                     consumer_type=pulsar.ConsumerType.Shared,
+                    batch_receive_policy=batch_policy,
                     **self.consumer_config
                 )
             else:
@@ -94,23 +118,36 @@ class PulsarConsumer:
                     topic=self.topics[0],
                     subscription_name=self.subscription_name,
                     consumer_type=pulsar.ConsumerType.Shared,
+                    batch_receive_policy=batch_policy,
                     **self.consumer_config
                 )
             
-            logger.info(f"Pulsar consumer initialized for topics {self.topics}")
+            logger.info("Pulsar consumer initialized for topics %s", self.topics)
 
-            # Crear executor de threads
-            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            # Buzón en el que el hilo receptor deposita los lotes recibidos
+            self._inbox = asyncio.Queue()
+            self._pending_batches = threading.BoundedSemaphore(_MAX_PENDING_BATCHES)
+            
+            # Límite de mensajes procesándose a la vez
+            self._inflight = asyncio.Semaphore(self.max_workers)
             
             # Marcar como en ejecución
             self._is_running = True
+            self._notify_state_change()
             
-            # Iniciar tarea de consumo
+            # Iniciar el hilo receptor y la tarea de consumo
+            self._receiver_thread = threading.Thread(
+                target=self._receive_forever,
+                args=(asyncio.get_running_loop(),),
+                name="pulsar-consumer-receiver",
+                daemon=True
+            )
+            self._receiver_thread.start()
             self._consumer_task = asyncio.create_task(self._consume_messages())
             
             logger.info("Pulsar consumer task started")
         except Exception as e:
-            logger.error(f"Error starting Pulsar consumer: {str(e)}")
+            logger.error("Error starting Pulsar consumer: %s", e)
             self.close()
             raise
 
@@ -121,6 +158,7 @@ class PulsarConsumer:
 
         logger.info("Stopping Pulsar consumer...")
         self._is_running = False
+        self._notify_state_change()
         
         if self._consumer_task:
             try:
@@ -130,95 +168,123 @@ class PulsarConsumer:
                 logger.warning("Consumer task did not complete in time, cancelling")
                 self._consumer_task.cancel()
             except Exception as e:
-                logger.error(f"Error stopping consumer task: {str(e)}")
+                logger.error("Error stopping consumer task: %s", e)
             finally:
                 self._consumer_task = None
         
+        if self._receiver_thread:
+            # El hilo receptor termina tras su último batch_receive
+            await asyncio.to_thread(self._receiver_thread.join, 5.0)
+            self._receiver_thread = None
+        
         self.close()
         logger.info("Pulsar consumer stopped")
 
+    def _notify_state_change(self):
+        """Informa el estado de ejecución actual al callback registrado"""
+        if self.on_state_change:
+            self.on_state_change(self._is_running)
+
     def close(self):
         """Cierra todas las conexiones y recursos"""
-        # Cerrar executor
-        if self._executor:
-            self._executor.shutdown(wait=False)
-            self._executor = None
-        
         # Cerrar consumidor
         if self.consumer:
             try:
                 self.consumer.close()
             except Exception as e:
-                logger.warning(f"Error closing consumer: {str(e)}")
+                logger.warning("Error closing consumer: %s", e)
             finally:
                 self.consumer = None
         
         # Cerrar cliente
         if self.client:
             try:
-                self.client.close()
+                release_client(self.client)
             except Exception as e:
-                logger.warning(f"Error closing client: {str(e)}")
+                logger.warning("Error closing client: %s", e)
             finally:
                 self.client = None
 
-    async def _consume_messages(self):
+    def _receive_forever(self, loop: asyncio.AbstractEventLoop):
         """
-        Tarea principal para consumir mensajes de Pulsar.
-        Se ejecuta continuamente hasta que se detiene el consumidor.
+        Bucle del hilo receptor: es el único que llama a batch_receive (bloqueante)
+        y entrega al event loop solo los lotes no vacíos, de modo que las esperas
+        sin mensajes no generan trabajo en el loop.
         """
-        logger.info("Started consuming messages")
-        last_msg_time = asyncio.get_event_loop().time()
+        last_msg_time = time.monotonic()
         
-        while self._is_running:
-            try:
-                # Recibir mensaje (operación bloqueante) con un timeout
-                loop = asyncio.get_event_loop()
-                msg_future = loop.run_in_executor(
-                    self._executor, 
-                    lambda: self.consumer.receive(timeout_millis=1000)
-                )
+        try:
+            while self._is_running:
+                # Limitar los lotes pendientes para conservar la contrapresión
+                if not self._pending_batches.acquire(timeout=1.0):
+                    continue
                 
                 try:
-                    # Esperar mensaje con timeout
-                    msg = await asyncio.wait_for(msg_future, timeout=2.0)
-                    
-                    # Reiniciar contador de timeouts y registrar tiempo
-                    self._timeout_counter = 0
-                    last_msg_time = loop.time()
-                    
-                    # Procesar mensaje en tarea separada
-                    asyncio.create_task(self._process_message(msg))
-                except asyncio.TimeoutError:
-                    # Timeout normal, solo incrementar contador
-                    self._timeout_counter += 1
-                    
-                    # Registrar solo periódicamente para evitar inundar el log
-                    if self._timeout_counter % self._log_interval == 0:
-                        current_time = loop.time()
-                        idle_time = current_time - last_msg_time
-                        logger.debug(f"No new messages in {idle_time:.1f} seconds (timeout count: {self._timeout_counter})")
-                    
-                    # Verificar si debemos seguir ejecutando
-                    continue
+                    messages = self.consumer.batch_receive()
                 except pulsar._pulsar.Timeout:
-                    # Timeout de Pulsar, comportamiento similar
+                    messages = None
+                except Exception as e:
+                    self._pending_batches.release()
+                    if self._is_running:
+                        logger.error("Error receiving message: %s", e)
+                        time.sleep(1.0)  # Pausa para evitar CPU 100%
+                    continue
+                
+                if not messages:
+                    self._pending_batches.release()
+                    
+                    # Timeout normal, registrar solo periódicamente para evitar inundar el log
                     self._timeout_counter += 1
                     if self._timeout_counter % self._log_interval == 0:
-                        logger.debug(f"Pulsar timeout occurred ({self._timeout_counter})")
+                        idle_time = time.monotonic() - last_msg_time
+                        logger.debug("No new messages in %.1f seconds (timeout count: %d)", idle_time, self._timeout_counter)
                     continue
-                except Exception as e:
-                    # Solo registrar errores que no sean timeouts
-                    if not isinstance(e, (asyncio.TimeoutError, pulsar._pulsar.Timeout)):
-                        logger.error(f"Error receiving message: {str(e)}")
-                    await asyncio.sleep(1.0)  # Pausa para evitar CPU 100%
+                
+                # Reiniciar contador de timeouts y registrar tiempo
+                self._timeout_counter = 0
+                last_msg_time = time.monotonic()
+                loop.call_soon_threadsafe(self._inbox.put_nowait, messages)
+        finally:
+            # Avisar a la tarea de consumo de que no llegarán más lotes
+            try:
+                loop.call_soon_threadsafe(self._inbox.put_nowait, None)
+            except RuntimeError:
+                # El event loop ya está cerrado
+                pass
+
+    async def _consume_messages(self):
+        """
+        Tarea principal para consumir mensajes de Pulsar.
+        Procesa los lotes que deposita el hilo receptor hasta que este termina.
+        """
+        logger.info("Started consuming messages")
+        
+        while True:
+            try:
+                messages = await self._inbox.get()
+                if messages is None:
+                    break
+                
+                try:
+                    # Despachar el lote sin superar max_workers mensajes en proceso;
+                    # la espera del semáforo frena a su vez al hilo receptor
+                    for msg in messages:
+                        await self._inflight.acquire()
+                        task = asyncio.create_task(self._process_message(msg))
+                        self._tasks.add(task)
+                        task.add_done_callback(self._tasks.discard)
+                finally:
+                    self._pending_batches.release()
             except asyncio.CancelledError:
                 # La tarea fue cancelada, salir del bucle
                 logger.info("Consumer task cancelled")
                 break
             except Exception as e:
-                logger.error(f"Unexpected error in consumer loop: {str(e)}")
-                await asyncio.sleep(1.0)  # Pausa para evitar CPU 100%
+                logger.error("Unexpected error in consumer loop: %s", e)
+        
+        # Esperar a los mensajes en proceso antes de cerrar el consumidor
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
         
         logger.info("Stopped consuming messages")
 
@@ -233,9 +299,8 @@ class PulsarConsumer:
         command_type = "unknown"
         
         try:
-            # Decodificar el mensaje
-            payload = msg.data().decode('utf-8')
-            data = json.loads(payload)
+            # Decodificar el mensaje directamente desde bytes
+            data = orjson.loads(msg.data())
             
             # Extraer información del comando
             command_type = data.get('type', 'unknown')
@@ -243,32 +308,30 @@ class PulsarConsumer:
             correlation_id = data.get('correlation_id', 'unknown')
             command_data = data.get('data', {})
             
-            logger.info(f"Received command: {command_type} (ID: {command_id})")
+            logger.info("Received command: %s (ID: %s)", command_type, command_id)
             
             # Verificar si existe un manejador para este tipo de comando
-            if command_type in self.command_handlers:
-                handler = self.command_handlers[command_type]
-                
-                # Obtener el unit of work para este comando
-                uow = self.get_unit_of_work_func() if self.get_unit_of_work_func else None
-                
+            handler = self.command_handlers.get(command_type)
+            if handler is not None:
                 # Ejecutar el manejador de comando
-                result = await handler(command_data, uow, self.publisher, correlation_id)
+                await handler(command_data, correlation_id)
                 
-                logger.info(f"Command {command_type} (ID: {command_id}) processed successfully")
+                logger.info("Command %s (ID: %s) processed successfully", command_type, command_id)
                 
                 # Acknowledgment del mensaje procesado
                 self.consumer.acknowledge(msg)
             else:
-                logger.warning(f"No handler found for command type: {command_type}")
+                logger.warning("No handler found for command type: %s", command_type)
                 # Negative acknowledgment para que se reintente
                 self.consumer.negative_acknowledge(msg)
-        except json.JSONDecodeError as e:
-            logger.error(f"Error decoding command message: {str(e)}")
+        except orjson.JSONDecodeError as e:
+            logger.error("Error decoding command message: %s", e)
             # Mensaje malformado, no intentar de nuevo
             self.consumer.acknowledge(msg)
         except Exception as e:
-            logger.error(f"Error processing command {command_type} (ID: {command_id}): {str(e)}")
-            logger.error(traceback.format_exc())
+            # La traza solo se formatea si el registro llega a emitirse
+            logger.exception("Error processing command %s (ID: %s): %s", command_type, command_id, e)
             # Negative acknowledgment para que se reintente
-            self.consumer.negative_acknowledge(msg)
\ No newline at end of file
+            self.consumer.negative_acknowledge(msg)
+        finally:
+            self._inflight.release()
\ No newline at end of file
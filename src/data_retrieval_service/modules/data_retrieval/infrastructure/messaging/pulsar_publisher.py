@@ -1,13 +1,46 @@
-import json
+import functools
 import logging
+import orjson
 import pulsar
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Iterable, Optional, Set, Tuple
 import asyncio
 
 from .....seedwork.domain.events import DomainEvent
+from .pulsar_client import acquire_client, release_client
 
 logger = logging.getLogger(__name__)
 
+# Configuración por defecto de batching y compresión de los productores
+PRODUCER_BATCHING_MAX_MESSAGES = 1000
+PRODUCER_BATCHING_MAX_PUBLISH_DELAY_MS = 5
+PRODUCER_BATCHING_MAX_ALLOWED_SIZE_IN_BYTES = 128 * 1024
+PRODUCER_COMPRESSION_TYPE = "LZ4"
+
+# Tiempo máximo para vaciar la cola de eventos al detener el publicador
+DRAIN_TIMEOUT_SECONDS = 10.0
+
+# Espera exponencial entre reintentos de un evento encolado cuyo envío falló
+RETRY_BASE_DELAY_SECONDS = 0.5
+RETRY_MAX_DELAY_SECONDS = 30.0
+
+# Propiedad del mensaje que indica a los consumidores cómo decodificar el payload
+CONTENT_TYPE_PROPERTY = "content-type"
+
+
+def _get_encoder(encoding: str) -> Tuple[Callable[[dict], bytes], Optional[Dict[str, str]]]:
+    """
+    Retorna la función de codificación de eventos y las propiedades que acompañan a cada mensaje.
+    JSON se envía sin propiedades para seguir siendo compatible con los consumidores actuales.
+    """
+    if encoding == "json":
+        return orjson.dumps, None
+    if encoding == "msgpack":
+        # Importación tardía: msgspec solo es necesario cuando se activa MessagePack
+        import msgspec
+        return msgspec.msgpack.Encoder().encode, {CONTENT_TYPE_PROPERTY: "application/msgpack"}
+    raise ValueError(f"Codificación de eventos no soportada: {encoding}")
+
 
 class PulsarPublisher:
     """
@@ -21,6 +54,9 @@ class PulsarPublisher:
         topics_mapping: Dict[str, str],
         token: str,
         client_config: Dict[str, Any] = None,
+        encoding: str = "json",
+        producer_config: Dict[str, Any] = None,
+        max_workers: int = 16,
     ):
         """
         Inicializa el publicador de mensajes
@@ -29,50 +65,151 @@ class PulsarPublisher:
             service_url: URL del servicio Pulsar
             topics_mapping: Diccionario que mapea tipos de eventos a tópicos
             client_config: Configuración adicional para el cliente Pulsar
+            encoding: Formato del payload de los eventos ("json" o "msgpack")
+            producer_config: Opciones de create_producer que sustituyen a las de batching y compresión por defecto
+            max_workers: Número de hilos dedicados a las llamadas bloqueantes del cliente Pulsar
         """
         self.service_url = service_url
         self.topics_mapping = topics_mapping
         self.token = token
         self.client_config = client_config or {}
+        self._encode, self._properties = _get_encoder(encoding)
+        self.producer_config = {
+            "batching_max_messages": PRODUCER_BATCHING_MAX_MESSAGES,
+            "batching_max_publish_delay_ms": PRODUCER_BATCHING_MAX_PUBLISH_DELAY_MS,
+            "batching_max_allowed_size_in_bytes": PRODUCER_BATCHING_MAX_ALLOWED_SIZE_IN_BYTES,
+            "compression_type": PRODUCER_COMPRESSION_TYPE,
+            **(producer_config or {}),
+        }
+        # La compresión se puede indicar por nombre, p. ej. "LZ4", "ZSTD" o "NONE"
+        compression_type = self.producer_config["compression_type"]
+        if isinstance(compression_type, str):
+            self.producer_config["compression_type"] = getattr(pulsar.CompressionType, compression_type)
+        self.max_workers = max_workers
         self.client = None
         self.producers = {}
+        # Creaciones de productores en curso, compartidas por las publicaciones que las esperan
+        self._creating_producers: Dict[str, asyncio.Future] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._drain_task: Optional[asyncio.Task] = None
+        # Eventos encolados aún no confirmados por el broker y reintentos programados
+        self._undelivered: Dict[int, DomainEvent] = {}
+        self._retries: Set[asyncio.TimerHandle] = set()
+        # Tópico resuelto para cada clase de evento
+        self._topics_by_class: Dict[type, str] = {}
 
     def _initialize(self):
         """Inicializa la conexión a Pulsar si aún no existe"""
         if not self.client:
             try:
-                self.client = pulsar.Client(
-                    service_url=self.service_url,
-                    authentication=pulsar.AuthenticationToken(self.token),
+                # Cliente compartido con el resto de publicadores y consumidores de la aplicación
+                self.client = acquire_client(self.service_url, self.token)
+
+                # Pool propio para no competir con el executor por defecto del loop
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="pulsar-pub"
                 )
 
                 logger.info("Pulsar client initialized successfully")
             except Exception as e:
-                logger.error(f"Error initializing Pulsar client: {str(e)}")
+                logger.error("Error initializing Pulsar client: %s", e)
                 raise
 
     def _get_topic_for_event(self, event: DomainEvent) -> str:
-        """Determina el tópico para un tipo de evento"""
-        event_type = event.__class__.__name__
+        """Determina el tópico para un tipo de evento, resolviéndolo una sola vez por clase"""
+        event_class = event.__class__
+        topic = self._topics_by_class.get(event_class)
+        if topic is None:
+            topic = self._resolve_topic(event_class.__name__)
+            self._topics_by_class[event_class] = topic
+        return topic
 
+    def _resolve_topic(self, event_type: str) -> str:
+        """Calcula el tópico de un tipo de evento a partir del mapeo configurado"""
         if event_type in self.topics_mapping:
             return self.topics_mapping[event_type]
 
         # Fallback to default topic using the event type name
         return f"persistent://public/default/retrieval-{event_type.lower()}"
 
+    def _create_producer(self, topic: str):
+        """Crea un productor para un tópico (bloqueante)"""
+        try:
+            producer = self.client.create_producer(
+                topic=topic,
+                batching_enabled=True,
+                block_if_queue_full=True,
+                **self.producer_config
+            )
+            logger.info("Created producer for topic: %s", topic)
+            return producer
+        except Exception as e:
+            logger.error("Error creating producer for topic %s: %s", topic, e)
+            raise
+
     def _get_producer(self, topic: str):
-        """Obtiene o crea un productor para un tópico específico"""
+        """
+        Obtiene o crea un productor para un tópico específico. Los métodos asíncronos
+        crean antes el productor con _ensure_producer, de modo que aquí ya existe.
+        """
         if topic not in self.producers:
-            try:
-                self.producers[topic] = self.client.create_producer(topic=topic)
-                logger.info(f"Created producer for topic: {topic}")
-            except Exception as e:
-                logger.error(f"Error creating producer for topic {topic}: {str(e)}")
-                raise
+            self.producers[topic] = self._create_producer(topic)
 
         return self.producers[topic]
 
+    async def _ensure_producer(self, topic: str):
+        """Crea en el pool de hilos el productor de un tópico si aún no existe"""
+        if topic in self.producers:
+            return
+
+        future = self._creating_producers.get(topic)
+        if future is None:
+            self._initialize()
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, self._create_producer, topic)
+            self._creating_producers[topic] = future
+            future.add_done_callback(functools.partial(self._on_producer_created, topic))
+
+        # Cancelar a quien espera no debe cancelar la creación compartida
+        await asyncio.shield(future)
+
+    def _on_producer_created(self, topic: str, future: asyncio.Future):
+        """Registra el productor creado; el error, si lo hubo, ya quedó registrado"""
+        del self._creating_producers[topic]
+        if not future.cancelled() and future.exception() is None:
+            self.producers[topic] = future.result()
+
+    async def _create_mapped_producers(self):
+        """
+        Crea en paralelo los productores de los tópicos mapeados, para que
+        el primer evento de cada tipo no pague la creación del productor
+        """
+        # Los errores ya quedaron registrados; el productor se creará al publicar
+        await asyncio.gather(
+            *[self._ensure_producer(topic) for topic in set(self.topics_mapping.values())],
+            return_exceptions=True
+        )
+
+    def _serialize_event(self, event: DomainEvent) -> bytes:
+        """
+        Serializa el evento con la codificación configurada y guarda el resultado en el propio evento,
+        de modo que reintentos o publicaciones repetidas no lo vuelvan a codificar
+        """
+        payload = getattr(event, "_serialized", None)
+        if payload is None:
+            # Convertir el evento a un diccionario
+            event_dict = event.to_dict()
+
+            # Añadir el tipo de evento si no existe
+            if "type" not in event_dict:
+                event_dict["type"] = event.__class__.__name__
+
+            payload = self._encode(event_dict)
+            event._serialized = payload
+        return payload
+
     async def publish_event(self, event: DomainEvent):
         """
         Publica un evento de dominio en Pulsar
@@ -87,30 +224,78 @@ class PulsarPublisher:
             # Determinar el tópico para el evento
             topic = self._get_topic_for_event(event)
 
-            # Convertir el evento a un diccionario
-            event_dict = event.to_dict()
-
-            # Añadir el tipo de evento si no existe
-            if "type" not in event_dict:
-                event_dict["type"] = event.__class__.__name__
-
-            # Serializar el evento a JSON
-            event_json = json.dumps(event_dict)
+            # Serializar el evento (una sola vez por evento)
+            payload = self._serialize_event(event)
 
-            # Obtener un productor para el tópico
+            # Obtener un productor para el tópico, creándolo fuera del event loop si hace falta
+            await self._ensure_producer(topic)
             producer = self._get_producer(topic)
 
             # Enviar el mensaje de forma asíncrona
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(
-                None, lambda: producer.send(event_json.encode("utf-8"))
-            )
+            loop = asyncio.get_running_loop()
+            # properties es el segundo parámetro posicional de send; se evita crear un partial por evento
+            await loop.run_in_executor(self._executor, producer.send, payload, self._properties)
 
-            logger.info(f"Event {event.__class__.__name__} published to topic {topic}")
+            logger.info("Event %s published to topic %s", event.__class__.__name__, topic)
         except Exception as e:
-            logger.error(f"Error publishing event {event.__class__.__name__}: {str(e)}")
+            logger.error("Error publishing event %s: %s", event.__class__.__name__, e)
             raise
 
+    def publish_event_async(self, event: DomainEvent) -> asyncio.Future:
+        """
+        Envía un evento de dominio con send_async sin esperar la confirmación del broker.
+        El productor del tópico debe existir ya (ver _ensure_producer); si no, se crea de forma bloqueante.
+
+        Args:
+            event: Evento de dominio a publicar
+
+        Returns:
+            asyncio.Future: Se resuelve cuando el broker confirma el mensaje
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        event_type = event.__class__.__name__
+
+        # Asegurarse de que el cliente está inicializado
+        self._initialize()
+
+        # Determinar el tópico para el evento
+        topic = self._get_topic_for_event(event)
+
+        # Serializar el evento (una sola vez por evento)
+        payload = self._serialize_event(event)
+
+        # Obtener un productor para el tópico
+        producer = self._get_producer(topic)
+
+        def _resolve(result):
+            if future.done():
+                return
+            if result == pulsar.Result.Ok:
+                logger.info("Event %s published to topic %s", event_type, topic)
+                future.set_result(None)
+            else:
+                logger.error("Error publishing event %s: %s", event_type, result)
+                future.set_exception(Exception(f"Error publishing event {event_type}: {result}"))
+
+        def _on_send(result, msg_id):
+            # El callback se ejecuta en un hilo del cliente de Pulsar
+            loop.call_soon_threadsafe(_resolve, result)
+
+        producer.send_async(payload, _on_send, properties=self._properties)
+        return future
+
+    async def flush(self):
+        """Envía de inmediato los mensajes pendientes en los lotes de todos los productores"""
+        if not self.producers:
+            return
+
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[
+            loop.run_in_executor(self._executor, producer.flush)
+            for producer in self.producers.values()
+        ])
+
     async def publish_events(self, events: list[DomainEvent]):
         """
         Publica una lista de eventos de dominio en Pulsar
@@ -118,8 +303,123 @@ class PulsarPublisher:
         Args:
             events: Lista de eventos de dominio a publicar
         """
+        if not events:
+            return
+
+        # Crear fuera del event loop los productores que falten
+        await asyncio.gather(*[
+            self._ensure_producer(topic)
+            for topic in {self._get_topic_for_event(event) for event in events}
+        ])
+
+        # Encolar todos los envíos y esperar las confirmaciones en conjunto
+        futures = [self.publish_event_async(event) for event in events]
+        await self.flush()
+        await asyncio.gather(*futures)
+
+    def start(self):
+        """Inicia la tarea en segundo plano que envía los eventos encolados"""
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = asyncio.get_running_loop().create_task(self._drain())
+
+    def enqueue(self, event: DomainEvent):
+        """
+        Encola un evento para publicarlo en segundo plano sin esperar al broker
+
+        Args:
+            event: Evento de dominio a publicar
+        """
+        self.start()
+        self._undelivered[id(event)] = event
+        self._queue.put_nowait((event, 0))
+
+    def enqueue_events(self, events: Iterable[DomainEvent]):
+        """
+        Encola una lista de eventos para publicarlos en segundo plano
+
+        Args:
+            events: Eventos de dominio a publicar
+        """
         for event in events:
-            await self.publish_event(event)
+            self.enqueue(event)
+
+    async def _drain(self):
+        """Envía los eventos de la cola con send_async y procesa sus confirmaciones aparte"""
+        try:
+            await self._create_mapped_producers()
+        except Exception as e:
+            logger.error("Error creating producers for mapped topics: %s", e)
+
+        while True:
+            event, attempt = await self._queue.get()
+            try:
+                await self._ensure_producer(self._get_topic_for_event(event))
+                future = self.publish_event_async(event)
+            except Exception as e:
+                logger.error("Error publishing event %s: %s", event.__class__.__name__, e)
+                self._schedule_retry(event, attempt)
+                continue
+            future.add_done_callback(functools.partial(self._on_published, event, attempt))
+
+    def _on_published(self, event: DomainEvent, attempt: int, future: asyncio.Future):
+        """Marca el evento como procesado cuando el broker lo confirma o programa su reintento"""
+        # El error ya quedó registrado al resolver el envío
+        if future.cancelled() or future.exception() is not None:
+            self._schedule_retry(event, attempt)
+            return
+        self._undelivered.pop(id(event), None)
+        self._queue.task_done()
+
+    def _schedule_retry(self, event: DomainEvent, attempt: int):
+        """
+        Vuelve a encolar el evento tras una espera exponencial. El elemento original no se
+        marca como procesado hasta reencolarlo, de modo que drain() sigue esperándolo.
+        """
+        delay = min(RETRY_BASE_DELAY_SECONDS * 2 ** attempt, RETRY_MAX_DELAY_SECONDS)
+        logger.warning(
+            "Retrying event %s in %.1f seconds (attempt %d)",
+            event.__class__.__name__, delay, attempt + 1
+        )
+        handle = None
+
+        def _requeue():
+            self._retries.discard(handle)
+            self._queue.put_nowait((event, attempt + 1))
+            self._queue.task_done()
+
+        handle = asyncio.get_running_loop().call_later(delay, _requeue)
+        self._retries.add(handle)
+
+    async def drain(self):
+        """Espera a que todos los eventos encolados hayan sido confirmados por el broker"""
+        await self.flush()
+        await self._queue.join()
+
+    async def stop(self):
+        """Vacía la cola de eventos pendientes y detiene la tarea de envío"""
+        if self._drain_task is None:
+            return
+
+        try:
+            await asyncio.wait_for(self.drain(), timeout=DRAIN_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning("Timed out draining %d pending events", len(self._undelivered))
+
+        self._drain_task.cancel()
+        try:
+            await self._drain_task
+        except asyncio.CancelledError:
+            pass
+        self._drain_task = None
+
+        for handle in self._retries:
+            handle.cancel()
+        self._retries.clear()
+
+        # Dejar constancia de los eventos que no llegaron al broker para poder reenviarlos
+        for event in self._undelivered.values():
+            logger.error("Undelivered event %s: %s", event.__class__.__name__, event.to_dict())
+        self._undelivered.clear()
 
     def close(self):
         """Cierra las conexiones con Pulsar"""
@@ -128,14 +428,16 @@ class PulsarPublisher:
                 try:
                     producer.close()
                 except Exception as e:
-                    logger.warning(
-                        f"Error closing producer for topic {topic}: {str(e)}"
-                    )
+                    logger.warning("Error closing producer for topic %s: %s", topic, e)
 
             try:
-                self.client.close()
+                release_client(self.client)
                 self.client = None
                 self.producers = {}
-                logger.info("Pulsar client closed successfully")
+                logger.info("Pulsar client released successfully")
             except Exception as e:
-                logger.warning(f"Error closing Pulsar client: {str(e)}")
+                logger.warning("Error closing Pulsar client: %s", e)
+
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
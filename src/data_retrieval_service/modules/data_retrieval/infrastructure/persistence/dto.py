@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, JSON, ForeignKey, Boolean, DateTime
+from sqlalchemy import Column, String, Integer, JSON, ForeignKey, Boolean, DateTime, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -40,13 +40,26 @@ class RetrievalTaskDTO(Base):
     # Relación con imágenes
     images = relationship("ImageDataDTO", back_populates="task", cascade="all, delete-orphan")
 
+    # Índices alineados con el orden de las consultas de listado, para recorrer
+    # las filas ya ordenadas en lugar de ordenar la tabla completa
+    __table_args__ = (
+        # Parcial: solo contiene las tareas pendientes
+        Index(
+            "ix_retrieval_tasks_pending",
+            priority.desc(), created_at.desc(), id,
+            postgresql_where=(status == "PENDING")
+        ),
+        Index("ix_retrieval_tasks_source_created", source_id, created_at.desc()),
+        Index("ix_retrieval_tasks_batch_created", batch_id, created_at.desc(), id),
+    )
+
 
 class ImageDataDTO(Base):
     """DTO para la entidad ImageData"""
     __tablename__ = "images"
 
     id = Column(UUID(as_uuid=True), primary_key=True)
-    task_id = Column(UUID(as_uuid=True), ForeignKey("retrieval_tasks.id"), nullable=False)
+    task_id = Column(UUID(as_uuid=True), ForeignKey("retrieval_tasks.id"), nullable=False, index=True)
     filename = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
     
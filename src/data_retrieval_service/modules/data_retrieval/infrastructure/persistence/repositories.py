@@ -1,7 +1,9 @@
 import datetime
-from typing import List, Optional
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence
 import uuid
-from sqlalchemy import select, desc, func
+from sqlalchemy import select, update, desc, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...domain.entities import RetrievalTask, ImageData
@@ -18,6 +20,41 @@ from ...domain.value_objects import (
 
 from .dto import RetrievalTaskDTO, ImageDataDTO
 
+# Columnas de la tarea que no se sobrescriben al actualizarla
+_UPSERT_IMMUTABLE_COLUMNS = ("id", "created_at")
+
+# Columnas de las tablas para las lecturas que no necesitan objetos ORM
+_TASK_COLUMNS = tuple(RetrievalTaskDTO.__table__.c)
+_IMAGE_COLUMNS = tuple(ImageDataDTO.__table__.c)
+
+# Miembros de los enums indexados por su valor: evita pasar por Enum(value) en cada fila
+_SOURCE_TYPES = {member.value: member for member in SourceType}
+_RETRIEVAL_METHODS = {member.value: member for member in RetrievalMethod}
+_RETRIEVAL_STATUSES = {member.value: member for member in RetrievalStatus}
+_IMAGE_FORMATS = {member.value: member for member in ImageFormat}
+_PENDING = RetrievalStatus.PENDING.value
+
+
+def _image_dto_to_entity(dto: ImageDataDTO) -> ImageData:
+    """Convierte un DTO de imagen (o una fila con sus mismas columnas) a una entidad de dominio"""
+    metadata = ImageMetadata(
+        format=_IMAGE_FORMATS[dto.format],
+        modality=dto.modality,
+        region=dto.region,
+        size_bytes=dto.size_bytes,
+        dimensions=dto.dimensions
+    )
+    return ImageData(
+        id=dto.id,
+        metadata=metadata,
+        filename=dto.filename,
+        file_path=dto.file_path,
+        size_bytes=dto.size_bytes,
+        is_stored=dto.is_stored,
+        created_at=dto.created_at,
+        updated_at=dto.updated_at
+    )
+
 
 class SQLRetrievalRepository(RetrievalRepository):
     """Implementación de RetrievalRepository con SQLAlchemy"""
@@ -25,108 +62,188 @@ class SQLRetrievalRepository(RetrievalRepository):
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_by_id(self, task_id: uuid.UUID) -> Optional[RetrievalTask]:
+    @staticmethod
+    def _select_tasks(prefetch: Sequence[str] = ()):
+        """
+        Construye el SELECT de tareas sobre las columnas de la tabla, de modo que las filas
+        se leen sin hidratar objetos ORM ni pasar por el identity map. Con 'images_count'
+        en prefetch agrega el número de imágenes como columna calculada (LEFT JOIN a un
+        conteo agrupado por tarea), evitando una consulta adicional al repositorio de imágenes.
+        """
+        if 'images_count' not in prefetch:
+            return select(*_TASK_COLUMNS)
+
+        counts = (
+            select(ImageDataDTO.task_id, func.count(ImageDataDTO.id).label('images_count'))
+            .group_by(ImageDataDTO.task_id)
+            .subquery()
+        )
+        return (
+            select(*_TASK_COLUMNS, func.coalesce(counts.c.images_count, 0).label('images_count'))
+            .outerjoin(counts, counts.c.task_id == RetrievalTaskDTO.id)
+        )
+
+    async def _fetch_tasks(self, query, prefetch: Sequence[str] = ()) -> List[RetrievalTask]:
+        """
+        Ejecuta un SELECT de tareas y adjunta a cada entidad los valores precargados.
+        Con 'images' en prefetch, las imágenes de todas las tareas se obtienen en una sola
+        consulta adicional; sin él, las entidades se construyen sin imágenes.
+        """
+        rows = (await self.session.execute(query)).all()
+        if not rows:
+            return []
+
+        images_by_task = defaultdict(list)
+        if 'images' in prefetch:
+            images_query = select(*_IMAGE_COLUMNS).where(ImageDataDTO.task_id.in_([row.id for row in rows]))
+            for image_row in await self.session.execute(images_query):
+                images_by_task[image_row.task_id].append(image_row)
+
+        with_count = 'images_count' in prefetch
+        tasks = []
+        for row in rows:
+            task = self._build_entity(row, images_by_task.get(row.id, ()))
+            task.images_count = row.images_count if with_count else None
+            tasks.append(task)
+        return tasks
+
+    async def get_by_id(self, task_id: uuid.UUID, prefetch: Sequence[str] = ()) -> Optional[RetrievalTask]:
         """Obtiene una tarea de recuperación por su ID"""
+        if prefetch:
+            query = self._select_tasks(prefetch).filter(RetrievalTaskDTO.id == task_id)
+            tasks = await self._fetch_tasks(query, prefetch)
+            return tasks[0] if tasks else None
+
         dto = await self.session.get(RetrievalTaskDTO, task_id)
         if not dto:
             return None
         return await self._dto_to_entity(dto)
 
+    async def get_for_update(self, task_id: uuid.UUID) -> Optional[RetrievalTask]:
+        """
+        Obtiene una tarea bloqueando su fila (SELECT ... FOR UPDATE) hasta el fin de la transacción.
+        El DTO queda en el identity map de la sesión y update() lo sincroniza al escribir.
+        """
+        dto = await self.session.get(RetrievalTaskDTO, task_id, with_for_update=True)
+        if not dto:
+            return None
+        return await self._dto_to_entity(dto)
+
     async def save(self, task: RetrievalTask) -> None:
         """Guarda una tarea de recuperación"""
-        # Check if the task already exists
-        existing_task = await self.session.get(RetrievalTaskDTO, task.id)
-        
-        if existing_task:
-            # If the task exists, update it instead of creating a new one
-            await self.update(task)
-        else:
-            # Otherwise, create a new task
-            dto = await self._entity_to_dto(task)
-            self.session.add(dto)
-            await self.session.commit()
+        # Upsert en una sola sentencia: crea la tarea o actualiza la existente sin consultarla antes
+        row = self._entity_to_row(task)
+        stmt = pg_insert(RetrievalTaskDTO).values(**row)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RetrievalTaskDTO.id],
+            set_={
+                **{column: stmt.excluded[column] for column in row if column not in _UPSERT_IMMUTABLE_COLUMNS},
+                "updated_at": datetime.datetime.now()
+            }
+        )
+        await self.session.execute(stmt)
 
     async def update(self, task: RetrievalTask) -> None:
         """Actualiza una tarea de recuperación existente"""
-        # Get existing task
-        existing_task = await self.session.get(RetrievalTaskDTO, task.id)
-        if not existing_task:
-            raise ValueError(f"No se puede actualizar una tarea que no existe: {task.id}")
-        
-        # Update the existing task with the new values
-        existing_task.batch_id = task.batch_id
-        existing_task.source_type = task.source_metadata.source_type.value
-        existing_task.source_name = task.source_metadata.source_name
-        existing_task.source_id = task.source_metadata.source_id
-        existing_task.location = task.source_metadata.location
-        existing_task.retrieval_method = task.source_metadata.retrieval_method.value
-        existing_task.priority = task.priority
-        existing_task.storage_path = task.storage_path
-        existing_task.status = task.result.status.value if task.result else RetrievalStatus.PENDING.value
-        existing_task.message = task.result.message if task.result else None
-        existing_task.total_images = task.result.total_images if task.result else 0
-        existing_task.successful_images = task.result.successful_images if task.result else 0
-        existing_task.failed_images = task.result.failed_images if task.result else 0
-        existing_task.details = task.result.details if task.result else None
-        existing_task._metadata = task.metadata
-        existing_task.updated_at = datetime.datetime.now()
-        existing_task.started_at = task.started_at
-        existing_task.completed_at = task.completed_at
+        row = self._entity_to_row(task)
+        for column in _UPSERT_IMMUTABLE_COLUMNS:
+            del row[column]
+        row["updated_at"] = datetime.datetime.now()
         
-        # No need to add the DTO to the session as it's already tracked
-        await self.session.commit()
+        # Un único UPDATE; la sesión sincroniza el DTO si ya estaba cargado (p. ej. por get_for_update)
+        result = await self.session.execute(
+            update(RetrievalTaskDTO).where(RetrievalTaskDTO.id == task.id).values(**row)
+        )
+        if result.rowcount == 0:
+            raise ValueError(f"No se puede actualizar una tarea que no existe: {task.id}")
 
-    async def get_pending_tasks(self) -> List[RetrievalTask]:
-        """Obtiene las tareas pendientes ordenadas por prioridad"""
+    async def get_pending_tasks(
+        self, limit: int = 100, offset: int = 0, prefetch: Sequence[str] = ()
+    ) -> List[RetrievalTask]:
+        """Obtiene una página de las tareas pendientes ordenadas por prioridad"""
         query = (
-            select(RetrievalTaskDTO)
+            self._select_tasks(prefetch)
             .filter(RetrievalTaskDTO.status == RetrievalStatus.PENDING.value)
-            .order_by(desc(RetrievalTaskDTO.priority))
+            .order_by(desc(RetrievalTaskDTO.priority), desc(RetrievalTaskDTO.created_at), RetrievalTaskDTO.id)
+            .offset(offset)
+            .limit(limit)
         )
-        result = await self.session.execute(query)
-        dtos = result.scalars().all()
-        return [await self._dto_to_entity(dto) for dto in dtos]
+        return await self._fetch_tasks(query, prefetch)
 
-    async def get_tasks_by_source(self, source_id: str, limit: int = 10) -> List[RetrievalTask]:
+    async def get_tasks_by_source(
+        self, source_id: str, limit: int = 10, prefetch: Sequence[str] = ()
+    ) -> List[RetrievalTask]:
         """Obtiene tareas por fuente"""
         query = (
-            select(RetrievalTaskDTO)
+            self._select_tasks(prefetch)
             .filter(RetrievalTaskDTO.source_id == source_id)
             .order_by(desc(RetrievalTaskDTO.created_at))
             .limit(limit)
         )
-        result = await self.session.execute(query)
-        dtos = result.scalars().all()
-        return [await self._dto_to_entity(dto) for dto in dtos]
+        return await self._fetch_tasks(query, prefetch)
 
-    async def get_tasks_by_batch(self, batch_id: str) -> List[RetrievalTask]:
-        """Obtiene tareas por lote"""
+    async def get_tasks_by_batch(
+        self, batch_id: str, limit: int = 100, offset: int = 0, prefetch: Sequence[str] = ()
+    ) -> List[RetrievalTask]:
+        """Obtiene una página de las tareas de un lote"""
         query = (
-            select(RetrievalTaskDTO)
+            self._select_tasks(prefetch)
             .filter(RetrievalTaskDTO.batch_id == batch_id)
-            .order_by(desc(RetrievalTaskDTO.created_at))
+            .order_by(desc(RetrievalTaskDTO.created_at), RetrievalTaskDTO.id)
+            .offset(offset)
+            .limit(limit)
         )
-        result = await self.session.execute(query)
-        dtos = result.scalars().all()
-        return [await self._dto_to_entity(dto) for dto in dtos]
+        return await self._fetch_tasks(query, prefetch)
+
+    async def search(
+        self,
+        source_id: Optional[str] = None,
+        batch_id: Optional[str] = None,
+        pending: bool = False,
+        limit: int = 10,
+        prefetch: Sequence[str] = ()
+    ) -> List[RetrievalTask]:
+        """Obtiene tareas aplicando todos los filtros indicados en una sola consulta"""
+        query = self._select_tasks(prefetch)
+        if source_id:
+            query = query.filter(RetrievalTaskDTO.source_id == source_id)
+        if batch_id:
+            query = query.filter(RetrievalTaskDTO.batch_id == batch_id)
+        if pending:
+            query = query.filter(RetrievalTaskDTO.status == RetrievalStatus.PENDING.value)
+            query = query.order_by(desc(RetrievalTaskDTO.priority), desc(RetrievalTaskDTO.created_at))
+        else:
+            query = query.order_by(desc(RetrievalTaskDTO.created_at))
+        query = query.limit(limit)
+        return await self._fetch_tasks(query, prefetch)
 
     async def _dto_to_entity(self, dto: RetrievalTaskDTO) -> RetrievalTask:
-        """Convierte un DTO a una entidad de dominio"""
+        """Convierte un DTO a una entidad de dominio, cargando sus imágenes"""
+        query = select(ImageDataDTO).filter(ImageDataDTO.task_id == dto.id)
+        result = await self.session.execute(query)
+        return self._build_entity(dto, result.scalars().all())
+
+    @staticmethod
+    def _build_entity(dto: RetrievalTaskDTO, image_dtos: Iterable[ImageDataDTO]) -> RetrievalTask:
+        """
+        Construye la entidad de dominio a partir del DTO de la tarea y los de sus imágenes.
+        Acepta también filas con las mismas columnas, que se leen por atributo igual que los DTO.
+        """
         
         # Convertir los metadatos de la fuente
         source_metadata = SourceMetadata(
-            source_type=SourceType(dto.source_type),
+            source_type=_SOURCE_TYPES[dto.source_type],
             source_name=dto.source_name,
             source_id=dto.source_id,
             location=dto.location,
-            retrieval_method=RetrievalMethod(dto.retrieval_method)
+            retrieval_method=_RETRIEVAL_METHODS[dto.retrieval_method]
         )
 
         # Convertir el resultado si existe
         result = None
-        if dto.status != RetrievalStatus.PENDING.value:
+        if dto.status != _PENDING:
             result = RetrievalResult(
-                status=RetrievalStatus(dto.status),
+                status=_RETRIEVAL_STATUSES[dto.status],
                 message=dto.message or "",
                 total_images=dto.total_images,
                 successful_images=dto.successful_images,
@@ -149,64 +266,36 @@ class SQLRetrievalRepository(RetrievalRepository):
             updated_at=dto.updated_at
         )
 
-        # Obtener y adjuntar imágenes si es necesario
-        query = select(ImageDataDTO).filter(ImageDataDTO.task_id == dto.id)
-        result = await self.session.execute(query)
-        image_dtos = result.scalars().all()
-
-        for image_dto in image_dtos:
-            # Crear los metadatos de la imagen
-            image_metadata = ImageMetadata(
-                format=ImageFormat(image_dto.format),
-                modality=image_dto.modality,
-                region=image_dto.region,
-                size_bytes=image_dto.size_bytes,
-                dimensions=image_dto.dimensions
-            )
-
-            # Crear la entidad de imagen
-            image = ImageData(
-                id=image_dto.id,
-                metadata=image_metadata,
-                filename=image_dto.filename,
-                file_path=image_dto.file_path,
-                size_bytes=image_dto.size_bytes,
-                is_stored=image_dto.is_stored,
-                created_at=image_dto.created_at,
-                updated_at=image_dto.updated_at
-            )
-            
-            task.images.append(image)
+        # Adjuntar las imágenes
+        task.images = [_image_dto_to_entity(image_dto) for image_dto in image_dtos]
 
         return task
 
-    async def _entity_to_dto(self, entity: RetrievalTask) -> RetrievalTaskDTO:
-        """Convierte una entidad de dominio a un DTO"""
-        
-        dto = RetrievalTaskDTO(
-            id=entity.id,
-            batch_id=entity.batch_id,
-            source_type=entity.source_metadata.source_type.value,
-            source_name=entity.source_metadata.source_name,
-            source_id=entity.source_metadata.source_id,
-            location=entity.source_metadata.location,
-            retrieval_method=entity.source_metadata.retrieval_method.value,
-            priority=entity.priority,
-            storage_path=entity.storage_path,
-            status=entity.result.status.value if entity.result else RetrievalStatus.PENDING.value,
-            message=entity.result.message if entity.result else None,
-            total_images=entity.result.total_images if entity.result else 0,
-            successful_images=entity.result.successful_images if entity.result else 0,
-            failed_images=entity.result.failed_images if entity.result else 0,
-            details=entity.result.details if entity.result else None,
-            _metadata=entity.metadata,
-            created_at=entity.created_at,
-            updated_at=entity.updated_at,
-            started_at=entity.started_at,
-            completed_at=entity.completed_at
-        )
-        
-        return dto
+    def _entity_to_row(self, entity: RetrievalTask) -> Dict[str, Any]:
+        """Convierte una entidad de dominio a los valores de columna de su fila"""
+        result = entity.result
+        return {
+            "id": entity.id,
+            "batch_id": entity.batch_id,
+            "source_type": entity.source_metadata.source_type.value,
+            "source_name": entity.source_metadata.source_name,
+            "source_id": entity.source_metadata.source_id,
+            "location": entity.source_metadata.location,
+            "retrieval_method": entity.source_metadata.retrieval_method.value,
+            "priority": entity.priority,
+            "storage_path": entity.storage_path,
+            "status": result.status.value if result else RetrievalStatus.PENDING.value,
+            "message": result.message if result else None,
+            "total_images": result.total_images if result else 0,
+            "successful_images": result.successful_images if result else 0,
+            "failed_images": result.failed_images if result else 0,
+            "details": result.details if result else None,
+            "_metadata": entity.metadata,
+            "created_at": entity.created_at,
+            "updated_at": entity.updated_at,
+            "started_at": entity.started_at,
+            "completed_at": entity.completed_at
+        }
 
 
 class SQLImageRepository(ImageRepository):
@@ -218,58 +307,72 @@ class SQLImageRepository(ImageRepository):
     async def save(self, image: ImageData, task_id: uuid.UUID) -> None:
         """Guarda una imagen"""
         
-        # Verificar si ya existe la imagen
-        existing_image = await self.session.get(ImageDataDTO, image.id)
-        if existing_image:
-            # Si ya existe, actualizar
-            await self.update_image(image, task_id)
-            return
-        
-        # Crear DTO de imagen
-        image_dto = ImageDataDTO(
-            id=image.id,
-            task_id=task_id,
-            filename=image.filename,
-            file_path=image.file_path,
-            format=image.metadata.format.value,
-            modality=image.metadata.modality,
-            region=image.metadata.region,
-            size_bytes=image.size_bytes,
-            dimensions=image.metadata.dimensions,
-            is_stored=image.is_stored,
-            created_at=image.created_at,
-            updated_at=image.updated_at
-        )
-        
-        self.session.add(image_dto)
-        await self.session.commit()
+        # Mismo upsert que el lote: una sola sentencia, sin consultar antes si existe
+        await self.save_batch([image], task_id)
     
     async def update_image(self, image: ImageData, task_id: uuid.UUID) -> None:
         """Actualiza una imagen existente"""
-        existing_image = await self.session.get(ImageDataDTO, image.id)
-        if not existing_image:
-            raise ValueError(f"No se puede actualizar una imagen que no existe: {image.id}")
-        
-        # Actualizar campos
-        existing_image.task_id = task_id
-        existing_image.filename = image.filename
-        existing_image.file_path = image.file_path
-        existing_image.format = image.metadata.format.value
-        existing_image.modality = image.metadata.modality
-        existing_image.region = image.metadata.region
-        existing_image.size_bytes = image.size_bytes
-        existing_image.dimensions = image.metadata.dimensions
-        existing_image.is_stored = image.is_stored
-        existing_image.updated_at = datetime.datetime.now()
+        row = self._entity_to_row(image, task_id)
+        del row["id"], row["created_at"]
+        row["updated_at"] = datetime.datetime.now()
         
-        await self.session.commit()
+        result = await self.session.execute(
+            update(ImageDataDTO).where(ImageDataDTO.id == image.id).values(**row)
+        )
+        if result.rowcount == 0:
+            raise ValueError(f"No se puede actualizar una imagen que no existe: {image.id}")
     
     async def save_batch(self, images: List[ImageData], task_id: uuid.UUID) -> None:
         """Guarda un lote de imágenes"""
         
-        # Para cada imagen, verificar si existe y actualizar o crear nueva
-        for image in images:
-            await self.save(image, task_id)
+        if not images:
+            return
+        
+        # Un único instante para todo el lote
+        now = datetime.datetime.now()
+        
+        # Upsert del lote completo en una sola sentencia: inserta las nuevas
+        # y actualiza las existentes sin consultarlas antes
+        stmt = pg_insert(ImageDataDTO)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ImageDataDTO.id],
+            set_={
+                "task_id": stmt.excluded.task_id,
+                "filename": stmt.excluded.filename,
+                "file_path": stmt.excluded.file_path,
+                "format": stmt.excluded.format,
+                "modality": stmt.excluded.modality,
+                "region": stmt.excluded.region,
+                "size_bytes": stmt.excluded.size_bytes,
+                "dimensions": stmt.excluded.dimensions,
+                "is_stored": stmt.excluded.is_stored,
+                "updated_at": now
+            }
+        )
+        await self.session.execute(stmt, [self._entity_to_row(image, task_id, now) for image in images])
+    
+    def _entity_to_row(
+        self, image: ImageData, task_id: uuid.UUID, now: Optional[datetime.datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Convierte una entidad de imagen a los valores de columna de su fila.
+        Las marcas de tiempo ausentes se completan con now: un INSERT multi-fila envía
+        None como NULL explícito y no aplica los default de las columnas.
+        """
+        return {
+            "id": image.id,
+            "task_id": task_id,
+            "filename": image.filename,
+            "file_path": image.file_path,
+            "format": image.metadata.format.value,
+            "modality": image.metadata.modality,
+            "region": image.metadata.region,
+            "size_bytes": image.size_bytes,
+            "dimensions": image.metadata.dimensions,
+            "is_stored": image.is_stored,
+            "created_at": image.created_at or now,
+            "updated_at": image.updated_at or now
+        }
     
     async def get_by_id(self, image_id: uuid.UUID) -> Optional[ImageData]:
         """Obtiene una imagen por su ID"""
@@ -278,26 +381,7 @@ class SQLImageRepository(ImageRepository):
         if not dto:
             return None
             
-        # Crear metadatos
-        metadata = ImageMetadata(
-            format=ImageFormat(dto.format),
-            modality=dto.modality,
-            region=dto.region,
-            size_bytes=dto.size_bytes,
-            dimensions=dto.dimensions
-        )
-        
-        # Crear entidad
-        return ImageData(
-            id=dto.id,
-            metadata=metadata,
-            filename=dto.filename,
-            file_path=dto.file_path,
-            size_bytes=dto.size_bytes,
-            is_stored=dto.is_stored,
-            created_at=dto.created_at,
-            updated_at=dto.updated_at
-        )
+        return _image_dto_to_entity(dto)
     
     async def get_images_by_task(self, task_id: uuid.UUID) -> List[ImageData]:
         """Obtiene todas las imágenes asociadas a una tarea"""
@@ -306,32 +390,7 @@ class SQLImageRepository(ImageRepository):
         result = await self.session.execute(query)
         dtos = result.scalars().all()
         
-        images = []
-        for dto in dtos:
-            # Crear metadatos
-            metadata = ImageMetadata(
-                format=ImageFormat(dto.format),
-                modality=dto.modality,
-                region=dto.region,
-                size_bytes=dto.size_bytes,
-                dimensions=dto.dimensions
-            )
-            
-            # Crear entidad
-            image = ImageData(
-                id=dto.id,
-                metadata=metadata,
-                filename=dto.filename,
-                file_path=dto.file_path,
-                size_bytes=dto.size_bytes,
-                is_stored=dto.is_stored,
-                created_at=dto.created_at,
-                updated_at=dto.updated_at
-            )
-            
-            images.append(image)
-            
-        return images
+        return [_image_dto_to_entity(dto) for dto in dtos]
     
     async def get_images_count_by_task(self, task_id: uuid.UUID) -> int:
         """Obtiene el número de imágenes asociadas a una tarea"""
@@ -340,13 +399,62 @@ class SQLImageRepository(ImageRepository):
         result = await self.session.execute(query)
         return result.scalar_one()
     
+    async def get_images_counts_by_tasks(self, task_ids: List[uuid.UUID]) -> Dict[uuid.UUID, int]:
+        """
+        Obtiene en una sola consulta el número de imágenes de cada tarea; las tareas sin imágenes no aparecen.
+        Los IDs repetidos se envían una sola vez.
+        """
+        if not task_ids:
+            return {}
+        
+        query = (
+            select(ImageDataDTO.task_id, func.count())
+            .filter(ImageDataDTO.task_id.in_(set(task_ids)))
+            .group_by(ImageDataDTO.task_id)
+        )
+        result = await self.session.execute(query)
+        return dict(result.tuples().all())
+    
     async def update_image_status(self, image_id: uuid.UUID, is_stored: bool) -> None:
         """Actualiza el estado de almacenamiento de una imagen"""
         
-        dto = await self.session.get(ImageDataDTO, image_id)
-        if not dto:
-            return
-            
-        dto.is_stored = is_stored
-        dto.updated_at = datetime.datetime.now()
-        await self.session.commit()
\ No newline at end of file
+        # UPDATE directo, sin cargar antes la fila; si la imagen no existe no afecta filas
+        await self.session.execute(
+            update(ImageDataDTO)
+            .where(ImageDataDTO.id == image_id)
+            .values(is_stored=is_stored, updated_at=datetime.datetime.now())
+        )
+
+    async def mark_deleted_and_count_remaining(self, image_id: uuid.UUID, task_id: uuid.UUID) -> int:
+        """
+        Marca una imagen como no almacenada y cuenta, en la misma sentencia,
+        las imágenes almacenadas que le quedan a la tarea
+        """
+        return await self.mark_batch_deleted_and_count_remaining([image_id], task_id)
+
+    async def mark_batch_deleted_and_count_remaining(self, image_ids: List[uuid.UUID], task_id: uuid.UUID) -> int:
+        """
+        Marca un lote de imágenes como no almacenadas y cuenta, en la misma sentencia,
+        las imágenes almacenadas que le quedan a la tarea
+        """
+        mark_deleted = (
+            update(ImageDataDTO)
+            .where(ImageDataDTO.id.in_(image_ids))
+            .values(is_stored=False, updated_at=datetime.datetime.now())
+            .returning(ImageDataDTO.id)
+            .cte("mark_deleted")
+        )
+        # La CTE de modificación no es visible para la consulta principal,
+        # por eso se excluyen explícitamente las imágenes marcadas
+        query = (
+            select(func.count())
+            .select_from(ImageDataDTO)
+            .where(
+                ImageDataDTO.task_id == task_id,
+                ImageDataDTO.id.not_in(image_ids),
+                ImageDataDTO.is_stored.is_(True)
+            )
+            .add_cte(mark_deleted)
+        )
+        result = await self.session.execute(query)
+        return result.scalar_one()
\ No newline at end of file
@@ -12,7 +12,7 @@ class Query:
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class QueryResult(Generic[T]):
     result: T
 
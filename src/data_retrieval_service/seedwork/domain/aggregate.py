@@ -4,7 +4,7 @@ from .events import DomainEvent
 from typing import List
 
 
-@dataclass
+@dataclass(slots=True)
 class AggregateRoot(Entity):
     events: List[DomainEvent] = field(default_factory=list)
 
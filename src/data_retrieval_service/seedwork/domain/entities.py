@@ -4,7 +4,7 @@ import uuid
 from abc import ABC, abstractmethod
 
 
-@dataclass
+@dataclass(slots=True)
 class Entity:
     id: uuid.UUID = field(default_factory=uuid.uuid4)
     created_at: datetime = field(default_factory=datetime.now)
@@ -1,12 +1,25 @@
 from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Optional
 import uuid
 
 
-@dataclass
+@dataclass(slots=True)
 class DomainEvent:
     id: uuid.UUID = field(default_factory=uuid.uuid4)
     timestamp: datetime = field(default_factory=datetime.now)
+    # Payload ya serializado por el publicador; no forma parte del evento
+    _serialized: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
 
     def to_dict(self) -> dict:
-        return {"id": str(self.id), "timestamp": self.timestamp.isoformat()}
+        return self._with_base_fields({})
+
+    def _with_base_fields(self, data: dict) -> dict:
+        """
+        Añade los campos comunes al diccionario ya construido por el evento concreto,
+        evitando crear un diccionario intermedio y copiarlo en otro.
+        """
+        # Los UUID se dejan tal cual: el publicador codifica con orjson, que los formatea de forma nativa
+        data["id"] = self.id
+        data["timestamp"] = self.timestamp.isoformat()
+        return data
@@ -1,10 +1,14 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from abc import ABC, abstractmethod
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ValueObject:
     def __eq__(self, other):
         if not isinstance(other, ValueObject):
             return False
-        return self.__dict__ == other.__dict__
+        # Sin __dict__ (slots): se comparan los campos declarados
+        names = [f.name for f in fields(self)]
+        return names == [f.name for f in fields(other)] and all(
+            getattr(self, name) == getattr(other, name) for name in names
+        )
@@ -36,6 +36,13 @@ class UnitOfWork(ABC):
         """Descarta los cambios en la transacción actual"""
         pass
 
+    def read_only(self) -> "UnitOfWork":
+        """
+        Indica que la próxima transacción solo realizará lecturas.
+        Por defecto no cambia nada; las implementaciones pueden usar una sesión de solo lectura.
+        """
+        return self
+
 
 class SqlAlchemyUnitOfWork(UnitOfWork):
     """
@@ -44,18 +51,29 @@ class SqlAlchemyUnitOfWork(UnitOfWork):
     dentro del contexto de una sesión compartida.
     """
     
-    def __init__(self, session_factory, repositories_factory: Dict[str, Type[Repository]]):
+    def __init__(self, session_factory, repositories_factory: Dict[str, Type[Repository]], read_session_factory=None):
         """
         Inicializa el Unit of Work con una fábrica de sesiones y fábricas de repositorios.
         
         Args:
             session_factory: Fábrica que crea sesiones de SQLAlchemy
             repositories_factory: Diccionario de fábricas de repositorios
+            read_session_factory: Fábrica opcional de sesiones de solo lectura (réplica o READ ONLY)
         """
         self.session_factory = session_factory
         self.repositories_factory = repositories_factory
+        self.read_session_factory = read_session_factory
         self._repositories = {}
         self._session = None
+        self._read_only = False
+    
+    def read_only(self) -> "SqlAlchemyUnitOfWork":
+        """
+        Hace que la próxima transacción use la fábrica de sesiones de solo lectura, si existe.
+        Uso: async with uow.read_only(): ...
+        """
+        self._read_only = True
+        return self
     
     async def __aenter__(self):
         """
@@ -64,8 +82,16 @@ class SqlAlchemyUnitOfWork(UnitOfWork):
         Returns:
             El propio UoW para permitir el uso del patrón 'async with'
         """
-        self._session = self.session_factory()
-        self._repositories = {}
+        if self._read_only and self.read_session_factory is not None:
+            self._session = self.read_session_factory()
+        else:
+            self._session = self.session_factory()
+        self._read_only = False
+        # Los repositorios se construyen una sola vez por transacción sobre la sesión compartida
+        self._repositories = {
+            name: factory(self._session)
+            for name, factory in self.repositories_factory.items()
+        }
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -161,4 +187,8 @@ class SqlAlchemyUnitOfWork(UnitOfWork):
         Returns:
             Una instancia del repositorio solicitado
         """
-        return self._get_repository(name)
\ No newline at end of file
+        # Camino rápido: dentro de una transacción los repositorios ya están construidos
+        try:
+            return self._repositories[name]
+        except KeyError:
+            return self._get_repository(name)
\ No newline at end of file
@@ -0,0 +1,102 @@
+import uuid
+
+import orjson
+
+from src.data_retrieval_service.modules.data_retrieval.domain.entities import ImageData, RetrievalTask
+from src.data_retrieval_service.modules.data_retrieval.domain.events import (
+    ImagesReadyForAnonymization,
+    ImagesRetrieved,
+)
+from src.data_retrieval_service.modules.data_retrieval.domain.value_objects import (
+    ImageFormat,
+    ImageMetadata,
+    RetrievalMethod,
+    SourceMetadata,
+    SourceType,
+)
+
+
+def _make_task() -> RetrievalTask:
+    return RetrievalTask(
+        source_metadata=SourceMetadata(
+            source_type=SourceType.HOSPITAL,
+            source_name="Hospital Central",
+            source_id="H-001",
+            location="CO",
+            retrieval_method=RetrievalMethod.API,
+        ),
+        batch_id="batch-1",
+    )
+
+
+def _make_image(modality: str, region: str) -> ImageData:
+    return ImageData(
+        metadata=ImageMetadata(
+            format=ImageFormat.DICOM,
+            modality=modality,
+            region=region,
+            size_bytes=1024,
+        ),
+        filename=f"{modality}.dcm",
+        file_path=f"/data/images/{modality}.dcm",
+        size_bytes=1024,
+    )
+
+
+def test_notify_images_retrieved_emits_single_anonymization_event():
+    task = _make_task()
+    images = [_make_image("CT", "chest"), _make_image("MRI", "head")]
+
+    task.notify_images_retrieved(images)
+
+    assert [type(event) for event in task.events] == [ImagesRetrieved, ImagesReadyForAnonymization]
+    ready = task.events[1]
+    assert ready.task_id == task.id
+    assert ready.source == "Hospital Central"
+    assert ready.images == [
+        {
+            "image_id": image.id,
+            "modality": image.metadata.modality,
+            "region": image.metadata.region,
+            "file_path": image.file_path,
+        }
+        for image in images
+    ]
+
+
+def test_anonymization_event_serializes_with_orjson():
+    task = _make_task()
+    image = _make_image("CT", "chest")
+    task.notify_images_retrieved([image])
+    event = task.events[1]
+
+    data = orjson.loads(orjson.dumps(event.to_dict()))
+
+    assert list(data) == ["task_id", "source", "images", "id", "timestamp"]
+    assert data["task_id"] == str(task.id)
+    assert data["id"] == str(event.id)
+    assert data["timestamp"] == event.timestamp.isoformat()
+    assert data["images"] == [{
+        "image_id": str(image.id),
+        "modality": "CT",
+        "region": "chest",
+        "file_path": "/data/images/CT.dcm",
+    }]
+
+
+def test_anonymization_event_with_no_images():
+    task = _make_task()
+
+    task.notify_images_retrieved([])
+
+    retrieved, ready = task.events
+    assert retrieved.number_of_images == 0
+    assert ready.images == []
+    assert orjson.loads(orjson.dumps(ready.to_dict()))["images"] == []
+
+
+def test_anonymization_event_defaults():
+    event = ImagesReadyForAnonymization(task_id=uuid.uuid4(), source="Hospital Central")
+
+    assert event.images == []
+    assert isinstance(event.id, uuid.UUID)
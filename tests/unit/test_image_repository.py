@@ -0,0 +1,61 @@
+import asyncio
+import datetime
+import uuid
+
+import pytest
+
+# El repositorio depende de SQLAlchemy y de la configuración de la base de datos
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic_settings")
+
+from src.data_retrieval_service.modules.data_retrieval.domain.entities import ImageData
+from src.data_retrieval_service.modules.data_retrieval.domain.value_objects import ImageFormat, ImageMetadata
+from src.data_retrieval_service.modules.data_retrieval.infrastructure.persistence.repositories import (
+    SQLImageRepository,
+)
+
+
+class _RecordingSession:
+    """Sesión mínima que registra las sentencias ejecutadas en lugar de enviarlas a la base de datos"""
+
+    def __init__(self):
+        self.executed = []
+
+    async def execute(self, statement, params=None):
+        self.executed.append((statement, params))
+
+
+def _make_image(**kwargs) -> ImageData:
+    return ImageData(
+        metadata=ImageMetadata(format=ImageFormat.DICOM, modality="CT", region="chest", size_bytes=1024),
+        filename="a.dcm",
+        file_path="/data/images/a.dcm",
+        size_bytes=1024,
+        **kwargs
+    )
+
+
+def test_save_fills_missing_timestamps_of_a_new_image():
+    session = _RecordingSession()
+    image = _make_image()
+    assert image.created_at is None
+
+    asyncio.run(SQLImageRepository(session).save(image, uuid.uuid4()))
+
+    (_, rows), = session.executed
+    assert isinstance(rows[0]["created_at"], datetime.datetime)
+    assert rows[0]["updated_at"] == rows[0]["created_at"]
+
+
+def test_save_batch_uses_one_timestamp_and_keeps_existing_ones():
+    session = _RecordingSession()
+    created_at = datetime.datetime(2024, 1, 1, 12, 0)
+    images = [_make_image(), _make_image(), _make_image(created_at=created_at, updated_at=created_at)]
+
+    asyncio.run(SQLImageRepository(session).save_batch(images, uuid.uuid4()))
+
+    (_, rows), = session.executed
+    assert rows[0]["created_at"] is not None
+    assert rows[0]["created_at"] == rows[1]["created_at"]
+    assert rows[2]["created_at"] == created_at
+    assert rows[2]["updated_at"] == created_at
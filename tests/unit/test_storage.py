@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+# storage lee la configuración al importarse
+pytest.importorskip("pydantic_settings")
+
+from src.data_retrieval_service.modules.data_retrieval.application.commands.storage import remove_files
+
+
+@pytest.fixture(params=["dir_fd", "fallback"])
+def unlink_mode(request, monkeypatch):
+    """Ejecuta cada prueba con unlink relativo al directorio y con la ruta de os.remove"""
+    if request.param == "dir_fd":
+        if not (os.unlink in os.supports_dir_fd and hasattr(os, "O_DIRECTORY")):
+            pytest.skip("La plataforma no admite unlink con dir_fd")
+    else:
+        monkeypatch.setattr(os, "supports_dir_fd", set())
+    return request.param
+
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"data")
+    return str(path)
+
+
+def test_remove_files_removes_existing_files(tmp_path, unlink_mode):
+    paths = [
+        _touch(tmp_path / "task-1" / "a.dcm"),
+        _touch(tmp_path / "task-1" / "b.dcm"),
+        _touch(tmp_path / "task-2" / "c.dcm"),
+    ]
+
+    assert remove_files(paths) == 3
+    assert not any(os.path.exists(path) for path in paths)
+
+
+def test_remove_files_skips_missing_file(tmp_path, unlink_mode):
+    present = _touch(tmp_path / "task-1" / "a.dcm")
+    missing = str(tmp_path / "task-1" / "missing.dcm")
+
+    assert remove_files([missing, present]) == 1
+    assert not os.path.exists(present)
+
+
+def test_remove_files_skips_missing_directory(tmp_path, unlink_mode):
+    present = _touch(tmp_path / "task-1" / "a.dcm")
+    missing = str(tmp_path / "gone" / "b.dcm")
+
+    assert remove_files([missing, present]) == 1
+    assert not os.path.exists(present)
+
+
+def test_remove_files_with_no_paths(unlink_mode):
+    assert remove_files([]) == 0